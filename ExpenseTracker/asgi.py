@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ExpenseTracker.settings')
+# route the income and expenditure endpoints to their async-native views
+os.environ.setdefault('API_ASYNC_VIEWS', '1')
 
 application = get_asgi_application()
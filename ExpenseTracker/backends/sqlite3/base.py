@@ -0,0 +1,53 @@
+"""
+SQLite backend tuned for several processes sharing one database file.
+
+On top of Django's backend it understands two extra `OPTIONS`:
+
+- `pragmas`: a mapping of PRAGMA names to values, applied to every new connection
+  (e.g. `journal_mode=WAL` so readers don't block the writer and the other way round).
+- `transaction_mode`: `DEFERRED` (SQLite's default), `IMMEDIATE` or `EXCLUSIVE`. With
+  `IMMEDIATE` a transaction takes the write lock when it begins, so concurrent writers
+  wait out `busy_timeout` instead of failing with "database is locked" when a read lock
+  cannot be upgraded.
+"""
+import re
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.sqlite3 import base
+
+PRAGMA_NAME = re.compile(r'^[a-z_]+$')
+PRAGMA_VALUE = re.compile(r'^-?\w+$')
+TRANSACTION_MODES = ('DEFERRED', 'IMMEDIATE', 'EXCLUSIVE')
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        # ours, not sqlite3.connect()'s
+        params.pop('pragmas', None)
+        params.pop('transaction_mode', None)
+        return params
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        for name, value in self.pragmas.items():
+            conn.execute(f'PRAGMA {name} = {value}')
+        return conn
+
+    @property
+    def pragmas(self):
+        pragmas = self.settings_dict['OPTIONS'].get('pragmas', {})
+        for name, value in pragmas.items():
+            if not PRAGMA_NAME.match(name) or not PRAGMA_VALUE.match(str(value)):
+                raise ImproperlyConfigured(f'Invalid SQLite pragma {name}={value!r}')
+        return pragmas
+
+    @property
+    def transaction_mode(self):
+        mode = (self.settings_dict['OPTIONS'].get('transaction_mode') or 'DEFERRED').upper()
+        if mode not in TRANSACTION_MODES:
+            raise ImproperlyConfigured(f'Invalid SQLite transaction_mode {mode!r}, expected one of {", ".join(TRANSACTION_MODES)}')
+        return mode
+
+    def _start_transaction_under_autocommit(self):
+        self.cursor().execute(f'BEGIN {self.transaction_mode}')
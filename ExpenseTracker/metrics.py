@@ -0,0 +1,220 @@
+"""
+Per-view request metrics, exposed on `/metrics` in the Prometheus text format.
+
+`MetricsMiddleware` (see `ExpenseTracker/middleware.py`) observes every request into the
+in-process `registry`: a few locked dict updates per request. Under a server with several
+worker processes (e.g. gunicorn), set `METRICS_DIR` to a directory shared by the workers:
+each worker then writes its totals there as `metrics-<pid>.json` at most every
+`METRICS_FLUSH_INTERVAL` seconds, and `/metrics` answers with the sum of the live totals
+of the worker serving it and the files of the others, so it gives the same numbers
+whichever worker serves it. Empty the directory when the
+server is (re)started.
+"""
+import glob
+import hmac
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+SIZE_BUCKETS = (100, 1000, 10000, 100000, 1000000, 10000000)
+
+# name: (help, buckets), all labelled by view and method
+HISTOGRAMS = {
+    'http_request_duration_seconds': ('Time until the response of requests is returned.', LATENCY_BUCKETS),
+    'http_request_db_queries': ('Database queries run per request.', QUERY_BUCKETS),
+    'http_request_db_duration_seconds': ('Time spent in database queries per request.', LATENCY_BUCKETS),
+    'http_response_size_bytes': ('Size of the response bodies.', SIZE_BUCKETS),
+}
+# name: help, labelled by view, method and status
+COUNTERS = {
+    'http_responses_total': 'Responses by status code.',
+}
+HISTOGRAM_LABELS = ('view', 'method')
+COUNTER_LABELS = ('view', 'method', 'status')
+
+logger = logging.getLogger(__name__)
+
+
+class Registry:
+    """
+    Histograms and counters of one process. A histogram series is stored as its per-bucket
+    (not cumulative) counts, the count above the last bucket, then the sum of the values.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.histograms = {name: {} for name in HISTOGRAMS}
+        self.counters = {name: {} for name in COUNTERS}
+        self.flushed_at = 0
+
+    def observe(self, name, labels, value):
+        buckets = HISTOGRAMS[name][1]
+        with self.lock:
+            series = self.histograms[name].get(labels)
+            if series is None:
+                series = self.histograms[name][labels] = [0] * (len(buckets) + 1) + [0]
+            series[bisect_left(buckets, value)] += 1
+            series[-1] += value
+
+    def inc(self, name, labels, amount=1):
+        with self.lock:
+            self.counters[name][labels] = self.counters[name].get(labels, 0) + amount
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                'histograms': {name: [[list(labels), list(series)] for labels, series in data.items()] for name, data in self.histograms.items()},
+                'counters': {name: [[list(labels), value] for labels, value in data.items()] for name, data in self.counters.items()},
+            }
+
+    def clear(self):
+        with self.lock:
+            for data in (*self.histograms.values(), *self.counters.values()):
+                data.clear()
+
+    def flush(self):
+        """
+        Write the totals of this process to `METRICS_DIR`, unless they were written less than
+        `METRICS_FLUSH_INTERVAL` ago. Failures are logged, metrics never fail a request.
+        """
+        if not settings.METRICS_DIR:
+            return
+        now = time.monotonic()
+        with self.lock:
+            if now - self.flushed_at < settings.METRICS_FLUSH_INTERVAL:
+                return
+            self.flushed_at = now
+
+        # written to a file of its own and renamed, so readers and other threads never see it half written
+        tmp = None
+        try:
+            fd, tmp = tempfile.mkstemp(prefix=f'.metrics-{os.getpid()}-', suffix='.tmp', dir=settings.METRICS_DIR)
+            with os.fdopen(fd, 'w') as fp:
+                json.dump(self.snapshot(), fp)
+            os.replace(tmp, metrics_path(os.getpid()))
+        except OSError:
+            logger.exception('Could not write the metrics to %s', settings.METRICS_DIR)
+            if tmp and os.path.exists(tmp):
+                os.unlink(tmp)
+
+
+registry = Registry()
+
+
+def metrics_path(pid):
+    return os.path.join(settings.METRICS_DIR, f'metrics-{pid}.json')
+
+
+def collect():
+    """The totals of every process writing to `METRICS_DIR`, or of this one, as a snapshot."""
+    if not settings.METRICS_DIR:
+        return registry.snapshot()
+
+    histograms = {name: {} for name in HISTOGRAMS}
+    counters = {name: {} for name in COUNTERS}
+    # the live totals of this process, and the last ones written by the others
+    snapshots = [registry.snapshot()]
+    own_path = metrics_path(os.getpid())
+    for path in glob.glob(os.path.join(settings.METRICS_DIR, 'metrics-*.json')):
+        if path == own_path:
+            continue
+        try:
+            with open(path) as fp:
+                snapshots.append(json.load(fp))
+        except (OSError, ValueError):
+            # removed or replaced while being read
+            continue
+
+    for snapshot in snapshots:
+        for name, data in snapshot['histograms'].items():
+            for labels, series in data:
+                total = histograms[name].setdefault(tuple(labels), [0] * len(series))
+                for i, value in enumerate(series):
+                    total[i] += value
+        for name, data in snapshot['counters'].items():
+            for labels, value in data:
+                counters[name][tuple(labels)] = counters[name].get(tuple(labels), 0) + value
+
+    return {
+        'histograms': {name: [[list(labels), series] for labels, series in data.items()] for name, data in histograms.items()},
+        'counters': {name: [[list(labels), value] for labels, value in data.items()] for name, data in counters.items()},
+    }
+
+
+def format_labels(names, values, **extra):
+    labels = [*zip(names, values), *extra.items()]
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in labels)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(labels, escaped)) + '}'
+
+
+def render(snapshot):
+    """`snapshot` in the Prometheus text exposition format."""
+    lines = []
+    for name, (help, buckets) in HISTOGRAMS.items():
+        lines += [f'# HELP {name} {help}', f'# TYPE {name} histogram']
+        for labels, series in sorted(snapshot['histograms'][name]):
+            cumulative = 0
+            for bound, count in zip((*buckets, '+Inf'), series):
+                cumulative += count
+                lines.append(f'{name}_bucket{format_labels(HISTOGRAM_LABELS, labels, le=bound)} {cumulative}')
+            lines.append(f'{name}_sum{format_labels(HISTOGRAM_LABELS, labels)} {series[-1]}')
+            lines.append(f'{name}_count{format_labels(HISTOGRAM_LABELS, labels)} {cumulative}')
+
+    for name, help in COUNTERS.items():
+        lines += [f'# HELP {name} {help}', f'# TYPE {name} counter']
+        for labels, value in sorted(snapshot['counters'][name]):
+            lines.append(f'{name}{format_labels(COUNTER_LABELS, labels)} {value}')
+    return '\n'.join(lines) + '\n'
+
+
+def metrics_view(request):
+    if settings.METRICS_TOKEN and not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {settings.METRICS_TOKEN}'):
+        return HttpResponse(status=401)
+    return HttpResponse(render(collect()), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+# [queries, seconds] of the request being served, shared with the threads its sync code runs in
+query_stats = ContextVar('query_stats', default=None)
+
+
+def time_query(execute, sql, params, many, context):
+    stats = query_stats.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats[0] += 1
+        stats[1] += time.perf_counter() - start
+
+
+def install_query_timer(connection):
+    if time_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(time_query)
+
+
+def install_query_timers():
+    """Time the queries of the connections of the current thread."""
+    for connection in connections.all():
+        install_query_timer(connection)
+
+
+def on_connection_created(sender, connection, **kwargs):
+    # covers the connections of the threads async views run their queries in
+    install_query_timer(connection)
+
+
+connection_created.connect(on_connection_created)
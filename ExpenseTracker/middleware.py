@@ -0,0 +1,162 @@
+import asyncio
+import re
+import time
+from django.conf import settings
+from django.core.handlers.exception import convert_exception_to_response
+from django.utils.module_loading import import_string
+from ExpenseTracker import metrics
+
+
+class ScopedMiddleware:
+    """
+    Runs the `SCOPED_MIDDLEWARE` stack only for the requests whose path matches
+    `SCOPED_MIDDLEWARE_PATHS`, every other request skips it entirely.
+
+    The API authenticates with JWTs alone, so sessions, CSRF, `request.user` and messages
+    are only needed by the admin and the docs. The scoped middleware are chained around
+    the rest of the stack the way Django chains `MIDDLEWARE`, and their `process_view()`,
+    `process_exception()` and `process_template_response()` hooks are called from this
+    middleware's own, so e.g. CSRF protection still applies to the admin.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = asyncio.iscoroutinefunction(get_response)
+        if self.async_mode:
+            # mark this instance as a coroutine function, like Django's MiddlewareMixin does
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+        self.paths = re.compile(settings.SCOPED_MIDDLEWARE_PATHS)
+        self.view_middleware = []
+        self.template_response_middleware = []
+        self.exception_middleware = []
+
+        handler = get_response
+        for middleware_path in reversed(settings.SCOPED_MIDDLEWARE):
+            middleware = import_string(middleware_path)(handler)
+            if hasattr(middleware, 'process_view'):
+                self.view_middleware.insert(0, middleware.process_view)
+            if hasattr(middleware, 'process_template_response'):
+                self.template_response_middleware.append(middleware.process_template_response)
+            if hasattr(middleware, 'process_exception'):
+                self.exception_middleware.append(middleware.process_exception)
+            handler = convert_exception_to_response(middleware)
+        self.scoped_response = handler
+
+    def in_scope(self, request):
+        return self.paths.match(request.path_info) is not None
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        return (self.scoped_response if self.in_scope(request) else self.get_response)(request)
+
+    async def __acall__(self, request):
+        return await (self.scoped_response if self.in_scope(request) else self.get_response)(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if self.in_scope(request):
+            for process_view in self.view_middleware:
+                response = process_view(request, view_func, view_args, view_kwargs)
+                if response is not None:
+                    return response
+        return None
+
+    def process_template_response(self, request, response):
+        if self.in_scope(request):
+            for process_template_response in self.template_response_middleware:
+                response = process_template_response(request, response)
+        return response
+
+    def process_exception(self, request, exception):
+        if self.in_scope(request):
+            for process_exception in self.exception_middleware:
+                response = process_exception(request, exception)
+                if response is not None:
+                    return response
+        return None
+
+
+class MetricsMiddleware:
+    """
+    Observes the latency, database queries and time, response size and status of every
+    request into `ExpenseTracker.metrics.registry`, labelled by the URL name of its view.
+
+    It comes first in `MIDDLEWARE` so the latency covers the whole stack. Streaming responses
+    are observed once their content is consumed, including the queries run while streaming.
+    """
+    sync_capable = True
+    async_capable = True
+
+    METHODS = {'GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'}
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = asyncio.iscoroutinefunction(get_response)
+        if self.async_mode:
+            # mark this instance as a coroutine function, like Django's MiddlewareMixin does
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+
+        metrics.install_query_timers()
+        stats = [0, 0]
+        token = metrics.query_stats.set(stats)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            metrics.query_stats.reset(token)
+        return self.observe(request, response, start, stats)
+
+    async def __acall__(self, request):
+        stats = [0, 0]
+        token = metrics.query_stats.set(stats)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            metrics.query_stats.reset(token)
+        return self.observe(request, response, start, stats)
+
+    def observe(self, request, response, start, stats):
+        match = request.resolver_match
+        view = match.view_name if match else 'unresolved'
+        method = request.method if request.method in self.METHODS else 'other'
+
+        if response.streaming:
+            response.streaming_content = self.stream(response.streaming_content, view, method, response.status_code, start, stats)
+        else:
+            self.record(view, method, response.status_code, time.perf_counter() - start, stats, len(response.content))
+        return response
+
+    def stream(self, content, view, method, status, start, stats):
+        size = 0
+        content = iter(content)
+        try:
+            while True:
+                token = metrics.query_stats.set(stats)
+                try:
+                    chunk = next(content)
+                except StopIteration:
+                    return
+                finally:
+                    metrics.query_stats.reset(token)
+                size += len(chunk)
+                yield chunk
+        finally:
+            self.record(view, method, status, time.perf_counter() - start, stats, size)
+
+    def record(self, view, method, status, seconds, stats, size):
+        registry = metrics.registry
+        labels = (view, method)
+        registry.observe('http_request_duration_seconds', labels, seconds)
+        registry.observe('http_request_db_queries', labels, stats[0])
+        registry.observe('http_request_db_duration_seconds', labels, stats[1])
+        registry.observe('http_response_size_bytes', labels, size)
+        registry.inc('http_responses_total', (view, method, str(status)))
+        registry.flush()
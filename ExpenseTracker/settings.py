@@ -61,15 +61,25 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'ExpenseTracker.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'corsheaders.middleware.CorsMiddleware',
-    'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
+    'ExpenseTracker.middleware.ScopedMiddleware',
+    'django.middleware.clickjacking.XFrameOptionsMiddleware',
+]
+
+# The API authenticates with JWTs only, sessions, CSRF and messages are run for the admin and the docs alone
+SCOPED_MIDDLEWARE = [
+    'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
-    'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
+SCOPED_MIDDLEWARE_PATHS = r'^/(admin/|api/schema/|$)'
+
+# The admin checks only look for these middleware in MIDDLEWARE, they run for the admin through ScopedMiddleware
+SILENCED_SYSTEM_CHECKS = ['admin.E408', 'admin.E409', 'admin.E410']
 
 ROOT_URLCONF = 'ExpenseTracker.urls'
 
@@ -97,8 +107,24 @@ WSGI_APPLICATION = 'ExpenseTracker.wsgi.application'
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        # Django's SQLite backend plus per-connection pragmas, see ExpenseTracker/backends/sqlite3
+        'ENGINE': 'ExpenseTracker.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # tests keep running in memory, as they did with the stock backend
+        'TEST': {'NAME': ':memory:'},
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', 600)),
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'transaction_mode': os.getenv('SQLITE_TRANSACTION_MODE', 'IMMEDIATE'),
+            'pragmas': {
+                'journal_mode': os.getenv('SQLITE_JOURNAL_MODE', 'WAL'),
+                'synchronous': os.getenv('SQLITE_SYNCHRONOUS', 'NORMAL'),
+                'busy_timeout': int(os.getenv('SQLITE_BUSY_TIMEOUT', 5000)), # ms
+                'cache_size': int(os.getenv('SQLITE_CACHE_SIZE', -20000)), # negative: KiB
+                'mmap_size': int(os.getenv('SQLITE_MMAP_SIZE', 128 * 1024 * 1024)), # bytes
+                'temp_store': os.getenv('SQLITE_TEMP_STORE', 'MEMORY'),
+            },
+        },
     }
 }
 
@@ -128,16 +154,19 @@ REST_FRAMEWORK = {
     'EXCEPTION_HANDLER': 'api.utils.validation.custom_exception_handler',
 
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
-        'rest_framework.authentication.SessionAuthentication',
+        'api.utils.authentication.CachedJWTAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.AllowAny',
     ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.utils.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
     'DEFAULT_PARSER_CLASSES': [
         'rest_framework.parsers.FormParser',
         'rest_framework.parsers.MultiPartParser',
-        'rest_framework.parsers.JSONParser',
+        'api.utils.renderers.ORJSONParser',
     ],
 
      # Test
@@ -149,8 +178,40 @@ REST_FRAMEWORK = {
         'rest_framework.renderers.TemplateHTMLRenderer'
     ],
     'COERCE_DECIMAL_TO_STRING': False, # To avoid decimal to string conversion
+
+    # Pagination
+    'DEFAULT_PAGINATION_CLASS': 'api.utils.pagination.KeysetPagination',
+    'PAGE_SIZE': int(os.getenv('PAGE_SIZE', 50)),
 }
 
+# Serve the income and expenditure endpoints with their async views, enabled by ExpenseTracker/asgi.py
+API_ASYNC_VIEWS = bool(int(os.getenv('API_ASYNC_VIEWS', 0)))
+
+# Maximum number of items accepted by the bulk endpoints in a single request
+BULK_MAX_ITEMS = int(os.getenv('BULK_MAX_ITEMS', 5000))
+
+# Number of valid rows inserted per `bulk_create` by the ledger import
+IMPORT_BATCH_SIZE = int(os.getenv('IMPORT_BATCH_SIZE', 1000))
+
+# In-process caches of the JWT authentication, see api.utils.authentication
+AUTH_USER_CACHE_SIZE = int(os.getenv('AUTH_USER_CACHE_SIZE', 10000))
+AUTH_USER_CACHE_TTL = int(os.getenv('AUTH_USER_CACHE_TTL', 60))
+AUTH_TOKEN_CACHE_SIZE = int(os.getenv('AUTH_TOKEN_CACHE_SIZE', 10000))
+AUTH_TOKEN_CACHE_TTL = int(os.getenv('AUTH_TOKEN_CACHE_TTL', 300))
+
+# Seconds between two loads of newly blacklisted refresh tokens, see api.utils.tokens
+TOKEN_BLACKLIST_CACHE_REFRESH = int(os.getenv('TOKEN_BLACKLIST_CACHE_REFRESH', 5))
+
+# Request metrics served on /metrics, see ExpenseTracker.metrics. Set METRICS_DIR to a directory shared by
+# the worker processes to aggregate them across workers, and METRICS_TOKEN to require it as a Bearer token
+METRICS_DIR = os.getenv('METRICS_DIR') or None
+METRICS_FLUSH_INTERVAL = float(os.getenv('METRICS_FLUSH_INTERVAL', 1)) # seconds
+METRICS_TOKEN = os.getenv('METRICS_TOKEN') or None
+
+# Give new users, incomes and expenditures time-ordered (UUID version 7) primary keys instead of random ones,
+# see apps.account.fields. They keep the indexes append-only, but reveal when each row was created
+UUID7_PRIMARY_KEYS = bool(int(os.getenv('UUID7_PRIMARY_KEYS', 0)))
+
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(hours=1),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
@@ -213,6 +274,10 @@ SPECTACULAR_SETTINGS = {
             'name': 'expense',
             'description': "Operations about a user's expense",
         },
+        {
+            'name': 'ledger',
+            'description': "Operations about a user's whole ledger of incomes and expenses",
+        },
     ],
     'EXTERNAL_DOCS': {
         'description': 'Find out more about Swagger',
@@ -0,0 +1,219 @@
+import json
+import os
+import re
+import sqlite3
+import threading
+import pytest
+from asgiref.sync import async_to_sync
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connections
+from django.test import AsyncClient, Client
+from apps.account.models import User
+from ExpenseTracker.backends.sqlite3.base import DatabaseWrapper
+from ExpenseTracker.metrics import registry
+
+pytestmark = pytest.mark.django_db
+
+
+class TestSQLiteBackend:
+
+    def wrapper(self, path, **options):
+        settings_dict = {**connections['default'].settings_dict, 'NAME': str(path), 'OPTIONS': options}
+        return DatabaseWrapper(settings_dict, alias='sqlite_backend_test')
+
+    def test_pragmas_are_applied_to_new_connections(self, tmp_path):
+        wrapper = self.wrapper(tmp_path / 'db.sqlite3', pragmas={'journal_mode': 'WAL', 'busy_timeout': 1234, 'synchronous': 'NORMAL'})
+        try:
+            with wrapper.cursor() as cursor:
+                assert cursor.execute('PRAGMA journal_mode').fetchone() == ('wal', )
+                assert cursor.execute('PRAGMA busy_timeout').fetchone() == (1234, )
+                assert cursor.execute('PRAGMA synchronous').fetchone() == (1, )
+                # Django's own pragmas are still there
+                assert cursor.execute('PRAGMA foreign_keys').fetchone() == (1, )
+        finally:
+            wrapper.close()
+
+    def test_immediate_transactions_take_the_write_lock_when_they_begin(self, tmp_path):
+        path = tmp_path / 'db.sqlite3'
+        wrapper = self.wrapper(path, transaction_mode='immediate')
+        try:
+            wrapper.ensure_connection()
+            wrapper._start_transaction_under_autocommit()
+
+            other = sqlite3.connect(path, timeout=0)
+            with pytest.raises(sqlite3.OperationalError, match='locked'):
+                other.execute('BEGIN IMMEDIATE')
+            other.close()
+        finally:
+            wrapper.close()
+
+    @pytest.mark.parametrize('options', [
+        {'pragmas': {'journal_mode; DROP TABLE x': 'WAL'}},
+        {'pragmas': {'journal_mode': 'WAL; DROP TABLE x'}},
+        {'transaction_mode': 'LAZY'},
+    ])
+    def test_invalid_options(self, tmp_path, options):
+        wrapper = self.wrapper(tmp_path / 'db.sqlite3', **options)
+        with pytest.raises(ImproperlyConfigured):
+            wrapper.ensure_connection()
+            wrapper._start_transaction_under_autocommit()
+        wrapper.close()
+
+
+class TestScopedMiddleware:
+
+    @pytest.fixture
+    def admin_user(self):
+        return User.objects.create_superuser(email='admin@nomail.com', password='admin_password', phone_number='+233277528583')
+
+    def test_admin_uses_sessions_and_csrf(self, admin_user):
+        client = Client(enforce_csrf_checks=True)
+        response = client.get('/admin/login/')
+        assert response.status_code == 200
+        assert 'csrftoken' in response.cookies
+
+        # without the token the login is refused
+        response = client.post('/admin/login/', {'username': admin_user.email, 'password': 'admin_password'})
+        assert response.status_code == 403
+
+        response = client.post('/admin/login/?next=/admin/', {
+            'username': admin_user.email, 'password': 'admin_password',
+            'csrfmiddlewaretoken': client.cookies['csrftoken'].value,
+        })
+        assert response.status_code == 302
+        assert 'sessionid' in response.cookies
+        assert client.get('/admin/').status_code == 200
+
+    def test_docs_are_served(self):
+        assert Client().get('/').status_code == 200
+        assert Client().get('/api/schema/').status_code == 200
+
+    def test_api_skips_sessions(self, admin_user, user_income, access_token):
+        client = Client()
+        client.force_login(admin_user)
+
+        # a session cookie does not authenticate the API, and no session is loaded or saved for it
+        response = client.get('/user/income/')
+        assert response.status_code == 401
+        assert not hasattr(response.wsgi_request, 'session')
+        assert 'sessionid' not in response.cookies
+
+        response = client.get('/user/income/', HTTP_AUTHORIZATION=f'Bearer {access_token}')
+        assert response.status_code == 200
+        assert not hasattr(response.wsgi_request, 'session')
+
+    def test_asgi_requests_are_scoped(self, user_income, access_token):
+        client = AsyncClient()
+        response = async_to_sync(client.get)('/admin/login/')
+        assert response.status_code == 200
+        assert 'csrftoken' in response.cookies
+
+        response = async_to_sync(client.get)('/user/income/', AUTHORIZATION=f'Bearer {access_token}')
+        assert response.status_code == 200
+        assert not hasattr(response.asgi_request, 'session')
+
+
+class TestMetrics:
+
+    @pytest.fixture(autouse=True)
+    def clear_registry(self):
+        registry.clear()
+        yield
+        registry.clear()
+
+    def sample(self, body, name, **labels):
+        """The value of the `name` sample with `labels` (a subset of its labels) in a /metrics body."""
+        for line in body.splitlines():
+            match = re.fullmatch(r'(\w+)\{(.*)\} (\S+)', line)
+            if match and match[1] == name and labels.items() <= dict(re.findall(r'(\w+)="([^"]*)"', match[2])).items():
+                return float(match[3])
+        return None
+
+    def test_requests_are_observed_per_view(self, user, user_income, access_token):
+        client = Client(HTTP_AUTHORIZATION=f'Bearer {access_token}')
+        for _ in range(3):
+            assert client.get('/user/income/').status_code == 200
+        assert client.get(f'/user/income/{user_income.id}/').status_code == 200
+        assert client.post('/auth/login/', {'email': user.email, 'password': 'wrong'}, content_type='application/json').status_code == 400
+
+        response = Client().get('/metrics')
+        assert response.status_code == 200
+        assert response['Content-Type'].startswith('text/plain; version=0.0.4')
+        body = response.content.decode()
+
+        assert self.sample(body, 'http_request_duration_seconds_count', view='list_create_incomes', method='GET') == 3
+        assert self.sample(body, 'http_request_duration_seconds_bucket', view='list_create_incomes', method='GET', le='+Inf') == 3
+        assert self.sample(body, 'http_request_duration_seconds_sum', view='list_create_incomes', method='GET') > 0
+        assert self.sample(body, 'http_responses_total', view='list_create_incomes', method='GET', status='200') == 3
+        assert self.sample(body, 'http_responses_total', view='retrieve_get_update_delete_income', method='GET', status='200') == 1
+        assert self.sample(body, 'http_responses_total', view='login', method='POST', status='400') == 1
+
+        # the page and the version of the user's data are read
+        assert self.sample(body, 'http_request_db_queries_sum', view='list_create_incomes', method='GET') >= 3
+        assert self.sample(body, 'http_request_db_queries_bucket', view='list_create_incomes', method='GET', le='0') == 0
+        assert self.sample(body, 'http_request_db_duration_seconds_sum', view='list_create_incomes', method='GET') > 0
+        assert self.sample(body, 'http_response_size_bytes_sum', view='list_create_incomes', method='GET') > 0
+
+    def test_streaming_responses_are_observed_once_consumed(self, user, user_income, access_token):
+        response = Client(HTTP_AUTHORIZATION=f'Bearer {access_token}').get('/user/ledger/export/?format=csv')
+        assert self.sample(Client().get('/metrics').content.decode(), 'http_responses_total', view='export_ledger') is None
+
+        size = len(b''.join(response.streaming_content))
+        response.close()
+        body = Client().get('/metrics').content.decode()
+        assert self.sample(body, 'http_responses_total', view='export_ledger', status='200') == 1
+        assert self.sample(body, 'http_response_size_bytes_sum', view='export_ledger') == size
+        assert self.sample(body, 'http_request_db_queries_sum', view='export_ledger') >= 1
+
+    def test_metrics_are_summed_across_processes(self, settings, tmp_path, user_income, access_token):
+        settings.METRICS_DIR = str(tmp_path)
+        Client(HTTP_AUTHORIZATION=f'Bearer {access_token}').get('/user/income/')
+
+        # the totals another worker wrote
+        other = {
+            'histograms': {'http_request_duration_seconds': [[['list_create_incomes', 'GET'], [1, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1, 20.001]]]},
+            'counters': {'http_responses_total': [[['list_create_incomes', 'GET', '200'], 2]]},
+        }
+        (tmp_path / 'metrics-1.json').write_text(json.dumps(other))
+
+        body = Client().get('/metrics').content.decode()
+        assert self.sample(body, 'http_request_duration_seconds_count', view='list_create_incomes') == 3
+        assert self.sample(body, 'http_request_duration_seconds_bucket', view='list_create_incomes', le='0.005') >= 1
+        assert self.sample(body, 'http_responses_total', view='list_create_incomes', status='200') == 3
+        assert (tmp_path / f'metrics-{os.getpid()}.json').exists()
+
+    def test_concurrent_flushes(self, settings, tmp_path, caplog):
+        settings.METRICS_DIR = str(tmp_path)
+        settings.METRICS_FLUSH_INTERVAL = 0
+        registry.inc('http_responses_total', ('list_create_incomes', 'GET', '200'))
+
+        threads = [threading.Thread(target=lambda: [registry.flush() for _ in range(50)]) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        # every thread wrote a file of its own, and none was left behind
+        assert 'Could not write the metrics' not in caplog.text
+        assert os.listdir(tmp_path) == [f'metrics-{os.getpid()}.json']
+
+    def test_failed_flushes_do_not_fail_requests(self, settings, tmp_path, user_income, access_token, caplog):
+        settings.METRICS_DIR = str(tmp_path / 'missing')
+        registry.flushed_at = 0
+
+        response = Client(HTTP_AUTHORIZATION=f'Bearer {access_token}').get('/user/income/')
+        assert response.status_code == 200
+        assert 'Could not write the metrics' in caplog.text
+
+    def test_metrics_token(self, settings):
+        settings.METRICS_TOKEN = 'secret'
+        assert Client().get('/metrics').status_code == 401
+        assert Client().get('/metrics', HTTP_AUTHORIZATION='Bearer wrong').status_code == 401
+        assert Client().get('/metrics', HTTP_AUTHORIZATION='Bearer secret').status_code == 200
+
+    def test_async_views_are_observed(self, async_views, user_income, access_token):
+        response = async_to_sync(AsyncClient().get)('/user/income/', AUTHORIZATION=f'Bearer {access_token}')
+        assert response.status_code == 200
+
+        body = Client().get('/metrics').content.decode()
+        assert self.sample(body, 'http_responses_total', view='list_create_incomes', method='GET', status='200') == 1
+        assert self.sample(body, 'http_request_db_queries_sum', view='list_create_incomes') >= 1
@@ -0,0 +1,31 @@
+from django.conf import settings
+from rest_framework import serializers
+
+
+class BulkCreateListSerializer(serializers.ListSerializer):
+    """List serializer that inserts all of its validated items with a single `bulk_create`."""
+
+    def create(self, validated_data):
+        model = self.child.Meta.model
+        # LedgerQuerySet.bulk_create runs in one transaction together with the balance update
+        return model.objects.bulk_create([model(**item) for item in validated_data])
+
+
+class BulkDeleteSerializer(serializers.Serializer):
+    """IDs of the items a bulk request applies to."""
+    ids = serializers.ListField(child=serializers.UUIDField(), allow_empty=False, max_length=settings.BULK_MAX_ITEMS)
+
+
+class BulkUpdateSerializer(BulkDeleteSerializer):
+    """IDs of the items to update, plus the partial payload applied to all of them."""
+    data = serializers.DictField(allow_empty=False)
+
+
+# SCHEMA
+class BulkUpdateSchemaSerializer(serializers.Serializer):
+    updated   = serializers.ListField(child=serializers.UUIDField(), read_only=True)
+    not_found = serializers.ListField(child=serializers.UUIDField(), read_only=True)
+
+class BulkDeleteSchemaSerializer(serializers.Serializer):
+    deleted   = serializers.ListField(child=serializers.UUIDField(), read_only=True)
+    not_found = serializers.ListField(child=serializers.UUIDField(), read_only=True)
@@ -1,5 +1,6 @@
 from rest_framework import serializers
 from apps.account.models import Expenditure
+from api.serializers.bulk import BulkCreateListSerializer
 
 class UserExpenditureSerializer(serializers.ModelSerializer):
     estimatedAmount = serializers.DecimalField(max_digits=10, decimal_places=2, required=True, min_value=0.00)
@@ -9,6 +10,7 @@ class UserExpenditureSerializer(serializers.ModelSerializer):
     class Meta:
         model = Expenditure
         fields = '__all__'
+        list_serializer_class = BulkCreateListSerializer
         extra_kwargs = {
             'user': {'write_only': True},
             'created_at': {'read_only': True},
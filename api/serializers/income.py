@@ -1,5 +1,6 @@
 from rest_framework import serializers
 from apps.account.models import Income
+from api.serializers.bulk import BulkCreateListSerializer
 
 class UserIncomeSerializer(serializers.ModelSerializer):
     amount = serializers.DecimalField(max_digits=10, decimal_places=2, required=True)
@@ -9,6 +10,7 @@ class UserIncomeSerializer(serializers.ModelSerializer):
     class Meta:
         model = Income
         fields = '__all__'
+        list_serializer_class = BulkCreateListSerializer
         extra_kwargs = {
             'user': {'write_only': True},
             'created_at': {'read_only': True},
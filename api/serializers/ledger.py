@@ -0,0 +1,63 @@
+from rest_framework import serializers
+from api.utils.ledger import GRANULARITIES, LEDGER_KINDS
+
+
+class LedgerQuerySerializer(serializers.Serializer):
+    """Query parameters selecting a slice of the user's ledger."""
+    start = serializers.DateField(required=False, help_text='First day to include (YYYY-MM-DD).')
+    end   = serializers.DateField(required=False, help_text='Last day to include (YYYY-MM-DD).')
+    kind  = serializers.ChoiceField(choices=['all', *LEDGER_KINDS], default='all', help_text='Only include incomes or expenditures.')
+
+    def validate(self, attrs):
+        if attrs.get('start') and attrs.get('end') and attrs['start'] > attrs['end']:
+            raise serializers.ValidationError('start must not be after end')
+        return attrs
+
+    def get_kinds(self):
+        kind = self.validated_data['kind']
+        return list(LEDGER_KINDS) if kind == 'all' else [kind]
+
+
+class LedgerSummaryQuerySerializer(LedgerQuerySerializer):
+    """Query parameters of the ledger summary."""
+    granularity = serializers.ChoiceField(choices=list(GRANULARITIES), default='month', help_text='Length of the summarized periods.')
+
+
+class IncomeSummarySerializer(serializers.Serializer):
+    period = serializers.DateField(help_text='First day of the period.')
+    total  = serializers.DecimalField(max_digits=15, decimal_places=2)
+    count  = serializers.IntegerField()
+
+
+class ExpenditureSummarySerializer(IncomeSummarySerializer):
+    category = serializers.CharField()
+
+
+class LedgerSummarySerializer(serializers.Serializer):
+    granularity = serializers.ChoiceField(choices=list(GRANULARITIES))
+    income      = IncomeSummarySerializer(many=True, required=False)
+    expenditure = ExpenditureSummarySerializer(many=True, required=False)
+
+
+class LedgerImportSerializer(serializers.Serializer):
+    """Upload of ledger rows to import, in the same columns as the export."""
+    file   = serializers.FileField(help_text='CSV or NDJSON file with `kind`, `category`, `name` and `amount` columns.')
+    format = serializers.ChoiceField(choices=['csv', 'ndjson'], required=False, help_text='Format of the file, guessed from its extension by default.')
+    kind   = serializers.ChoiceField(choices=list(LEDGER_KINDS), required=False, help_text='Kind of the rows without a `kind` column.')
+
+    def validate(self, attrs):
+        if 'format' not in attrs:
+            extension = attrs['file'].name.rpartition('.')[2].lower()
+            if extension not in ('csv', 'ndjson'):
+                raise serializers.ValidationError({'format': 'Could not guess the format from the file name'})
+            attrs['format'] = extension
+        return attrs
+
+
+class LedgerImportReportSerializer(serializers.Serializer):
+    rows            = serializers.IntegerField(help_text='Number of rows read.')
+    created         = serializers.IntegerField(help_text='Number of rows imported.')
+    failed          = serializers.IntegerField(help_text='Number of rows rejected.')
+    errors          = serializers.ListField(child=serializers.DictField(), help_text='Validation errors of the first rejected rows, by row number.')
+    seconds         = serializers.FloatField()
+    rows_per_second = serializers.IntegerField()
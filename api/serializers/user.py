@@ -1,12 +1,14 @@
+from api.utils.tokens import CachedRefreshToken
 from apps.account.models import User
 from rest_framework import serializers
 from django.contrib.auth import user_logged_in
+from django.contrib.auth.models import update_last_login
 from drf_spectacular.utils import extend_schema_field
 from django.core.exceptions import ValidationError
 from phonenumber_field.serializerfields import PhoneNumberField
-from rest_framework_simplejwt.serializers import PasswordField, TokenObtainPairSerializer
+from rest_framework_simplejwt.serializers import PasswordField, TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
 from django.contrib.auth.password_validation import validate_password as user_validate_password
-from django.db.models import Sum
 from phonenumber_field.validators import validate_international_phonenumber
 
 class UserSerializer(serializers.ModelSerializer):
@@ -29,14 +31,16 @@ class UserSerializer(serializers.ModelSerializer):
 
     @extend_schema_field(serializers.DecimalField(max_digits=9, decimal_places=2))
     def get_total_income(self, user):
-        user_incomes = user.incomes.all() # get all user incomes
-        total = user_incomes.aggregate(total_income=Sum('amount')).get('total_income', 0)
+        # read from the materialized balance instead of summing every income
+        balance = getattr(user, 'balance', None)
+        total = balance.total_income if balance else 0
         return total if total else 0
 
     @extend_schema_field(serializers.DecimalField(max_digits=9, decimal_places=2))
     def get_total_expense(self, user):
-        user_incomes = user.expenditures.all() # get all user expenditures
-        total = user_incomes.aggregate(total_income=Sum('estimatedAmount')).get('total_income', 0)
+        # read from the materialized balance instead of summing every expenditure
+        balance = getattr(user, 'balance', None)
+        total = balance.total_expense if balance else 0
         return total if total else 0
 
 
@@ -90,13 +94,52 @@ class UserUpdateSerializer(serializers.ModelSerializer):
 
 class LoginSerializer(TokenObtainPairSerializer):
     """Password login serializer for user."""
+    # the credentials are checked here rather than through authenticate(), so a login
+    # attempt costs one user query and one password hash, and the tokens are issued for
+    # the user fetched
     email = serializers.EmailField(required=True)
     password = PasswordField(required=True)
 
+    default_error_messages = {
+        'invalid_credentials': 'Invalid username/password',
+        'inactive_account': 'No active account found with the given credentials',
+    }
+
     def validate(self, attrs):
-        data = super().validate(attrs)
+        user = User.objects.filter(email=attrs['email']).first()
+
+        if user is None:
+            # hash anyway so that unknown emails take as long as wrong passwords
+            User().set_password(attrs['password'])
+            self.fail('invalid_credentials')
+        if not user.check_password(attrs['password']):
+            self.fail('invalid_credentials')
+        if not user.is_active:
+            self.fail('inactive_account')
+
+        self.user = user
+        refresh = self.get_token(user)
+        if jwt_settings.UPDATE_LAST_LOGIN:
+            update_last_login(None, user)
+
         # emitting user_logged_in signal for token-based authentication
-        user_logged_in.send(sender=self.user.__class__, request=self.context['request'], user=self.user)
+        user_logged_in.send(sender=user.__class__, request=self.context['request'], user=user)
+        return {'refresh': str(refresh), 'access': str(refresh.access_token)}
+
+class RefreshSerializer(TokenRefreshSerializer):
+    """Refresh token serializer checking the blacklist through the in-process cache."""
+
+    def validate(self, attrs):
+        refresh = CachedRefreshToken(attrs['refresh'])
+        data = {'access': str(refresh.access_token)}
+
+        if jwt_settings.ROTATE_REFRESH_TOKENS:
+            if jwt_settings.BLACKLIST_AFTER_ROTATION:
+                refresh.blacklist()
+            refresh.set_jti()
+            refresh.set_exp()
+            data['refresh'] = str(refresh)
+
         return data
 
 class TokenSerializer(serializers.Serializer):
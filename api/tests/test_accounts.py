@@ -1,8 +1,13 @@
 import pytest
+from datetime import timedelta
 from rest_framework import status
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
 from django.urls import reverse
+from django.utils import timezone
 from api.serializers.user import LoginSerializer, UserSerializer, UserUpdateSerializer
-from apps.account.models import User
+from api.utils.tokens import blacklist_cache
+from apps.account.models import User, UserBalance
+from rest_framework_simplejwt.tokens import RefreshToken
 from mixer.backend.django import mixer
 
 pytestmark = pytest.mark.django_db
@@ -182,6 +187,29 @@ class TestLoginView:
         # check if response status code is 400
         assert response.status_code == status.HTTP_400_BAD_REQUEST
 
+    @pytest.mark.parametrize('email, password, status_code', [
+        ('testuser@gmail.com', 'testpass@334', status.HTTP_200_OK),
+        ('testuser@gmail.com', 'randompass', status.HTTP_400_BAD_REQUEST),
+        ('testuserinvalid@gmail.com', 'randompass', status.HTTP_400_BAD_REQUEST),
+    ])
+    def test_login_hashes_password_once(self, mocker, client, email, password, status_code):
+        user = mixer.blend(User, email='testuser@gmail.com', is_active=True)
+        user.set_password('testpass@334')
+        user.save()
+
+        encode = mocker.spy(PBKDF2PasswordHasher, 'encode')
+        response = client.post(self.login_url, {'email': email, 'password': password}, format='json')
+
+        assert response.status_code == status_code
+        assert encode.call_count == 1
+
+    def test_login_invalid_fields(self, client):
+        response = client.post(self.login_url, {'password': ''}, format='json')
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert response.data['message'] == 'Invalid username/password'
+        assert set(response.data['errors']) == {'email', 'password'}
+
     def test_login_exception_raised_when_serializing(self, mocker, api_client, user, access_token):
         # create a user object with valid credentials
         user = mixer.blend(User, email='testuser@gmail.com', is_active=True)
@@ -217,6 +245,30 @@ class TestUserTokenRefreshView:
         assert response.status_code == status.HTTP_401_UNAUTHORIZED
         assert response.data['validations']['code'] == 'token_not_valid'
 
+    def test_refresh_checks_the_cached_blacklist(self, api_client, refresh_token, django_assert_num_queries):
+        data = {'refresh': refresh_token}
+        assert api_client.post(self.refresh_token_url, data=data, format='json').status_code == status.HTTP_200_OK
+
+        # the blacklist was loaded by the first refresh
+        with django_assert_num_queries(0):
+            assert api_client.post(self.refresh_token_url, data=data, format='json').status_code == status.HTTP_200_OK
+
+        # tokens blacklisted by this process are rejected at once
+        api_client.post(reverse('logout'), {'refresh_token': refresh_token})
+        response = api_client.post(self.refresh_token_url, data=data, format='json')
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    def test_refresh_picks_up_tokens_blacklisted_elsewhere(self, monkeypatch, api_client, refresh_token):
+        data = {'refresh': refresh_token}
+        assert api_client.post(self.refresh_token_url, data=data, format='json').status_code == status.HTTP_200_OK
+
+        # blacklisted by another process
+        RefreshToken(refresh_token).blacklist()
+        monkeypatch.setattr(blacklist_cache, '_next_load', 0)
+
+        response = api_client.post(self.refresh_token_url, data=data, format='json')
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
 class TestLogoutAPIView:
     logout_url = reverse('logout')
 
@@ -252,6 +304,57 @@ class TestUserProfileView:
         print(user)
         print(user.get_full_name())
 
+    def test_get_user_totals(self, api_client, user, access_token, user_income, user_expenditure):
+        url = reverse('user_profile', args=[user.id])
+        headers = {'HTTP_AUTHORIZATION': f'Bearer {access_token}'}
+
+        response = api_client.get(url, **headers)
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['total_income'] == user_income.amount
+        assert response.data['total_expense'] == user_expenditure.estimatedAmount
+
+        # totals follow deletes
+        user_expenditure.delete()
+        response = api_client.get(url, **headers)
+        assert response.data['total_expense'] == 0
+
+    def test_get_user_conditional_get(self, api_client, user, access_token):
+        url = reverse('user_profile', args=[user.id])
+        headers = {'HTTP_AUTHORIZATION': f'Bearer {access_token}'}
+
+        # Last-Modified has whole seconds, it is only sent once the second of the last write is over
+        # (a little ahead, so that second is not over by the time of the request)
+        UserBalance.objects.filter(user=user).update(modified_at=timezone.now() + timedelta(seconds=2))
+        response = api_client.get(url, **headers)
+        assert response.status_code == status.HTTP_200_OK
+        assert not response.has_header('Last-Modified')
+        UserBalance.objects.filter(user=user).update(modified_at=timezone.now() - timedelta(seconds=5))
+
+        response = api_client.get(url, **headers)
+        assert 'Accept' in response['Vary']
+        etag, last_modified = response['ETag'], response['Last-Modified']
+
+        response = api_client.get(url, HTTP_IF_NONE_MATCH=etag, **headers)
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        response = api_client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified, **headers)
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+        # the browsable API is another representation, with an ETag of its own
+        response = api_client.get(url, HTTP_IF_NONE_MATCH=etag, HTTP_ACCEPT='text/html', **headers)
+        assert response.status_code == status.HTTP_200_OK
+        assert response['ETag'] != etag
+
+        # a write in the second of the client's Last-Modified is not hidden by it
+        UserBalance.objects.filter(user=user).update(modified_at=timezone.now())
+        response = api_client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified, **headers)
+        assert response.status_code == status.HTTP_200_OK
+
+        # updating the profile changes the version
+        api_client.put(url, data={'first_name': 'newfirst'}, format='json', **headers)
+        response = api_client.get(url, HTTP_IF_NONE_MATCH=etag, **headers)
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['first_name'] == 'newfirst'
+
     def test_get_user_no_authentication(self, api_client, user, access_token):
         url = reverse('user_profile', args=[user.id])
 
@@ -317,3 +420,32 @@ class TestUserProfileView:
             response = api_client.put(url, data=data, format='json', **headers)
             assert response.status_code == status.HTTP_400_BAD_REQUEST
             assert response.data['message'] == 'Invalid user data'
+
+
+class TestCachedJWTAuthentication:
+    list_url = reverse('list_create_incomes')
+
+    def test_repeated_requests_skip_the_user_query(self, api_client, user, access_token, django_assert_num_queries):
+        headers = {'HTTP_AUTHORIZATION': f'Bearer {access_token}'}
+        assert api_client.get(self.list_url, **headers).status_code == status.HTTP_200_OK
+
+        # only the version and the page of incomes are left
+        with django_assert_num_queries(2):
+            assert api_client.get(self.list_url, **headers).status_code == status.HTTP_200_OK
+
+    def test_saved_user_is_reloaded(self, api_client, user, access_token):
+        headers = {'HTTP_AUTHORIZATION': f'Bearer {access_token}'}
+        assert api_client.get(self.list_url, **headers).status_code == status.HTTP_200_OK
+
+        user.is_active = False
+        user.save()
+        response = api_client.get(self.list_url, **headers)
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+        user.delete()
+        response = api_client.get(self.list_url, **headers)
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    def test_invalid_token(self, api_client, access_token):
+        response = api_client.get(self.list_url, HTTP_AUTHORIZATION=f'Bearer {access_token}x')
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
@@ -1,8 +1,15 @@
+import random
 import pytest
+from decimal import Decimal
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+from apps.account.manager import LedgerQuerySet
 from apps.account.models import Expenditure
 from api.serializers.expenditure import UserExpenditureSerializer
+from mixer.backend.django import mixer
 
 pytestmark = pytest.mark.django_db
 
@@ -11,6 +18,7 @@ def mock_method(*arg, **kwargs):
 
 class TestUserExpenditure:
     list_create_url       = reverse('list_create_expenditures')
+    bulk_url              = reverse('bulk_expenditures')
 
     def test_expenditure_list_and_create_view(self, api_client, user):
         api_client.force_authenticate(user=user) # Authenticates the request
@@ -25,7 +33,175 @@ class TestUserExpenditure:
         # Get expenditure list
         response2 = api_client.get(self.list_create_url)
         assert response2.status_code == status.HTTP_200_OK
-        assert user.expenditures.count() == len(response2.data)
+        assert user.expenditures.count() == len(response2.data['results'])
+        assert response2.data['next'] is None
+        assert response2.data['previous'] is None
+
+    def test_expenditure_list_cursor_pagination(self, api_client, user):
+        api_client.force_authenticate(user=user) # Authenticates the request
+        expenditures = mixer.cycle(5).blend(Expenditure, user=user)
+        expected_ids = [str(e.id) for e in sorted(expenditures, key=lambda e: (e.created_at, str(e.id)), reverse=True)]
+
+        # Walk forward through all pages
+        seen_ids, pages, url = [], [], f'{self.list_create_url}?page_size=2'
+        while url:
+            response = api_client.get(url)
+            assert response.status_code == status.HTTP_200_OK
+            assert len(response.data['results']) <= 2
+            seen_ids += [item['id'] for item in response.data['results']]
+            pages.append(response.data)
+            url = response.data['next']
+        assert seen_ids == expected_ids
+        assert len(pages) == 3
+
+        # Walk back from the last page using the previous links
+        response = api_client.get(pages[-1]['previous'])
+        assert response.status_code == status.HTTP_200_OK
+        assert [item['id'] for item in response.data['results']] == expected_ids[2:4]
+        response = api_client.get(response.data['previous'])
+        assert [item['id'] for item in response.data['results']] == expected_ids[:2]
+        assert response.data['previous'] is None
+
+        # Other users' expenditures never show up
+        mixer.blend(Expenditure)
+        response = api_client.get(self.list_create_url)
+        assert [item['id'] for item in response.data['results']] == expected_ids
+
+    def test_expenditure_list_matches_serializer_output(self, api_client, user):
+        api_client.force_authenticate(user=user) # Authenticates the request
+        mixer.cycle(5).blend(Expenditure, user=user, estimatedAmount=lambda: Decimal(random.randrange(1, 10 ** 9)) / 100)
+
+        # the page is read with values(), but renders to the very same bytes
+        response = api_client.get(self.list_create_url)
+        expenditures = Expenditure.objects.filter(user=user).order_by('-created_at', '-id')
+        assert JSONRenderer().render(response.data['results']) == JSONRenderer().render(UserExpenditureSerializer(expenditures, many=True).data)
+
+    def test_expenditure_list_invalid_cursor(self, api_client, user):
+        api_client.force_authenticate(user=user) # Authenticates the request
+
+        response = api_client.get(f'{self.list_create_url}?cursor=invalid')
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_expenditure_list_conditional_get(self, api_client, user, django_assert_num_queries):
+        api_client.force_authenticate(user=user) # Authenticates the request
+        expenditure = mixer.blend(Expenditure, user=user)
+
+        response = api_client.get(self.list_create_url)
+        assert response.status_code == status.HTTP_200_OK
+        etag = response['ETag']
+
+        # unchanged data is answered from the stored version alone
+        with django_assert_num_queries(1):
+            response = api_client.get(self.list_create_url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        assert response.content == b''
+
+        # any write, even one leaving the totals alone, changes the version
+        Expenditure.objects.filter(pk=expenditure.pk).update(nameOfItem='renamed')
+        response = api_client.get(self.list_create_url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == status.HTTP_200_OK
+        assert response['ETag'] != etag
+
+        response = api_client.post(self.list_create_url, data={'category': 'food', 'nameOfItem': 'rice', 'estimatedAmount': 10.0}, format='json')
+        response = api_client.get(self.list_create_url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == status.HTTP_200_OK
+        assert len(response.data['results']) == 2
+
+    def test_expenditure_bulk_create(self, api_client, user):
+        api_client.force_authenticate(user=user) # Authenticates the request
+        data = [
+            {'category': 'food', 'nameOfItem': f'item {i}', 'estimatedAmount': 10.5 * i}
+            for i in range(1, 51)
+        ]
+
+        with CaptureQueriesContext(connection) as queries:
+            response = api_client.post(self.bulk_url, data=data, format='json')
+        assert response.status_code == status.HTTP_201_CREATED
+        assert [item['nameOfItem'] for item in response.data] == [item['nameOfItem'] for item in data]
+        assert all(item['id'] for item in response.data)
+        assert user.expenditures.count() == 50
+        assert user.balance.expense_count == 50
+
+        # all rows went in with a single INSERT
+        inserts = [q['sql'] for q in queries.captured_queries if q['sql'].startswith('INSERT INTO "account_expenditure"')]
+        assert len(inserts) == 1
+
+    def test_expenditure_bulk_create_invalid_items(self, api_client, user):
+        api_client.force_authenticate(user=user) # Authenticates the request
+        data = [
+            {'category': 'food', 'nameOfItem': 'rice', 'estimatedAmount': 10},
+            {'category': 'food', 'estimatedAmount': -5},
+        ]
+
+        response = api_client.post(self.bulk_url, data=data, format='json')
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert response.data['message'] == 'Invalid expenditure data'
+        assert response.data['errors'][0] == {}
+        assert set(response.data['errors'][1]) == {'nameOfItem', 'estimatedAmount'}
+
+        # nothing was created
+        assert user.expenditures.count() == 0
+
+        # an empty list or a single object is rejected too
+        for data in ([], {'category': 'food', 'nameOfItem': 'rice', 'estimatedAmount': 10}):
+            response = api_client.post(self.bulk_url, data=data, format='json')
+            assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert user.expenditures.count() == 0
+
+    def test_expenditure_bulk_update_and_delete(self, api_client, user):
+        api_client.force_authenticate(user=user) # Authenticates the request
+        expenditures = mixer.cycle(4).blend(Expenditure, user=user, category='food', estimatedAmount=10)
+        other_users_expenditure = mixer.blend(Expenditure, category='food')
+        missing_id = '76581097-8da1-45e5-bbba-fe7ee51f61b7'
+        ids = [str(e.id) for e in expenditures[:3]]
+
+        # Re-categorise three expenditures, the other user's one and the missing ID are reported as not found
+        data = {'ids': ids + [str(other_users_expenditure.id), missing_id], 'data': {'category': 'groceries', 'estimatedAmount': 20}}
+        with CaptureQueriesContext(connection) as queries:
+            response = api_client.patch(self.bulk_url, data=data, format='json')
+        assert response.status_code == status.HTTP_200_OK
+        assert sorted(map(str, response.data['updated'])) == sorted(ids)
+        assert list(map(str, response.data['not_found'])) == [str(other_users_expenditure.id), missing_id]
+        assert user.expenditures.filter(category='groceries', estimatedAmount=20).count() == 3
+        assert Expenditure.objects.get(pk=other_users_expenditure.id).category == 'food'
+        assert user.balance.total_expense == 70
+        # the ids come from the read of the values the aggregates hold, then one scoped UPDATE runs
+        statements = [q['sql'] for q in queries.captured_queries if '"account_expenditure"' in q['sql'].split('WHERE')[0]]
+        assert [sql.split()[0] for sql in statements] == ['SELECT', 'UPDATE']
+        assert all('"user_id" = ' in sql.split('WHERE')[1] for sql in statements)
+
+        # Delete them
+        with CaptureQueriesContext(connection) as queries:
+            response = api_client.delete(self.bulk_url, data={'ids': ids + [missing_id]}, format='json')
+        assert response.status_code == status.HTTP_200_OK
+        assert sorted(map(str, response.data['deleted'])) == sorted(ids)
+        assert list(map(str, response.data['not_found'])) == [missing_id]
+        assert list(user.expenditures.values_list('id', flat=True)) == [expenditures[3].id]
+        statements = [q['sql'] for q in queries.captured_queries if '"account_expenditure"' in q['sql'].split('WHERE')[0]]
+        assert [sql.split()[0] for sql in statements] == ['SELECT', 'DELETE']
+        assert all('"user_id" = ' in sql.split('WHERE')[1] for sql in statements)
+        assert Expenditure.objects.filter(pk=other_users_expenditure.id).exists()
+
+    def test_expenditure_bulk_update_and_delete_invalid_data(self, api_client, user, user_expenditure):
+        api_client.force_authenticate(user=user) # Authenticates the request
+
+        for data in (
+            {'ids': [str(user_expenditure.id)], 'data': {'estimatedAmount': -1}}, # invalid amount
+            {'ids': [str(user_expenditure.id)], 'data': {}},                      # nothing to update
+            {'ids': [str(user_expenditure.id)], 'data': {'unknown': 'field'}},    # nothing to update
+            {'ids': ['9999'], 'data': {'category': 'bills'}},                     # invalid ID
+            {'ids': [], 'data': {'category': 'bills'}},                           # no IDs
+        ):
+            response = api_client.patch(self.bulk_url, data=data, format='json')
+            assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+        response = api_client.delete(self.bulk_url, data={'ids': ['9999']}, format='json')
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert Expenditure.objects.get(pk=user_expenditure.id).category == 'transport'
+
+    def test_expenditure_bulk_create_no_authentication(self, api_client):
+        response = api_client.post(self.bulk_url, data=[], format='json')
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
 
     def test_expenditure_retrieve_update_and_delete_successful_requests(self, api_client, user, user_expenditure):
         api_client.force_authenticate(user=user) # Authenticates the request
@@ -93,6 +269,50 @@ class TestUserExpenditure:
         assert response.status_code == status.HTTP_404_NOT_FOUND
         assert response.data['message'] == 'Expenditure not found'
 
+    def test_expenditure_update_and_delete_are_scoped_to_the_user(self, api_client, user, user_expenditure):
+        api_client.force_authenticate(user=user) # Authenticates the request
+        url = reverse('retrieve_get_update_delete_expenditure', args=[user_expenditure.id])
+        other_users_expenditure = mixer.blend(Expenditure)
+        other_url = reverse('retrieve_get_update_delete_expenditure', args=[other_users_expenditure.id])
+
+        with CaptureQueriesContext(connection) as queries:
+            response = api_client.put(url, data={'nameOfItem': 'Bread'}, format='json')
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data == {
+            'category': user_expenditure.category, 'nameOfItem': 'Bread',
+            'estimatedAmount': UserExpenditureSerializer(user_expenditure).data['estimatedAmount'],
+        }
+
+        # one read of the values the aggregates hold for the row of the user, then one UPDATE
+        # of that row, writing only the sent column and the modification time
+        statements = [q['sql'] for q in queries.captured_queries if '"account_expenditure"' in q['sql'].split('WHERE')[0]]
+        assert [sql.split()[0] for sql in statements] == ['SELECT', 'UPDATE']
+        assert all('"user_id" = ' in sql.split('WHERE')[1] for sql in statements)
+        updates = statements[1:]
+        assert '"user_id" = ' in updates[0]
+        assert '"nameOfItem"' in updates[0] and '"estimatedAmount"' not in updates[0].split('WHERE')[0]
+
+        # an invalid payload is rejected before any write
+        with CaptureQueriesContext(connection) as queries:
+            response = api_client.put(url, data={'estimatedAmount': -5}, format='json')
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert not [q for q in queries.captured_queries if q['sql'].startswith('UPDATE')]
+
+        # the rows of other users are neither updated nor deleted
+        assert api_client.put(other_url, data={'nameOfItem': 'Bread'}, format='json').status_code == status.HTTP_404_NOT_FOUND
+        assert api_client.delete(other_url).status_code == status.HTTP_404_NOT_FOUND
+        other_users_expenditure.refresh_from_db()
+        assert other_users_expenditure.nameOfItem != 'Bread'
+
+        with CaptureQueriesContext(connection) as queries:
+            response = api_client.delete(url)
+        assert response.status_code == status.HTTP_200_OK
+        deletes = [q['sql'] for q in queries.captured_queries if q['sql'].startswith('DELETE FROM "account_expenditure"')]
+        assert len(deletes) == 1 and '"user_id" = ' in deletes[0]
+        assert not Expenditure.objects.filter(pk=user_expenditure.pk).exists()
+        user.balance.refresh_from_db()
+        assert user.balance.expense_count == 0
+
     def test_expenditure_update_exception_raised_when_serializing(self, mocker, api_client, user, user_expenditure):
         api_client.force_authenticate(user=user) # Authenticates the request
         url = reverse('retrieve_get_update_delete_expenditure', args=[user_expenditure.id])
@@ -109,7 +329,39 @@ class TestUserExpenditure:
         url = reverse('retrieve_get_update_delete_expenditure', args=[user_expenditure.id])
         
         # Checking if error during expenditure delete is been handled
-        with mocker.patch.object(Expenditure, 'delete', side_effect=mock_method):
+        with mocker.patch.object(LedgerQuerySet, 'delete', side_effect=mock_method):
             response = api_client.delete(url)
             assert response.status_code == status.HTTP_400_BAD_REQUEST
             assert response.data['message'] == 'Error deleting expenditure!'
+
+
+class TestAsyncUserExpenditure:
+    list_create_url = reverse('list_create_expenditures')
+
+    def detail_url(self, pk):
+        return reverse('retrieve_get_update_delete_expenditure', args=[pk])
+
+    def test_async_expenditure_views(self, async_views, api_client, user, access_token):
+        api_client.credentials(HTTP_AUTHORIZATION=f'Bearer {access_token}')
+        other_users_expenditure = mixer.blend(Expenditure)
+
+        response = api_client.post(self.list_create_url, data={'category': 'bills', 'nameOfItem': 'light', 'estimatedAmount': 120.5}, format='json')
+        assert response.status_code == status.HTTP_201_CREATED
+        expenditure = Expenditure.objects.get(pk=response.data['id'])
+        assert user.balance.total_expense == expenditure.estimatedAmount
+
+        response = api_client.get(self.list_create_url)
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['results'] == UserExpenditureSerializer([expenditure], many=True).data
+        assert api_client.get(self.detail_url(expenditure.id)).data == UserExpenditureSerializer(expenditure).data
+
+        response = api_client.put(self.detail_url(expenditure.id), data={'category': 'food'}, format='json')
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['category'] == 'food'
+        assert api_client.put(self.detail_url(other_users_expenditure.id), data={'category': 'food'}, format='json').status_code == status.HTTP_404_NOT_FOUND
+
+        assert api_client.delete(self.detail_url(other_users_expenditure.id)).status_code == status.HTTP_404_NOT_FOUND
+        response = api_client.delete(self.detail_url(expenditure.id))
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['message'] == 'Expenditure deleted successfully!'
+        assert list(Expenditure.objects.values_list('pk', flat=True)) == [other_users_expenditure.pk]
@@ -1,8 +1,14 @@
+import asyncio
+import random
 import pytest
-from django.urls import reverse
+from decimal import Decimal
+from django.urls import resolve, reverse
 from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+from apps.account.manager import LedgerQuerySet
 from apps.account.models import Income
 from api.serializers.income import UserIncomeSerializer
+from mixer.backend.django import mixer
 
 pytestmark = pytest.mark.django_db
 
@@ -11,6 +17,7 @@ def mock_method(*arg, **kwargs):
 
 class TestUserIncome:
     list_create_url       = reverse('list_create_incomes')
+    bulk_url              = reverse('bulk_incomes')
 
     def test_income_list_and_create_view(self, api_client, user):
         api_client.force_authenticate(user=user) # Authenticates the request
@@ -24,7 +31,114 @@ class TestUserIncome:
         # Get income list
         response2 = api_client.get(self.list_create_url)
         assert response2.status_code == status.HTTP_200_OK
-        assert user.incomes.count() == len(response2.data)
+        assert user.incomes.count() == len(response2.data['results'])
+        assert response2.data['next'] is None
+        assert response2.data['previous'] is None
+
+    def test_income_list_cursor_pagination(self, api_client, user):
+        api_client.force_authenticate(user=user) # Authenticates the request
+        incomes = mixer.cycle(5).blend(Income, user=user)
+        expected_ids = [str(i.id) for i in sorted(incomes, key=lambda i: (i.created_at, str(i.id)), reverse=True)]
+
+        # Walk forward through all pages
+        seen_ids, url = [], f'{self.list_create_url}?page_size=2'
+        while url:
+            response = api_client.get(url)
+            assert response.status_code == status.HTTP_200_OK
+            seen_ids += [item['id'] for item in response.data['results']]
+            url = response.data['next']
+        assert seen_ids == expected_ids
+
+        # The previous link of the second page leads back to the first page
+        response = api_client.get(f'{self.list_create_url}?page_size=3')
+        assert [item['id'] for item in response.data['results']] == expected_ids[:3]
+        response = api_client.get(response.data['next'])
+        assert [item['id'] for item in response.data['results']] == expected_ids[3:]
+        response = api_client.get(response.data['previous'])
+        assert [item['id'] for item in response.data['results']] == expected_ids[:3]
+
+    def test_income_list_matches_serializer_output(self, api_client, user):
+        api_client.force_authenticate(user=user) # Authenticates the request
+        mixer.cycle(5).blend(Income, user=user, amount=lambda: Decimal(random.randrange(1, 10 ** 9)) / 100)
+
+        # the page is read with values(), but renders to the very same bytes
+        response = api_client.get(f'{self.list_create_url}?page_size=3')
+        incomes = Income.objects.filter(user=user).order_by('-created_at', '-id')[:3]
+        assert JSONRenderer().render(response.data['results']) == JSONRenderer().render(UserIncomeSerializer(incomes, many=True).data)
+
+        response = api_client.get(response.data['next'])
+        assert [item['id'] for item in response.data['results']] == [str(i.id) for i in Income.objects.filter(user=user).order_by('-created_at', '-id')[3:]]
+
+    def test_income_list_invalid_cursor(self, api_client, user):
+        api_client.force_authenticate(user=user) # Authenticates the request
+
+        response = api_client.get(f'{self.list_create_url}?cursor=invalid')
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_income_list_conditional_get(self, api_client, user, django_assert_num_queries):
+        api_client.force_authenticate(user=user) # Authenticates the request
+        income = mixer.blend(Income, user=user)
+
+        response = api_client.get(self.list_create_url)
+        assert response.status_code == status.HTTP_200_OK
+        etag = response['ETag']
+
+        # unchanged data is answered from the stored version alone
+        with django_assert_num_queries(1):
+            response = api_client.get(self.list_create_url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        assert response.content == b''
+
+        # any write, even one leaving the totals alone, changes the version
+        Income.objects.filter(pk=income.pk).update(nameOfRevenue='renamed')
+        response = api_client.get(self.list_create_url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == status.HTTP_200_OK
+        assert response['ETag'] != etag
+
+        response = api_client.post(self.list_create_url, data={'nameOfRevenue': 'Salary', 'amount': 5000.0}, format='json')
+        response = api_client.get(self.list_create_url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == status.HTTP_200_OK
+        assert len(response.data['results']) == 2
+
+    def test_income_bulk_create(self, api_client, user):
+        api_client.force_authenticate(user=user) # Authenticates the request
+        data = [{'nameOfRevenue': f'Revenue {i}', 'amount': 100 * i} for i in range(1, 11)]
+
+        response = api_client.post(self.bulk_url, data=data, format='json')
+        assert response.status_code == status.HTTP_201_CREATED
+        assert [item['nameOfRevenue'] for item in response.data] == [item['nameOfRevenue'] for item in data]
+        assert user.incomes.count() == 10
+        assert user.balance.total_income == sum(item['amount'] for item in data)
+
+    def test_income_bulk_create_invalid_items(self, api_client, user):
+        api_client.force_authenticate(user=user) # Authenticates the request
+        data = [{'nameOfRevenue': 'Salary', 'amount': 5000}, {'nameOfRevenue': 'Bonus'}]
+
+        response = api_client.post(self.bulk_url, data=data, format='json')
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert response.data['message'] == 'Invalid income data'
+        assert response.data['errors'][0] == {}
+        assert 'amount' in response.data['errors'][1]
+        assert user.incomes.count() == 0
+
+    def test_income_bulk_update_and_delete(self, api_client, user):
+        api_client.force_authenticate(user=user) # Authenticates the request
+        incomes = mixer.cycle(3).blend(Income, user=user, amount=100)
+        other_users_income = mixer.blend(Income)
+        ids = [str(i.id) for i in incomes[:2]]
+
+        response = api_client.patch(self.bulk_url, data={'ids': ids + [str(other_users_income.id)], 'data': {'nameOfRevenue': 'Dividends'}}, format='json')
+        assert response.status_code == status.HTTP_200_OK
+        assert sorted(map(str, response.data['updated'])) == sorted(ids)
+        assert list(map(str, response.data['not_found'])) == [str(other_users_income.id)]
+        assert user.incomes.filter(nameOfRevenue='Dividends').count() == 2
+
+        response = api_client.delete(self.bulk_url, data={'ids': ids + [str(other_users_income.id)]}, format='json')
+        assert response.status_code == status.HTTP_200_OK
+        assert sorted(map(str, response.data['deleted'])) == sorted(ids)
+        assert user.incomes.count() == 1
+        assert user.balance.total_income == 100
+        assert Income.objects.filter(pk=other_users_income.id).exists()
 
     def test_income_retrieve_update_and_delete_successful_requests(self, api_client, user, user_income):
         api_client.force_authenticate(user=user) # Authenticates the request
@@ -106,7 +220,69 @@ class TestUserIncome:
         url = reverse('retrieve_get_update_delete_income', args=[user_income.id])
         
         # Checking if error during income delete is been handled
-        with mocker.patch.object(Income, 'delete', side_effect=mock_method):
+        with mocker.patch.object(LedgerQuerySet, 'delete', side_effect=mock_method):
             response = api_client.delete(url)
             assert response.status_code == status.HTTP_400_BAD_REQUEST
             assert response.data['message'] == 'Error deleting income!'
+
+
+class TestAsyncUserIncome:
+    list_create_url = reverse('list_create_incomes')
+
+    def detail_url(self, pk):
+        return reverse('retrieve_get_update_delete_income', args=[pk])
+
+    def test_async_income_list_and_retrieve(self, async_views, api_client, user, access_token):
+        assert asyncio.iscoroutinefunction(resolve(self.list_create_url).func)
+        api_client.credentials(HTTP_AUTHORIZATION=f'Bearer {access_token}')
+        incomes = sorted(mixer.cycle(3).blend(Income, user=user), key=lambda i: (i.created_at, str(i.id)), reverse=True)
+        other_users_income = mixer.blend(Income)
+
+        response = api_client.get(f'{self.list_create_url}?page_size=2')
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['results'] == UserIncomeSerializer(incomes[:2], many=True).data
+        response = api_client.get(response.data['next'])
+        assert [item['id'] for item in response.data['results']] == [str(incomes[2].id)]
+
+        # unchanged data is answered from the stored version alone
+        etag = response['ETag']
+        response = api_client.get(self.list_create_url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+        response = api_client.get(self.detail_url(incomes[0].id))
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data == UserIncomeSerializer(incomes[0]).data
+        assert api_client.get(self.detail_url(other_users_income.id)).status_code == status.HTTP_404_NOT_FOUND
+        assert api_client.get(self.detail_url('invalid')).status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_async_income_create_update_and_delete(self, async_views, api_client, user, access_token):
+        api_client.credentials(HTTP_AUTHORIZATION=f'Bearer {access_token}')
+
+        response = api_client.post(self.list_create_url, data={'nameOfRevenue': 'Salary', 'amount': 5000.0}, format='json')
+        assert response.status_code == status.HTTP_201_CREATED
+        income_id = response.data['id']
+        assert user.balance.total_income == 5000
+
+        response = api_client.post(self.list_create_url, data={'nameOfRevenue': 'Salary'}, format='json')
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert 'amount' in response.data['validations']
+
+        response = api_client.put(self.detail_url(income_id), data={'amount': 4000}, format='json')
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json() == {'nameOfRevenue': 'Salary', 'amount': 4000.0}
+
+        response = api_client.delete(self.detail_url(income_id))
+        assert response.status_code == status.HTTP_200_OK
+        assert not Income.objects.filter(pk=income_id).exists()
+        user.balance.refresh_from_db()
+        assert (user.balance.total_income, user.balance.income_count) == (0, 0)
+
+    def test_async_income_no_authentication(self, async_views, api_client, user_income):
+        response = api_client.get(self.list_create_url)
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+        assert response.data['detail'] == 'Authentication credentials were not provided.'
+
+        api_client.credentials(HTTP_AUTHORIZATION='Bearer invalid')
+        response = api_client.delete(reverse('retrieve_get_update_delete_income', args=[user_income.id]))
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+        assert Income.objects.filter(pk=user_income.pk).exists()
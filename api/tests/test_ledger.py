@@ -0,0 +1,347 @@
+import csv
+import io
+import json
+import pytest
+import tempfile
+from asgiref.sync import async_to_sync
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from django.conf import settings
+from django.core.asgi import get_asgi_application
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.signals import request_started
+from django.db import close_old_connections
+from django.http import FileResponse
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from api.views.ledger import LedgerExportView
+from apps.account.models import DailyRollup, Expenditure, Income, UserBalance
+from mixer.backend.django import mixer
+
+pytestmark = pytest.mark.django_db
+
+
+class TestLedgerExport:
+    export_url = reverse('export_ledger')
+
+    @pytest.fixture
+    def ledger(self, user):
+        now = timezone.now()
+        income = mixer.blend(Income, user=user, nameOfRevenue='Salary', amount=Decimal('5000.00'))
+        expenditure = mixer.blend(Expenditure, user=user, category='bills', nameOfItem='light', estimatedAmount=Decimal('120.50'))
+        old_expenditure = mixer.blend(Expenditure, user=user, category='food', nameOfItem='rice', estimatedAmount=Decimal('10.00'))
+        Income.objects.filter(pk=income.pk).update(created_at=now - timedelta(days=1))
+        Expenditure.objects.filter(pk=expenditure.pk).update(created_at=now)
+        Expenditure.objects.filter(pk=old_expenditure.pk).update(created_at=now - timedelta(days=10))
+        mixer.blend(Expenditure) # another user's expenditure
+        return [old_expenditure, income, expenditure]
+
+    def read(self, response):
+        assert response.streaming
+        return b''.join(response.streaming_content).decode()
+
+    def test_export_csv(self, api_client, user, ledger):
+        api_client.force_authenticate(user=user) # Authenticates the request
+
+        response = api_client.get(self.export_url, HTTP_ACCEPT='text/csv')
+        assert response.status_code == status.HTTP_200_OK
+        assert response['Content-Type'].startswith('text/csv')
+        assert response['Content-Disposition'] == 'attachment; filename="ledger.csv"'
+
+        rows = list(csv.DictReader(io.StringIO(self.read(response))))
+        assert [row['id'] for row in rows] == [str(entry.id) for entry in ledger]
+        assert [row['kind'] for row in rows] == ['expenditure', 'income', 'expenditure']
+        assert rows[1] == {
+            'kind': 'income',
+            'id': str(ledger[1].id),
+            'created_at': rows[1]['created_at'],
+            'category': '',
+            'name': 'Salary',
+            'amount': '5000.00',
+        }
+        assert rows[2]['category'] == 'bills'
+        assert rows[2]['amount'] == '120.50'
+
+    def test_export_ndjson(self, api_client, user, ledger):
+        api_client.force_authenticate(user=user) # Authenticates the request
+
+        response = api_client.get(f'{self.export_url}?format=ndjson')
+        assert response.status_code == status.HTTP_200_OK
+        assert response['Content-Type'] == 'application/x-ndjson'
+
+        rows = [json.loads(line) for line in self.read(response).splitlines()]
+        assert [row['id'] for row in rows] == [str(entry.id) for entry in ledger]
+        assert rows[2]['amount'] == 120.5
+        assert rows[2]['name'] == 'light'
+
+    def test_export_filters(self, api_client, user, ledger):
+        api_client.force_authenticate(user=user) # Authenticates the request
+        today = timezone.now().date()
+
+        # date range
+        response = api_client.get(self.export_url, {'format': 'ndjson', 'start': today - timedelta(days=2), 'end': today})
+        rows = [json.loads(line) for line in self.read(response).splitlines()]
+        assert [row['id'] for row in rows] == [str(ledger[1].id), str(ledger[2].id)]
+
+        # kind
+        response = api_client.get(self.export_url, {'format': 'ndjson', 'kind': 'expenditure'})
+        rows = [json.loads(line) for line in self.read(response).splitlines()]
+        assert [row['id'] for row in rows] == [str(ledger[0].id), str(ledger[2].id)]
+
+        # empty CSV exports still have their header
+        response = api_client.get(self.export_url, {'format': 'csv', 'start': today + timedelta(days=1)})
+        assert self.read(response).strip() == 'kind,id,created_at,category,name,amount'
+
+    def test_export_invalid_query(self, api_client, user):
+        api_client.force_authenticate(user=user) # Authenticates the request
+
+        response = api_client.get(self.export_url, {'format': 'csv', 'start': '2023-02-01', 'end': '2023-01-01'})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert response['Content-Type'] == 'application/json'
+
+        response = api_client.get(self.export_url, {'kind': 'refunds'})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert 'kind' in response.data['validations']
+
+        response = api_client.get(self.export_url, HTTP_ACCEPT='application/xml')
+        assert response.status_code == status.HTTP_406_NOT_ACCEPTABLE
+
+    def test_export_no_authentication(self, api_client):
+        response = api_client.get(self.export_url)
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+        assert response.data['detail'] == 'Authentication credentials were not provided.'
+
+    def test_export_async_views(self, async_views, api_client, user, ledger, monkeypatch):
+        # spooled to a file, which only keeps its first bytes in memory, and streamed from it
+        spools = []
+
+        class Spool(tempfile.SpooledTemporaryFile):
+            def __init__(self, *args, **kwargs):
+                super().__init__(*args, **kwargs)
+                spools.append(self)
+
+        monkeypatch.setattr(LedgerExportView, 'spool_size', 100)
+        monkeypatch.setattr(tempfile, 'SpooledTemporaryFile', Spool)
+        api_client.force_authenticate(user=user) # Authenticates the request
+        response = api_client.get(self.export_url, HTTP_ACCEPT='text/csv')
+
+        assert isinstance(response, FileResponse)
+        assert spools[0]._rolled
+        assert response['Content-Disposition'] == 'attachment; filename="ledger.csv"'
+        rows = list(csv.DictReader(io.StringIO(self.read(response))))
+        assert [row['id'] for row in rows] == [str(entry.id) for entry in ledger]
+
+    def test_export_under_asgi(self, async_views, user, ledger, access_token):
+        # through the ASGI handler itself, which sends the body from the event loop, unlike AsyncClient
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET', 'scheme': 'http',
+            'path': self.export_url, 'query_string': b'format=ndjson', 'server': ('testserver', 80),
+            'headers': [(b'host', b'testserver'), (b'authorization', f'Bearer {access_token}'.encode())],
+        }
+        messages = []
+
+        async def receive():
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+        async def send(message):
+            messages.append(message)
+
+        # as the test client does, keep the test's connection open across the request
+        request_started.disconnect(close_old_connections)
+        try:
+            async_to_sync(get_asgi_application())(scope, receive, send)
+        finally:
+            request_started.connect(close_old_connections)
+
+        assert messages[0]['status'] == status.HTTP_200_OK
+        body = b''.join(message.get('body', b'') for message in messages[1:]).decode()
+        assert [json.loads(line)['id'] for line in body.splitlines()] == [str(entry.id) for entry in ledger]
+
+
+class TestLedgerSummary:
+    summary_url = reverse('summarize_ledger')
+
+    @pytest.fixture
+    def ledger(self, user):
+        entries = [
+            (Expenditure, {'category': 'food', 'nameOfItem': 'rice', 'estimatedAmount': Decimal('10.00')}, '2023-01-02T10:00:00Z'),
+            (Expenditure, {'category': 'food', 'nameOfItem': 'beans', 'estimatedAmount': Decimal('5.50')}, '2023-01-31T23:59:00Z'),
+            (Expenditure, {'category': 'bills', 'nameOfItem': 'light', 'estimatedAmount': Decimal('120.00')}, '2023-01-15T08:00:00Z'),
+            (Expenditure, {'category': 'food', 'nameOfItem': 'bread', 'estimatedAmount': Decimal('2.00')}, '2023-02-01T00:00:00Z'),
+            (Income, {'nameOfRevenue': 'Salary', 'amount': Decimal('5000.00')}, '2023-01-28T09:00:00Z'),
+            (Income, {'nameOfRevenue': 'Bonus', 'amount': Decimal('250.00')}, '2023-02-03T09:00:00Z'),
+        ]
+        for model, fields, created_at in entries:
+            entry = mixer.blend(model, user=user, **fields)
+            model.objects.filter(pk=entry.pk).update(created_at=created_at)
+        mixer.blend(Expenditure, category='food') # another user's expenditure
+
+    def test_summary_by_month(self, api_client, user, ledger):
+        api_client.force_authenticate(user=user) # Authenticates the request
+
+        response = api_client.get(self.summary_url)
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json() == {
+            'granularity': 'month',
+            'income': [
+                {'period': '2023-01-01', 'total': 5000.0, 'count': 1},
+                {'period': '2023-02-01', 'total': 250.0, 'count': 1},
+            ],
+            'expenditure': [
+                {'period': '2023-01-01', 'total': 120.0, 'count': 1, 'category': 'bills'},
+                {'period': '2023-01-01', 'total': 15.5, 'count': 2, 'category': 'food'},
+                {'period': '2023-02-01', 'total': 2.0, 'count': 1, 'category': 'food'},
+            ],
+        }
+
+    def test_summary_filters(self, api_client, user, ledger):
+        api_client.force_authenticate(user=user) # Authenticates the request
+
+        response = api_client.get(self.summary_url, {'granularity': 'week', 'kind': 'expenditure', 'start': '2023-01-10', 'end': '2023-01-31'})
+        assert response.status_code == status.HTTP_200_OK
+        assert 'income' not in response.data
+        assert [(row['period'], row['category'], row['total']) for row in response.json()['expenditure']] == [
+            ('2023-01-09', 'bills', 120.0),
+            ('2023-01-30', 'food', 5.5),
+        ]
+
+        response = api_client.get(self.summary_url, {'granularity': 'day', 'kind': 'income'})
+        assert [row['period'] for row in response.json()['income']] == ['2023-01-28', '2023-02-03']
+
+    def test_summary_is_one_query(self, api_client, user, ledger, django_assert_num_queries):
+        api_client.force_authenticate(user=user) # Authenticates the request
+
+        # the user's version for the ETag, then the summary itself
+        with django_assert_num_queries(2):
+            api_client.get(self.summary_url)
+
+    def test_summary_invalid_query(self, api_client, user):
+        api_client.force_authenticate(user=user) # Authenticates the request
+
+        response = api_client.get(self.summary_url, {'granularity': 'year'})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert 'granularity' in response.data['validations']
+
+    def test_summary_no_authentication(self, api_client):
+        response = api_client.get(self.summary_url)
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+class TestLedgerImport:
+    import_url = reverse('import_ledger')
+
+    def upload(self, api_client, name, content, **data):
+        return api_client.post(self.import_url, {'file': SimpleUploadedFile(name, content.encode()), **data}, format='multipart')
+
+    def test_import_csv(self, api_client, user, settings):
+        settings.IMPORT_BATCH_SIZE = 2
+        api_client.force_authenticate(user=user) # Authenticates the request
+
+        content = (
+            'kind,id,created_at,category,name,amount\n'
+            'income,,,,Salary,5000.00\n'
+            'expenditure,,,bills,light,120.50\n'
+            'expenditure,,,,chips,3\n'
+            'expenditure,,,food,rice,abc\n'
+            'refund,,,,Shoes,20\n'
+            'expenditure,,,food,"beans, black",10\n'
+        )
+        response = self.upload(api_client, 'statement.csv', content)
+        assert response.status_code == status.HTTP_200_OK
+        assert (response.data['rows'], response.data['created'], response.data['failed']) == (6, 3, 3)
+        assert [error['row'] for error in response.data['errors']] == [4, 5, 6]
+        assert 'category' in response.data['errors'][0]['errors']
+        assert 'estimatedAmount' in response.data['errors'][1]['errors']
+        assert 'kind' in response.data['errors'][2]['errors']
+        assert response.data['rows_per_second'] > 0
+
+        assert list(Income.objects.filter(user=user).values_list('nameOfRevenue', 'amount')) == [('Salary', Decimal('5000.00'))]
+        assert sorted(Expenditure.objects.filter(user=user).values_list('nameOfItem', flat=True)) == ['beans, black', 'light']
+
+        balance = UserBalance.objects.get(user=user)
+        assert (balance.total_income, balance.total_expense, balance.expense_count) == (Decimal('5000.00'), Decimal('130.50'), 2)
+
+    def test_import_created_at(self, api_client, user):
+        api_client.force_authenticate(user=user) # Authenticates the request
+        today = timezone.localdate()
+
+        content = (
+            'kind,id,created_at,category,name,amount\n'
+            'income,,2023-03-25T20:41:00Z,,Salary,5000.00\n'
+            'expenditure,,2023-03-26 09:00,food,rice,10\n'
+            'expenditure,,,food,beans,5\n'
+            'expenditure,,yesterday,food,chips,3\n'
+        )
+        response = self.upload(api_client, 'statement.csv', content)
+        assert response.status_code == status.HTTP_200_OK
+        assert (response.data['created'], response.data['failed']) == (3, 1)
+        assert response.data['errors'][0]['row'] == 5
+        assert 'created_at' in response.data['errors'][0]['errors']
+
+        # dated by the file, naive times in the current time zone, or at the time of the import
+        assert Income.objects.get(user=user).created_at == datetime(2023, 3, 25, 20, 41, tzinfo=dt_timezone.utc)
+        assert Expenditure.objects.get(user=user, nameOfItem='rice').created_at == timezone.make_aware(datetime(2023, 3, 26, 9))
+        assert timezone.localdate(Expenditure.objects.get(user=user, nameOfItem='beans').created_at) == today
+
+        # and added to the rollups of those days
+        assert sorted(DailyRollup.objects.filter(user=user).values_list('day', 'kind', 'total')) == [
+            (date(2023, 3, 25), 'income', Decimal('5000.00')),
+            (date(2023, 3, 26), 'expense', Decimal('10.00')),
+            (today, 'expense', Decimal('5.00')),
+        ]
+
+    def test_import_ndjson(self, api_client, user):
+        api_client.force_authenticate(user=user) # Authenticates the request
+
+        content = (
+            '{"category": "food", "name": "rice", "amount": 10.5}\n'
+            '\n'
+            'not json\n'
+            '{"category": "bills", "name": "water"}\n'
+        )
+        response = self.upload(api_client, 'statement.txt', content, format='ndjson', kind='expenditure')
+        assert response.status_code == status.HTTP_200_OK
+        assert (response.data['rows'], response.data['created'], response.data['failed']) == (3, 1, 2)
+        assert [error['row'] for error in response.data['errors']] == [3, 4]
+        assert Expenditure.objects.get(user=user).estimatedAmount == Decimal('10.50')
+
+        # a kind that is not a string is rejected with its row
+        response = self.upload(api_client, 'statement.ndjson', '{"kind": ["income"], "name": "Salary", "amount": 5}\n')
+        assert response.status_code == status.HTTP_200_OK
+        assert (response.data['failed'], response.data['errors'][0]['row']) == (1, 1)
+        assert 'kind' in response.data['errors'][0]['errors']
+
+    def test_import_unreadable_file(self, api_client, user, settings):
+        settings.IMPORT_BATCH_SIZE = 1
+        api_client.force_authenticate(user=user) # Authenticates the request
+
+        content = b'kind,category,name,amount\nexpenditure,food,rice,10\nexpenditure,food,caf\xe9,3\nexpenditure,food,beans,5\n'
+        response = api_client.post(self.import_url, {'file': SimpleUploadedFile('statement.csv', content)}, format='multipart')
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert response.data['line'] == 3
+        assert response.data['errors']['file'] == ['Line 3: The file is not valid UTF-8.']
+        assert (response.data['report']['rows'], response.data['report']['created']) == (1, 1)
+        assert list(Expenditure.objects.filter(user=user).values_list('nameOfItem', flat=True)) == ['rice']
+
+        # lines the csv module cannot parse
+        content = f'kind,category,name,amount\nexpenditure,food,beans,5\nexpenditure,food,{"x" * 200000},3\n'
+        response = self.upload(api_client, 'statement.csv', content)
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert response.data['line'] == 3
+        assert response.data['report']['created'] == 1
+
+    def test_import_invalid_upload(self, api_client, user):
+        api_client.force_authenticate(user=user) # Authenticates the request
+
+        response = self.upload(api_client, 'statement.xlsx', 'kind,name\n')
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert 'format' in response.data['errors']
+
+        response = api_client.post(self.import_url, {}, format='multipart')
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert 'file' in response.data['errors']
+
+    def test_import_no_authentication(self, api_client):
+        response = self.upload(api_client, 'statement.csv', 'kind,name,amount\n')
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
@@ -0,0 +1,100 @@
+import pytest
+from decimal import Decimal
+from types import SimpleNamespace
+from django.core.files.uploadedfile import SimpleUploadedFile
+from rest_framework import status
+import api.urls
+from apps.account.models import Expenditure, Income
+
+pytestmark = pytest.mark.django_db
+
+# Rows of each kind in the user's ledger, and items in the bulk and import payloads, the budgets are checked at.
+# A query run per row or item blows the budget at the larger sizes.
+SIZES = (1, 10, 100)
+
+
+def income(i):
+    return {'nameOfRevenue': f'Revenue {i}', 'amount': 100 + i}
+
+
+def expenditure(i):
+    return {'category': 'food', 'nameOfItem': f'Item {i}', 'estimatedAmount': 10 + i}
+
+
+def ledger_file(ledger):
+    content = 'kind,id,created_at,category,name,amount\n' + ''.join(f'expenditure,,,food,item {i},{i + 1}\n' for i in range(ledger.size))
+    return {'file': SimpleUploadedFile('ledger.csv', content.encode())}
+
+
+# (url name, method): (maximum queries, maximum share of the request time spent in queries, expected status, request)
+# where request(ledger) gives the path and the data of a request of the ledger's user, the requests are sent cold,
+# with the authentication caches empty
+BUDGETS = {
+    ('signup', 'post'): (9, 0.1, status.HTTP_201_CREATED, lambda ledger: ('/auth/signup/', {
+        'email': 'budget@nomail.com', 'password': 'budget_password', 'first_name': 'budget', 'last_name': 'user',
+        'username': 'budget', 'phone_number': '+2348123456789',
+    })),
+    ('login', 'post'): (5, 0.1, status.HTTP_200_OK, lambda ledger: ('/auth/login/', {'email': ledger.user.email, 'password': 'test_user'})),
+    ('logout', 'post'): (7, 0.5, status.HTTP_200_OK, lambda ledger: ('/auth/logout/', {'refresh_token': ledger.refresh_token})),
+    ('refresh', 'post'): (1, 0.5, status.HTTP_200_OK, lambda ledger: ('/auth/refresh/', {'refresh': ledger.refresh_token})),
+    ('user_profile', 'get'): (3, 0.5, status.HTTP_200_OK, lambda ledger: (f'/auth/user/{ledger.user.pk}/profile/', None)),
+    ('user_profile', 'put'): (6, 0.5, status.HTTP_200_OK, lambda ledger: (f'/auth/user/{ledger.user.pk}/profile/', {'first_name': 'budget'})),
+
+    ('list_create_incomes', 'get'): (3, 0.5, status.HTTP_200_OK, lambda ledger: ('/user/income/', None)),
+    ('list_create_incomes', 'post'): (6, 0.5, status.HTTP_201_CREATED, lambda ledger: ('/user/income/', income(0))),
+    ('bulk_incomes', 'post'): (4, 0.5, status.HTTP_201_CREATED, lambda ledger: ('/user/income/bulk/', [income(i) for i in range(ledger.size)])),
+    ('bulk_incomes', 'patch'): (7, 0.5, status.HTTP_200_OK, lambda ledger: ('/user/income/bulk/', {'ids': ledger.incomes, 'data': {'amount': 10}})),
+    ('bulk_incomes', 'delete'): (8, 0.5, status.HTTP_200_OK, lambda ledger: ('/user/income/bulk/', {'ids': ledger.incomes})),
+    ('retrieve_get_update_delete_income', 'get'): (3, 0.5, status.HTTP_200_OK, lambda ledger: (f'/user/income/{ledger.incomes[0]}/', None)),
+    ('retrieve_get_update_delete_income', 'put'): (5, 0.5, status.HTTP_200_OK, lambda ledger: (f'/user/income/{ledger.incomes[0]}/', {'amount': 10})),
+    ('retrieve_get_update_delete_income', 'delete'): (6, 0.5, status.HTTP_200_OK, lambda ledger: (f'/user/income/{ledger.incomes[0]}/', None)),
+
+    ('list_create_expenditures', 'get'): (3, 0.5, status.HTTP_200_OK, lambda ledger: ('/user/expenditure/', None)),
+    ('list_create_expenditures', 'post'): (6, 0.5, status.HTTP_201_CREATED, lambda ledger: ('/user/expenditure/', expenditure(0))),
+    ('bulk_expenditures', 'post'): (4, 0.5, status.HTTP_201_CREATED, lambda ledger: ('/user/expenditure/bulk/', [expenditure(i) for i in range(ledger.size)])),
+    ('bulk_expenditures', 'patch'): (7, 0.5, status.HTTP_200_OK, lambda ledger: ('/user/expenditure/bulk/', {'ids': ledger.expenditures, 'data': {'estimatedAmount': 10}})),
+    ('bulk_expenditures', 'delete'): (8, 0.5, status.HTTP_200_OK, lambda ledger: ('/user/expenditure/bulk/', {'ids': ledger.expenditures})),
+    ('retrieve_get_update_delete_expenditure', 'get'): (3, 0.5, status.HTTP_200_OK, lambda ledger: (f'/user/expenditure/{ledger.expenditures[0]}/', None)),
+    ('retrieve_get_update_delete_expenditure', 'put'): (5, 0.5, status.HTTP_200_OK, lambda ledger: (f'/user/expenditure/{ledger.expenditures[0]}/', {'estimatedAmount': 10})),
+    ('retrieve_get_update_delete_expenditure', 'delete'): (6, 0.5, status.HTTP_200_OK, lambda ledger: (f'/user/expenditure/{ledger.expenditures[0]}/', None)),
+
+    ('export_ledger', 'get'): (4, 0.5, status.HTTP_200_OK, lambda ledger: ('/user/ledger/export/?format=csv', None)),
+    ('import_ledger', 'post'): (6, 0.5, status.HTTP_200_OK, lambda ledger: ('/user/ledger/import/', ledger_file(ledger))),
+    ('summarize_ledger', 'get'): (3, 0.5, status.HTTP_200_OK, lambda ledger: ('/user/ledger/summary/', None)),
+}
+
+
+@pytest.fixture(params=SIZES, ids=[f'{size}rows' for size in SIZES])
+def ledger(request, user, refresh_token):
+    size = request.param
+    incomes = Income.objects.bulk_create([Income(user=user, nameOfRevenue=f'Revenue {i}', amount=Decimal(100 + i)) for i in range(size)])
+    expenditures = Expenditure.objects.bulk_create([
+        Expenditure(user=user, category='food', nameOfItem=f'Item {i}', estimatedAmount=Decimal(10 + i)) for i in range(size)
+    ])
+    return SimpleNamespace(
+        user=user, refresh_token=refresh_token, size=size,
+        incomes=[str(obj.pk) for obj in incomes], expenditures=[str(obj.pk) for obj in expenditures],
+    )
+
+
+def test_every_view_has_a_budget():
+    routes = set()
+    for pattern in api.urls.urlpatterns:
+        view_class = pattern.callback.view_class
+        routes |= {(pattern.name, method) for method in view_class.http_method_names if method not in ('head', 'options') and hasattr(view_class, method)}
+    assert routes == set(BUDGETS)
+
+
+@pytest.mark.parametrize('route', list(BUDGETS), ids=['-'.join(route) for route in BUDGETS])
+def test_query_budget(api_client, access_token, ledger, query_budget, route):
+    queries, db_share, expected, make_request = BUDGETS[route]
+    path, data = make_request(ledger)
+    format = 'multipart' if route == ('import_ledger', 'post') else 'json'
+    api_client.credentials(HTTP_AUTHORIZATION=f'Bearer {access_token}')
+
+    with query_budget(queries, db_share):
+        response = getattr(api_client, route[1])(path, data, format=format)
+        if response.streaming:
+            b''.join(response.streaming_content)
+
+    assert response.status_code == expected
@@ -0,0 +1,66 @@
+import io
+import json
+import uuid
+import pytest
+from datetime import date, datetime, time, timedelta, timezone
+from decimal import Decimal
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ErrorDetail, ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from api.utils.renderers import ORJSONParser, ORJSONRenderer
+
+
+class TestORJSONRenderer:
+
+    def test_output_is_identical_to_json_renderer(self):
+        data = {
+            'id': uuid.uuid4(),
+            'amount': Decimal('5000.00'),
+            'amounts': [Decimal('0.10'), Decimal('-12.5'), Decimal('99999999.99')],
+            'created_at': datetime(2023, 3, 25, 20, 41, 0, 123456, tzinfo=timezone.utc),
+            'offset_at': datetime(2023, 3, 25, 20, 41, tzinfo=timezone(timedelta(hours=1))),
+            'naive_at': datetime(2023, 3, 25, 20, 41),
+            'day': date(2023, 3, 25),
+            'time': time(20, 41),
+            'duration': timedelta(minutes=90),
+            'message': gettext_lazy('User not found'),
+            'errors': {'amount': [ErrorDetail('A valid number is required.', code='invalid')]},
+            'name': 'Café\u2028\u2029"quoted"',
+            'keys': {1: 'int', None: 'none', 2.5: 'float'},
+            'nested': [{'count': 3, 'ratio': 0.25, 'ok': False, 'next': None}],
+        }
+
+        assert ORJSONRenderer().render(data) == JSONRenderer().render(data)
+        # every non-str key is written as the stdlib encoder writes it
+        assert json.loads(ORJSONRenderer().render(data))['keys'] == {'1': 'int', 'null': 'none', '2.5': 'float'}
+
+    def test_fallbacks_to_json_renderer(self):
+        data = {'big': 2 ** 70, 'amount': Decimal('1.50')}
+        assert ORJSONRenderer().render(data) == JSONRenderer().render(data)
+
+        # indented output is only written by the stdlib encoder
+        data = {'amount': Decimal('1.50')}
+        assert ORJSONRenderer().render(data, 'application/json; indent=4') == JSONRenderer().render(data, 'application/json; indent=4')
+        assert ORJSONRenderer().render(None) == b''
+
+    def test_unsupported_types_still_fail(self):
+        with pytest.raises(TypeError):
+            ORJSONRenderer().render({'value': object()})
+
+
+class TestORJSONParser:
+
+    def parse(self, parser, body):
+        return parser.parse(io.BytesIO(body), 'application/json', {'encoding': 'utf-8'})
+
+    def test_result_is_identical_to_json_parser(self):
+        body = '{"nameOfRevenue": "Café", "amount": 5000.5, "ids": [1, 2], "nested": {"ok": true, "none": null}}'.encode()
+        assert self.parse(ORJSONParser(), body) == self.parse(JSONParser(), body)
+
+    @pytest.mark.parametrize('body', [b'', b'{"amount": }', b'{"amount": NaN}', b'\xff'])
+    def test_invalid_json(self, body):
+        with pytest.raises(ParseError):
+            self.parse(ORJSONParser(), body)
+        with pytest.raises(ParseError):
+            self.parse(JSONParser(), body)
@@ -1,5 +1,12 @@
+from django.conf import settings
 from django.urls import path
-from api.views import user, income, expenditure
+from api.views import user, income, expenditure, ledger
+
+
+def served(view, async_view):
+    # the async-native view under ASGI (API_ASYNC_VIEWS), the sync one under WSGI
+    return (async_view if settings.API_ASYNC_VIEWS else view).as_view()
+
 
 urlpatterns = [
 
@@ -11,11 +18,18 @@ urlpatterns = [
     path('auth/user/<str:userID>/profile/', user.UserProfileView.as_view(), name='user_profile'),
 
     # Income
-    path('user/income/',                income.IncomeListCreateView.as_view(), name='list_create_incomes'),
-    path('user/income/<str:incomeID>/', income.IncomeRetrieveUpdateDeleteView.as_view(), name='retrieve_get_update_delete_income'),
+    path('user/income/',                served(income.IncomeListCreateView, income.AsyncIncomeListCreateView), name='list_create_incomes'),
+    path('user/income/bulk/',           income.IncomeBulkView.as_view(), name='bulk_incomes'),
+    path('user/income/<str:incomeID>/', served(income.IncomeRetrieveUpdateDeleteView, income.AsyncIncomeRetrieveUpdateDeleteView), name='retrieve_get_update_delete_income'),
 
     # Expenditure
-    path('user/expenditure/',                     expenditure.ExpenditureListCreateView.as_view(), name='list_create_expenditures'),
-    path('user/expenditure/<str:expenditureID>/', expenditure.ExpenditureRetrieveUpdateDeleteView.as_view(), name='retrieve_get_update_delete_expenditure'),
+    path('user/expenditure/',                     served(expenditure.ExpenditureListCreateView, expenditure.AsyncExpenditureListCreateView), name='list_create_expenditures'),
+    path('user/expenditure/bulk/',                expenditure.ExpenditureBulkView.as_view(), name='bulk_expenditures'),
+    path('user/expenditure/<str:expenditureID>/', served(expenditure.ExpenditureRetrieveUpdateDeleteView, expenditure.AsyncExpenditureRetrieveUpdateDeleteView), name='retrieve_get_update_delete_expenditure'),
+
+    # Ledger
+    path('user/ledger/export/', ledger.LedgerExportView.as_view(), name='export_ledger'),
+    path('user/ledger/import/', ledger.LedgerImportView.as_view(), name='import_ledger'),
+    path('user/ledger/summary/', ledger.LedgerSummaryView.as_view(), name='summarize_ledger'),
 ]
 
@@ -0,0 +1,94 @@
+import asyncio
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
+from rest_framework import exceptions, status
+from rest_framework.response import Response
+
+
+# Serves a DRF view with `async def` handlers, for ASGI deployments.
+#
+# DRF only dispatches sync handlers, so this replaces `dispatch()` with a coroutine that
+# authenticates with the async ORM, awaits the handler and renders the response on the
+# event loop. Permissions, content negotiation, parsing and serializers are the regular
+# sync ones since none of them touch the database.
+# (comments rather than docstrings, the API schema shows the docstrings of views)
+class AsyncAPIViewMixin:
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # async handlers are documented like the sync handlers they override,
+        # drf-spectacular keeps the `@extend_schema` of a handler in its `kwargs`
+        for method in cls.http_method_names:
+            handler = cls.__dict__.get(method)
+            schema = getattr(getattr(super(cls, cls), method, None), 'kwargs', {}).get('schema')
+            if handler and schema and not hasattr(handler, 'kwargs'):
+                handler.kwargs = {'schema': schema}
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await self.aperform_authentication(request)
+            self.initial(request, *args, **kwargs)
+
+            if request.method.lower() in self.http_method_names:
+                handler = getattr(self, request.method.lower(), self.http_method_not_allowed)
+            else:
+                handler = self.http_method_not_allowed
+
+            # `options()` and `http_method_not_allowed()` stay sync
+            response = handler(request, *args, **kwargs)
+            if asyncio.iscoroutine(response):
+                response = await response
+
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.render_response(self.response)
+
+    async def aperform_authentication(self, request):
+        """Authenticate like `Request.user` does, awaiting the authenticators that support it."""
+        for authenticator in request.authenticators:
+            authenticate = getattr(authenticator, 'aauthenticate', None) or sync_to_async(authenticator.authenticate)
+            try:
+                user_auth_tuple = await authenticate(request)
+            except exceptions.APIException:
+                request._not_authenticated()
+                raise
+
+            if user_auth_tuple is not None:
+                request._authenticator = authenticator
+                request.user, request.auth = user_auth_tuple
+                return
+
+        request._not_authenticated()
+
+    def render_response(self, response):
+        # Django renders template responses in a worker thread, rendering here saves the hop
+        if not isinstance(response, Response):
+            return response
+
+        response.render()
+        rendered = HttpResponse(response.content, status=response.status_code)
+        for header, value in response.items():
+            rendered[header] = value
+        # still there for middleware and tests inspecting it
+        rendered.data = response.data
+        return rendered
+
+
+# Async `create()` of a `ListCreateAPIView`
+class AsyncCreateMixin:
+
+    async def acreate(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        # the row and the ledger aggregates are written in one transaction on the sync thread
+        serializer.instance = await self.queryset.model._default_manager.acreate(**serializer.validated_data)
+        headers = self.get_success_headers(serializer.data)
+        return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
@@ -0,0 +1,88 @@
+import copy
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils.translation import gettext_lazy as _
+from drf_spectacular.contrib.rest_framework_simplejwt import SimpleJWTScheme
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken, TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import aware_utcnow
+from api.utils.cache import TTLCache
+from apps.account.models import User
+
+# Validated access tokens by their encoded string, and active users by id. Both are per process,
+# a user saved in another process is picked up here after at most AUTH_USER_CACHE_TTL seconds.
+token_cache = TTLCache(max_size=settings.AUTH_TOKEN_CACHE_SIZE, ttl=settings.AUTH_TOKEN_CACHE_TTL)
+user_cache = TTLCache(max_size=settings.AUTH_USER_CACHE_SIZE, ttl=settings.AUTH_USER_CACHE_TTL)
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication that remembers the tokens it verified and the users it loaded,
+    so repeated requests with the same token skip the signature check and the user query.
+    """
+
+    def get_validated_token(self, raw_token):
+        token = token_cache.get(raw_token)
+        if token is not None:
+            try:
+                token.check_exp(current_time=aware_utcnow())
+                return token
+            except TokenError:
+                # expired since it was cached, let the regular validation report it
+                token_cache.pop(raw_token)
+
+        token = super().get_validated_token(raw_token)
+        token_cache.set(raw_token, token)
+        return token
+
+    def get_user(self, validated_token):
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        user = user_cache.get(str(user_id)) if user_id is not None else None
+        if user is None:
+            user = super().get_user(validated_token)
+            # only active users get this far
+            user_cache.set(str(user_id), user)
+        # requests get their own copy, so nothing they set on it leaks to the next one
+        return copy.copy(user)
+
+    async def aauthenticate(self, request):
+        """`authenticate()` for async views, a user missing from the cache is loaded with the async ORM."""
+        header = self.get_header(request)
+        if header is None:
+            return None
+
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+
+        validated_token = self.get_validated_token(raw_token)
+        return await self.aget_user(validated_token), validated_token
+
+    async def aget_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_('Token contained no recognizable user identification'))
+
+        user = user_cache.get(str(user_id))
+        if user is None:
+            user = await User.objects.filter(**{api_settings.USER_ID_FIELD: user_id}).afirst()
+            if user is None:
+                raise AuthenticationFailed(_('User not found'), code='user_not_found')
+            if not user.is_active:
+                raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+            user_cache.set(str(user_id), user)
+        return copy.copy(user)
+
+
+class CachedJWTScheme(SimpleJWTScheme):
+    # documented exactly like the JWTAuthentication it extends
+    target_class = 'api.utils.authentication.CachedJWTAuthentication'
+
+
+@receiver(post_save, sender=User, dispatch_uid='invalidate_cached_user_on_save')
+@receiver(post_delete, sender=User, dispatch_uid='invalidate_cached_user_on_delete')
+def invalidate_cached_user(sender, instance, **kwargs):
+    user_cache.pop(str(instance.pk))
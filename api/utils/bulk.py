@@ -0,0 +1,59 @@
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+from api.serializers.bulk import BulkDeleteSerializer, BulkUpdateSerializer
+
+
+class BulkLedgerMixin:
+    """
+    Bulk create, update and delete of the user's ledger rows of `serializer_class`.
+
+    Updates and deletes run a single UPDATE or DELETE scoped to the user's listed rows,
+    which report the ids they wrote through `update_returning()` and `delete_returning()`
+    of the LedgerQuerySet, so no extra query reads them first. `item_name` names the rows
+    in the error messages.
+    """
+    item_name = None
+
+    def post(self, request):
+        ser = self.get_serializer(data=request.data, many=True, allow_empty=False, max_length=settings.BULK_MAX_ITEMS)
+        if not ser.is_valid():
+            # errors holds one entry per submitted item, in order
+            return Response({'message': f'Invalid {self.item_name} data', 'errors': ser.errors}, status=status.HTTP_400_BAD_REQUEST)
+
+        ser.save()
+        return Response(ser.data, status=status.HTTP_201_CREATED)
+
+    def patch(self, request):
+        bulk = BulkUpdateSerializer(data=request.data)
+        if not bulk.is_valid():
+            return Response({'message': f'Invalid {self.item_name} data', 'errors': bulk.errors}, status=status.HTTP_400_BAD_REQUEST)
+
+        # validate the payload with the same rules as a single update
+        ser = self.get_serializer(data=bulk.validated_data['data'], partial=True)
+        if not ser.is_valid():
+            return Response({'message': f'Invalid {self.item_name} data', 'errors': ser.errors}, status=status.HTTP_400_BAD_REQUEST)
+        if not ser.validated_data:
+            return Response({'message': f'No {self.item_name} fields to update'}, status=status.HTTP_400_BAD_REQUEST)
+
+        ids = list(dict.fromkeys(bulk.validated_data['ids']))
+        with transaction.atomic():
+            rows = self.get_queryset().filter(id__in=ids).order_by().update_returning((), updated_at=timezone.now(), **ser.validated_data)
+        return Response(self.found('updated', ids, rows), status=status.HTTP_200_OK)
+
+    def delete(self, request):
+        bulk = BulkDeleteSerializer(data=request.data)
+        if not bulk.is_valid():
+            return Response({'message': f'Invalid {self.item_name} data', 'errors': bulk.errors}, status=status.HTTP_400_BAD_REQUEST)
+
+        ids = list(dict.fromkeys(bulk.validated_data['ids']))
+        with transaction.atomic():
+            rows = self.get_queryset().filter(id__in=ids).order_by().delete_returning()
+        return Response(self.found('deleted', ids, rows), status=status.HTTP_200_OK)
+
+    def found(self, key, ids, rows):
+        """The requested `ids` split into the ones written, under `key`, and the ones not found."""
+        written = {row['pk'] for row in rows}
+        return {key: [pk for pk in ids if pk in written], 'not_found': [pk for pk in ids if pk not in written]}
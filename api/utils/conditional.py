@@ -0,0 +1,108 @@
+import time
+import zlib
+from functools import wraps
+from django.core.exceptions import ValidationError
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.decorators import method_decorator
+from django.utils.http import http_date, quote_etag
+from django.views.decorators.http import condition
+from django.views.decorators.vary import vary_on_headers
+from apps.account.models import UserBalance
+
+
+def get_user_version(request, user_id):
+    """
+    The stored `(version, modified_at)` of a user's data, read once per request.
+    Users without a balance row yet have never been written to and are at version 0.
+    """
+    versions = request.__dict__.setdefault('_user_versions', {})
+    if user_id not in versions:
+        try:
+            version = UserBalance.objects.filter(user_id=user_id).values_list('version', 'modified_at').first()
+        except ValidationError:
+            version = None
+        versions[user_id] = version or (0, None)
+    return versions[user_id]
+
+
+async def aget_user_version(request, user_id):
+    """`get_user_version()` with the async ORM."""
+    versions = request.__dict__.setdefault('_user_versions', {})
+    if user_id not in versions:
+        try:
+            version = await UserBalance.objects.filter(user_id=user_id).values_list('version', 'modified_at').afirst()
+        except ValidationError:
+            version = None
+        versions[user_id] = version or (0, None)
+    return versions[user_id]
+
+
+def user_etag(request, user_id, version):
+    """
+    The ETag of the user's data at `version`, in the negotiated media type: JSON and the
+    browsable API are different representations of the same URL.
+    """
+    media_type = getattr(request, 'accepted_media_type', None) or ''
+    return f'{user_id}-{version}-{zlib.crc32(media_type.encode()):08x}'
+
+
+def user_last_modified(modified_at):
+    """
+    `modified_at` for Last-Modified, which only has whole seconds: None until its second is
+    over, since another write in the same second would not change it.
+    """
+    if modified_at is None or modified_at.timestamp() // 1 + 1 > time.time():
+        return None
+    return modified_at
+
+
+def user_condition(get_user_id):
+    """
+    Conditional GET for views whose response only depends on the data of one user.
+
+    The ETag and Last-Modified headers come from the user's stored version, so a request
+    whose `If-None-Match`/`If-Modified-Since` is still current is answered with a 304
+    before the view runs any query or serialization of its own.
+    """
+    def etag(request, *args, **kwargs):
+        user_id = get_user_id(request, *args, **kwargs)
+        return user_etag(request, user_id, get_user_version(request, user_id)[0])
+
+    def last_modified(request, *args, **kwargs):
+        return user_last_modified(get_user_version(request, get_user_id(request, *args, **kwargs))[1])
+
+    return method_decorator([vary_on_headers('Accept'), condition(etag_func=etag, last_modified_func=last_modified)])
+
+
+def async_user_condition(get_user_id):
+    """
+    `user_condition()` for async handlers. Django's `condition` decorator only wraps sync
+    views, so its checks are repeated here around an awaited version read.
+    """
+    def decorator(handler):
+        @wraps(handler)
+        async def wrapper(self, request, *args, **kwargs):
+            user_id = get_user_id(request, *args, **kwargs)
+            version, modified_at = await aget_user_version(request, user_id)
+            etag = quote_etag(user_etag(request, user_id, version))
+            modified_at = user_last_modified(modified_at)
+            last_modified = int(modified_at.timestamp()) if modified_at else None
+
+            response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+            if response is None:
+                response = await handler(self, request, *args, **kwargs)
+
+            if request.method in ('GET', 'HEAD'):
+                if last_modified and not response.has_header('Last-Modified'):
+                    response.headers['Last-Modified'] = http_date(last_modified)
+                response.headers.setdefault('ETag', etag)
+            patch_vary_headers(response, ['Accept'])
+            return response
+        return wrapper
+    return decorator
+
+
+# for the views of the authenticated user's own data, and for the profile of `userID`
+own_data_condition = user_condition(lambda request, *args, **kwargs: request.user.pk)
+async_own_data_condition = async_user_condition(lambda request, *args, **kwargs: request.user.pk)
+profile_condition = user_condition(lambda request, userID, *args, **kwargs: userID)
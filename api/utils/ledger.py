@@ -0,0 +1,256 @@
+import csv
+import heapq
+import json
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from django.db import transaction
+from django.db.models import DateField, Sum
+from django.db.models.functions import TruncDay, TruncMonth, TruncWeek
+from django.utils import timezone
+from rest_framework import serializers
+from apps.account.models import DailyRollup, Expenditure, Income
+
+# Columns of an exported ledger row
+LEDGER_COLUMNS = ['kind', 'id', 'created_at', 'category', 'name', 'amount']
+
+# Model and model fields behind the `category`, `name` and `amount` columns of each kind
+LEDGER_KINDS = {
+    'income': (Income, {'category': None, 'name': 'nameOfRevenue', 'amount': 'amount'}),
+    'expenditure': (Expenditure, {'category': 'category', 'name': 'nameOfItem', 'amount': 'estimatedAmount'}),
+}
+
+
+def day_range(start=None, end=None):
+    """Turn an inclusive range of dates into `created_at` bounds that can use the time indexes."""
+    bounds = {}
+    if start:
+        bounds['created_at__gte'] = timezone.make_aware(datetime.combine(start, datetime.min.time()))
+    if end:
+        bounds['created_at__lt'] = timezone.make_aware(datetime.combine(end + timedelta(days=1), datetime.min.time()))
+    return bounds
+
+
+# Truncation of `created_at` for each summary granularity
+GRANULARITIES = {
+    'day': TruncDay,
+    'week': TruncWeek,
+    'month': TruncMonth,
+}
+
+
+def summarize_ledger(user, kinds=LEDGER_KINDS, start=None, end=None, granularity='month'):
+    """
+    Total and count of the user's ledger per period (and per category for expenditures).
+
+    Read from the daily rollups in a single query, so at most one row per day, kind and
+    category is scanned whatever the number of transactions.
+    """
+    ledger_kinds = {LEDGER_KINDS[kind][0].ledger_kind: kind for kind in kinds}
+    rollups = DailyRollup.objects.filter(user=user, kind__in=ledger_kinds)
+    if start:
+        rollups = rollups.filter(day__gte=start)
+    if end:
+        rollups = rollups.filter(day__lte=end)
+    rows = (
+        rollups.annotate(period=GRANULARITIES[granularity]('day', output_field=DateField()))
+        .values('kind', 'period', 'category')
+        .annotate(total=Sum('total'), count=Sum('count'))
+        .order_by('kind', 'period', 'category')
+    )
+
+    summary = {kind: [] for kind in kinds}
+    for row in rows:
+        kind = ledger_kinds[row.pop('kind')]
+        if not LEDGER_KINDS[kind][1]['category']:
+            del row['category']
+        summary[kind].append(row)
+    return summary
+
+
+def iter_ledger(user, kinds=LEDGER_KINDS, start=None, end=None, chunk_size=2000):
+    """
+    Yield the rows of the user's ledger, oldest first, as dicts keyed by `LEDGER_COLUMNS`.
+
+    Each table is read with `iterator(chunk_size=...)` and the tables are merged on the fly,
+    so memory stays flat however long the ledger is.
+    """
+    streams = []
+    for kind in kinds:
+        model, fields = LEDGER_KINDS[kind]
+        columns = ['id', 'created_at', fields['name'], fields['amount']]
+        if fields['category']:
+            columns.append(fields['category'])
+        queryset = (
+            model.objects.filter(user=user, **day_range(start, end))
+            .order_by('created_at', 'id')
+            .values_list(*columns)
+        )
+        streams.append(_rows(kind, queryset.iterator(chunk_size=chunk_size)))
+
+    return heapq.merge(*streams, key=lambda row: (row['created_at'], str(row['id'])))
+
+
+def _rows(kind, tuples):
+    for pk, created_at, name, amount, *category in tuples:
+        yield {
+            'kind': kind,
+            'id': pk,
+            'created_at': created_at,
+            'category': category[0] if category else '',
+            'name': name,
+            'amount': amount,
+        }
+
+
+class LedgerFileError(ValueError):
+    """
+    The imported file cannot be read past line `line`. `report` is set by `LedgerImporter.run()`
+    to the report of the rows before it, which are imported.
+    """
+
+    def __init__(self, line, message):
+        super().__init__(f'Line {line}: {message}')
+        self.line = line
+        self.report = None
+
+
+class LedgerImporter:
+    """
+    Imports ledger rows shaped like the export (`kind`, `created_at`, `category`, `name`, `amount`)
+    for a user. Rows without a `created_at` are dated at the time of the import.
+
+    Rows are validated one by one with the same serializers as the API and inserted with a
+    `bulk_create` per `batch_size` valid rows, so memory is bounded by the batch size rather
+    than by the size of the file. Invalid rows are skipped and reported by row number.
+    """
+    max_reported_errors = 100
+
+    def __init__(self, user, batch_size=1000, default_kind=None):
+        from api.serializers.expenditure import UserExpenditureSerializer
+        from api.serializers.income import UserIncomeSerializer
+
+        self.user = user
+        self.batch_size = batch_size
+        self.default_kind = default_kind
+        context = {'request': SimpleNamespace(user=user)}
+        self.serializers = {
+            'income': UserIncomeSerializer(context=context),
+            'expenditure': UserExpenditureSerializer(context=context),
+        }
+        self.created_at = serializers.DateTimeField()
+
+    def run(self, rows):
+        """
+        Import an iterable of `(row_number, row)` pairs and return the import report. A
+        `LedgerFileError` raised by `rows` stops the import, the rows before it are imported.
+        """
+        start = time.perf_counter()
+        report = {'rows': 0, 'created': 0, 'failed': 0, 'errors': []}
+        batch = {kind: [] for kind in LEDGER_KINDS}
+        pending = 0
+
+        try:
+            for row_number, row in rows:
+                report['rows'] += 1
+                try:
+                    kind, instance = self.build(row)
+                except serializers.ValidationError as exc:
+                    report['failed'] += 1
+                    if len(report['errors']) < self.max_reported_errors:
+                        report['errors'].append({'row': row_number, 'errors': exc.detail})
+                    continue
+
+                batch[kind].append(instance)
+                pending += 1
+                if pending >= self.batch_size:
+                    report['created'] += self.flush(batch)
+                    pending = 0
+        except LedgerFileError as exc:
+            exc.report = self.finish(report, batch, start)
+            raise
+        return self.finish(report, batch, start)
+
+    def finish(self, report, batch, start):
+        report['created'] += self.flush(batch)
+        report['seconds'] = round(time.perf_counter() - start, 3)
+        report['rows_per_second'] = round(report['rows'] / report['seconds']) if report['seconds'] else report['rows']
+        return report
+
+    def build(self, row):
+        if not isinstance(row, dict):
+            raise serializers.ValidationError({'non_field_errors': ['Expected an object.']})
+
+        kind = row.get('kind') or self.default_kind
+        if not isinstance(kind, str) or kind not in LEDGER_KINDS:
+            raise serializers.ValidationError({'kind': [f'"{kind}" is not a valid choice.' if kind else 'This field is required.']})
+
+        model, fields = LEDGER_KINDS[kind]
+        data = {field: row.get(column) for column, field in fields.items() if field and row.get(column) not in (None, '')}
+        errors = {}
+        try:
+            validated_data = self.serializers[kind].run_validation(data)
+        except serializers.ValidationError as exc:
+            errors.update(exc.detail)
+
+        # the date of the row also decides the daily rollup it is added to, now when it has none
+        dated = {}
+        if row.get('created_at') not in (None, ''):
+            try:
+                dated['created_at'] = self.created_at.run_validation(row['created_at'])
+            except serializers.ValidationError as exc:
+                errors['created_at'] = exc.detail
+
+        if errors:
+            raise serializers.ValidationError(errors)
+        return kind, model(**validated_data, **dated)
+
+    def flush(self, batch):
+        created = 0
+        with transaction.atomic():
+            for kind, instances in batch.items():
+                if instances:
+                    LEDGER_KINDS[kind][0].objects.bulk_create(instances)
+                    created += len(instances)
+                    instances.clear()
+        return created
+
+
+def read_rows(stream, format):
+    """
+    Lazily parse a text stream of CSV or NDJSON into `(row_number, row)` pairs. Raises
+    `LedgerFileError` at the first line that cannot be decoded or parsed as CSV.
+    """
+    lines = _lines(stream)
+    if format == 'csv':
+        reader = csv.DictReader(lines)
+        try:
+            for row in reader:
+                yield reader.line_num, row
+        except csv.Error as exc:
+            # line_num does not count the line that failed yet
+            raise LedgerFileError(reader.line_num + 1, f'{exc}.') from None
+        return
+
+    for row_number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            yield row_number, json.loads(line)
+        except ValueError:
+            yield row_number, None
+
+
+def _lines(stream):
+    number = 0
+    stream = iter(stream)
+    while True:
+        try:
+            line = next(stream)
+        except StopIteration:
+            return
+        except UnicodeDecodeError:
+            raise LedgerFileError(number + 1, 'The file is not valid UTF-8.') from None
+        number += 1
+        yield line
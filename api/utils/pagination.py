@@ -0,0 +1,155 @@
+from base64 import b64decode, b64encode
+from collections import namedtuple
+from urllib import parse
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+Cursor = namedtuple('Cursor', ['reverse', 'position'])
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Cursor pagination keyed on a unique, compound ordering such as `(created_at, id)`.
+
+    Every page is fetched with a `WHERE (created_at, id) < (?, ?) ... LIMIT page_size + 1`
+    seek instead of an OFFSET, and no `COUNT(*)` is ever issued, so any page costs the
+    same as the first one no matter how many rows the user has.
+    """
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+    ordering = ('-created_at', '-id')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        queryset = self.get_page_queryset(queryset, request)
+        if queryset is None:
+            return None
+        return self.set_page(list(queryset))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """`paginate_queryset()` for async views, the page is read with `async for`."""
+        queryset = self.get_page_queryset(queryset, request)
+        if queryset is None:
+            return None
+        return self.set_page([obj async for obj in queryset])
+
+    def get_page_queryset(self, queryset, request):
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.cursor = self.decode_cursor(request)
+        self.reverse = self.cursor is not None and self.cursor.reverse
+        self.position = self.cursor.position if self.cursor is not None else None
+
+        # previous pages are read backwards from the cursor and flipped afterwards
+        ordering = self.get_reversed_ordering() if self.reverse else self.ordering
+        queryset = queryset.order_by(*ordering)
+
+        if self.position is not None:
+            queryset = queryset.filter(self.get_seek_filter(queryset.model, ordering, self.position))
+
+        # fetch one extra row to find out if there is a page after this one
+        return queryset[:self.page_size + 1]
+
+    def set_page(self, results):
+        has_more = len(results) > self.page_size
+        self.page = results[:self.page_size]
+
+        if self.reverse:
+            self.page.reverse()
+            self.has_next = True
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = self.position is not None
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+
+        return self.page
+
+    def get_reversed_ordering(self):
+        return tuple(item[1:] if item.startswith('-') else '-' + item for item in self.ordering)
+
+    def get_seek_filter(self, model, ordering, position):
+        """
+        Build the lexicographic `(a, b) < (x, y)` comparison for the given ordering,
+        ie. `a <= x AND (a < x OR (a = x AND b < y))`, flipping `<` to `>` for ascending fields.
+        """
+        try:
+            values = [
+                model._meta.get_field(field.lstrip('-')).to_python(value)
+                for field, value in zip(ordering, position)
+            ]
+        except ValidationError:
+            raise NotFound(self.invalid_cursor_message)
+
+        seek = Q()
+        for index in reversed(range(len(ordering))):
+            field = ordering[index].lstrip('-')
+            lookup = '__lt' if ordering[index].startswith('-') else '__gt'
+            condition = Q(**{field + lookup: values[index]})
+            if index < len(ordering) - 1:
+                condition |= Q(**{field: values[index]}) & seek
+            seek = condition
+
+        # a redundant inclusive bound on the leading field lets the index do a range scan
+        field = ordering[0].lstrip('-')
+        lookup = '__lte' if ordering[0].startswith('-') else '__gte'
+        return Q(**{field + lookup: values[0]}) & seek
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+
+        position = self._get_position_from_instance(self.page[-1], self.ordering) if self.page else self.cursor.position
+        return self.encode_cursor(Cursor(reverse=False, position=position))
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+
+        position = self._get_position_from_instance(self.page[0], self.ordering) if self.page else self.cursor.position
+        return self.encode_cursor(Cursor(reverse=True, position=position))
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+
+        try:
+            querystring = b64decode(encoded.encode('ascii')).decode('ascii')
+            tokens = parse.parse_qs(querystring, keep_blank_values=True)
+            reverse = bool(int(tokens.get('r', ['0'])[0]))
+            position = tokens['p']
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+
+        if len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+
+        return Cursor(reverse=reverse, position=tuple(position))
+
+    def encode_cursor(self, cursor):
+        tokens = {'p': cursor.position}
+        if cursor.reverse:
+            tokens['r'] = '1'
+
+        querystring = parse.urlencode(tokens, doseq=True)
+        encoded = b64encode(querystring.encode('ascii')).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def _get_position_from_instance(self, instance, ordering):
+        position = []
+        for field in ordering:
+            field_name = field.lstrip('-')
+            attr = instance[field_name] if isinstance(instance, dict) else getattr(instance, field_name)
+            position.append(attr.isoformat() if hasattr(attr, 'isoformat') else str(attr))
+        return tuple(position)
@@ -0,0 +1,122 @@
+from datetime import datetime
+from decimal import Decimal
+from functools import lru_cache
+from django.core.exceptions import FieldDoesNotExist, ImproperlyConfigured
+from rest_framework import ISO_8601, serializers
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+
+class ValuesProjection:
+    """
+    The output of a ModelSerializer for rows read with `values()` instead of model instances.
+
+    The readable fields of the serializer are mapped once to the columns they read, and every
+    `represent()` compiles them into `(key, column, to_representation)` triples, so representing
+    a row is a dict build with one call per field instead of a model instantiation plus the
+    serializer's field walk. The compiled functions give exactly what the fields'
+    `to_representation()` give for values read from the database, falling back to it otherwise.
+    Only fields backed by a column of the model itself are supported.
+    """
+
+    def __init__(self, serializer_class):
+        serializer = serializer_class()
+        model = serializer.Meta.model
+        self.fields = []
+        for key, field in serializer.fields.items():
+            if field.write_only:
+                continue
+            try:
+                column = model._meta.get_field(field.source).attname
+            except FieldDoesNotExist:
+                raise ImproperlyConfigured(f'{serializer_class.__name__}.{key} is not a column of {model.__name__}.')
+            self.fields.append((key, column, field))
+
+        self.columns = list(dict.fromkeys(column for key, column, field in self.fields))
+
+    def values(self, queryset, *extra):
+        """`queryset` as `values()` dicts holding the projected columns, and the `extra` ones."""
+        return queryset.values(*self.columns, *(column for column in extra if column not in self.columns))
+
+    def represent(self, rows):
+        fields = [(key, column, self.compile(field)) for key, column, field in self.fields]
+        ret = []
+        for row in rows:
+            item = {}
+            for key, column, to_representation in fields:
+                value = row[column]
+                item[key] = value if to_representation is None or value is None else to_representation(value)
+            ret.append(item)
+        return ret
+
+    def compile(self, field):
+        """The `to_representation` of `field` for database values, `None` when they are used as is."""
+        field_type = type(field)
+        if field_type in (serializers.CharField, serializers.EmailField):
+            return None
+
+        if field_type is serializers.UUIDField and field.uuid_format == 'hex_verbose':
+            return str
+
+        if field_type is serializers.DecimalField and field.decimal_places is not None and not getattr(field, 'coerce_to_string', api_settings.COERCE_DECIMAL_TO_STRING):
+            # database values already have the decimal places of their column, quantizing them is a no-op
+            exponent = -field.decimal_places
+
+            def decimal_representation(value):
+                if type(value) is Decimal and value.as_tuple().exponent == exponent:
+                    return value
+                return field.to_representation(value)
+            return decimal_representation
+
+        if field_type is serializers.DateTimeField and getattr(field, 'format', api_settings.DATETIME_FORMAT) == ISO_8601 and not hasattr(field, 'timezone'):
+            field_timezone = field.default_timezone()
+
+            def datetime_representation(value):
+                if type(value) is not datetime or value.tzinfo is None or field_timezone is None:
+                    return field.to_representation(value)
+                value = value.astimezone(field_timezone).isoformat()
+                return value[:-6] + 'Z' if value.endswith('+00:00') else value
+            return datetime_representation
+
+        return field.to_representation
+
+
+@lru_cache(maxsize=None)
+def get_projection(serializer_class):
+    return ValuesProjection(serializer_class)
+
+
+class ValuesListMixin:
+    """
+    `list()` (and `alist()` for async views) reading the page with `values()` and representing
+    it through the `ValuesProjection` of the view's serializer, skipping model instances.
+    """
+
+    def get_projection(self):
+        return get_projection(self.get_serializer_class())
+
+    def get_values_queryset(self):
+        # the paginator reads the cursor position from the ordering columns of the rows
+        ordering = getattr(self.paginator, 'ordering', ())
+        if isinstance(ordering, str):
+            ordering = (ordering, )
+        queryset = self.filter_queryset(self.get_queryset())
+        return self.get_projection().values(queryset, *(field.lstrip('-') for field in ordering))
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.get_values_queryset()
+
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(self.get_projection().represent(page))
+
+        return Response(self.get_projection().represent(queryset))
+
+    async def alist(self, request, *args, **kwargs):
+        queryset = self.get_values_queryset()
+
+        page = await self.paginator.apaginate_queryset(queryset, request, view=self) if self.paginator else None
+        if page is not None:
+            return self.get_paginated_response(self.get_projection().represent(page))
+
+        return Response(self.get_projection().represent([row async for row in queryset]))
@@ -1,7 +1,72 @@
-from rest_framework.renderers import JSONRenderer
+import csv
+import datetime
+from decimal import Decimal
+import orjson
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils import encoders
 
+# Datetimes go through `default` too, so they are written exactly like DRF writes them ('Z' for UTC)
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+
+_encoder = encoders.JSONEncoder()
+
+
+def _default(obj):
+    # Decimal is by far the most common, and a float because of COERCE_DECIMAL_TO_STRING=False
+    if type(obj) is Decimal:
+        return float(obj)
+    return _encoder.default(obj)
+
+
+def dumps(data):
+    """`data` as the compact UTF-8 JSON that DRF's JSONRenderer produces, encoded with orjson."""
+    ret = orjson.dumps(data, default=_default, option=ORJSON_OPTIONS)
+    # like DRF, escape the two line terminators that are valid JSON but not valid JavaScript
+    if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+        ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+    return ret
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer encoding with orjson. The output is byte for byte the one of JSONRenderer,
+    indented output (`; indent=4`, the browsable API) is left to JSONRenderer.
+    """
 
-class LoginRenderer(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        if self.ensure_ascii or not self.compact or self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            return dumps(data)
+        except orjson.JSONEncodeError:
+            # eg. integers beyond 64 bits, which the stdlib encoder still handles
+            return super().render(data, accepted_media_type, renderer_context)
+
+
+class ORJSONParser(JSONParser):
+    """JSONParser decoding UTF-8 bodies with orjson."""
+    renderer_class = ORJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        if encoding.lower().replace('_', '-') not in ('utf-8', 'utf8'):
+            return super().parse(stream, media_type, parser_context)
+
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
+
+
+class LoginRenderer(ORJSONRenderer):
     def render(self, data, accepted_media_type=None, renderer_context=None):
         status_code = renderer_context['response'].status_code
 
@@ -15,6 +80,75 @@ class LoginRenderer(JSONRenderer):
         return super(LoginRenderer, self).render(response, accepted_media_type, renderer_context)
 
 
+class _Echo:
+    """File-like object handing back whatever the csv writer writes to it."""
+    def write(self, value):
+        return value
+
+
+class StreamRenderer(BaseRenderer):
+    """
+    Base for renderers of row streams. `stream()` lazily turns an iterable of rows
+    into chunks of `rows_per_chunk` rows, so a StreamingHttpResponse never holds
+    more than one chunk in memory.
+    """
+    rows_per_chunk = 500
+
+    def stream(self, columns, rows):
+        header = self.render_header(columns)
+        chunk = [header] if header else []
+        for row in rows:
+            chunk.append(self.render_row(columns, row))
+            if len(chunk) >= self.rows_per_chunk:
+                yield ''.join(chunk)
+                chunk = []
+        if chunk:
+            yield ''.join(chunk)
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if not data:
+            return b''
+        rows = data if isinstance(data, list) else [data]
+        return ''.join(self.stream(list(rows[0]), rows)).encode()
+
+    def render_header(self, columns):
+        return ''
+
+    def render_row(self, columns, row):
+        raise NotImplementedError('StreamRenderer.render_row() must be implemented.')
+
+
+class CSVRenderer(StreamRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+    charset = 'utf-8'
+
+    def __init__(self):
+        self.writer = csv.writer(_Echo())
+
+    def render_header(self, columns):
+        return self.writer.writerow(columns)
+
+    def render_row(self, columns, row):
+        return self.writer.writerow([self.format_value(row[column]) for column in columns])
+
+    def format_value(self, value):
+        # timestamps are written the same way the JSON endpoints write them
+        if isinstance(value, datetime.datetime):
+            return encoders.JSONEncoder().default(value)
+        return value
+
+
+class NDJSONRenderer(StreamRenderer):
+    """Newline delimited JSON, one compact JSON object per row."""
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+    charset = None
+
+    def render_row(self, columns, row):
+        return dumps({column: row[column] for column in columns}).decode() + '\n'
+
+
 """
 class CustomResponseRenderer(JSONRenderer):
     '''
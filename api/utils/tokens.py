@@ -0,0 +1,89 @@
+import threading
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.utils import datetime_from_epoch
+
+
+class BlacklistCache:
+    """
+    In-process set of the JTIs of blacklisted refresh tokens that have not expired yet.
+
+    It is loaded once, then topped up at most every `refresh_interval` seconds with the tokens
+    blacklisted since the previous load (with some overlap for transactions committing late),
+    so checking a refresh token no longer queries the blacklist table. Tokens blacklisted by
+    another process are picked up within `refresh_interval` seconds, those blacklisted by this
+    process at once.
+    """
+    overlap = timedelta(minutes=1)
+
+    def __init__(self, refresh_interval):
+        self.refresh_interval = refresh_interval
+        self._lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        with self._lock:
+            self._expiries = {}
+            self._loaded_since = None
+            self._next_load = 0
+
+    def __contains__(self, jti):
+        if time.monotonic() >= self._next_load:
+            self.load()
+        return jti in self._expiries
+
+    def add(self, jti, expires_at):
+        with self._lock:
+            self._expiries[jti] = expires_at
+
+    def load(self):
+        now = timezone.now()
+        blacklisted = BlacklistedToken.objects.filter(token__expires_at__gt=now)
+        if self._loaded_since is not None:
+            blacklisted = blacklisted.filter(blacklisted_at__gte=self._loaded_since - self.overlap)
+        rows = list(blacklisted.values_list('token__jti', 'token__expires_at'))
+
+        with self._lock:
+            # expired tokens are rejected on their own, they no longer need to be remembered
+            self._expiries = {jti: expires_at for jti, expires_at in self._expiries.items() if expires_at > now}
+            self._expiries.update(rows)
+            self._loaded_since = now
+            self._next_load = time.monotonic() + self.refresh_interval
+
+
+blacklist_cache = BlacklistCache(refresh_interval=settings.TOKEN_BLACKLIST_CACHE_REFRESH)
+
+
+class CachedRefreshToken(RefreshToken):
+    """RefreshToken checked against the in-process blacklist cache instead of the blacklist table."""
+
+    def check_blacklist(self):
+        if self.payload[api_settings.JTI_CLAIM] in blacklist_cache:
+            raise TokenError(_('Token is blacklisted'))
+
+    def blacklist(self):
+        result = super().blacklist()
+        blacklist_cache.add(self.payload[api_settings.JTI_CLAIM], datetime_from_epoch(self.payload['exp']))
+        return result
+
+
+def prune_tokens(batch_size=1000):
+    """
+    Delete the expired outstanding tokens, and with them their blacklist entries, `batch_size`
+    at a time so that no single statement locks the tables for long. Returns how many were deleted.
+    """
+    expired = OutstandingToken.objects.filter(expires_at__lte=timezone.now()).order_by('pk').values_list('pk', flat=True)
+    deleted = 0
+    while True:
+        pks = list(expired[:batch_size])
+        if not pks:
+            return deleted
+        OutstandingToken.objects.filter(pk__in=pks).delete()
+        deleted += len(pks)
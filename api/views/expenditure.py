@@ -1,13 +1,20 @@
+from asgiref.sync import sync_to_async
 from django.forms import ValidationError
+from django.utils import timezone
 from rest_framework import permissions
 from rest_framework import generics, status
 from apps.account.models import Expenditure
 from rest_framework.response import Response
+from api.serializers.bulk import BulkDeleteSchemaSerializer, BulkDeleteSerializer, BulkUpdateSchemaSerializer, BulkUpdateSerializer
 from api.serializers.expenditure import UserExpenditureDeleteSchemaSerializer, UserExpenditureSerializer, UserExpenditureUpdateSerializer
-from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiExample
+from api.utils.asynchronous import AsyncAPIViewMixin, AsyncCreateMixin
+from api.utils.bulk import BulkLedgerMixin
+from api.utils.conditional import async_own_data_condition, own_data_condition
+from api.utils.projection import ValuesListMixin
+from drf_spectacular.utils import extend_schema, extend_schema_view, OpenApiParameter, OpenApiExample, OpenApiResponse
 
 # EXPENDITURE
-class ExpenditureListCreateView(generics.ListCreateAPIView):
+class ExpenditureListCreateView(ValuesListMixin, generics.ListCreateAPIView):
     queryset = Expenditure.objects.order_by('-created_at')
     serializer_class = UserExpenditureSerializer
     permission_classes = (permissions.IsAuthenticated, )
@@ -20,11 +27,12 @@ class ExpenditureListCreateView(generics.ListCreateAPIView):
     @extend_schema(
         responses={status.HTTP_200_OK: UserExpenditureSerializer},
         summary="Get user's expenditure data",
-        description="This endpoint returns the user's expenditure",
+        description="This endpoint returns the user's expenditure, newest first, one cursor page at a time",
         methods=['get'],
         operation_id='getUserExpenditure',
         tags=["expense"]
     )
+    @own_data_condition
     def get(self, request, *args, **kwargs):
         return super().get(request, *args, **kwargs)
 
@@ -42,16 +50,73 @@ class ExpenditureListCreateView(generics.ListCreateAPIView):
         return super().post(request, *args, **kwargs)
 
 
+@extend_schema_view(
+    post=extend_schema(
+        request=UserExpenditureSerializer(many=True),
+        responses={
+            status.HTTP_201_CREATED: UserExpenditureSerializer(many=True),
+            status.HTTP_400_BAD_REQUEST: OpenApiResponse(response=None, description='Invalid expenditure data, with the errors of every item'),
+        },
+        summary="Add many expenditures at once",
+        description="This endpoint adds a list of expenditures in a single transaction. Either all of them are created or, if any item is invalid, none is.",
+        operation_id='bulkAddUserExpenditure',
+        tags=["expense"]
+    ),
+    patch=extend_schema(
+        request=BulkUpdateSerializer,
+        responses={status.HTTP_200_OK: BulkUpdateSchemaSerializer},
+        summary="Update many expenditures at once",
+        description="This endpoint applies the same partial update to every listed expenditure of the user with a single UPDATE statement.",
+        operation_id='bulkUpdateUserExpenditure',
+        tags=["expense"]
+    ),
+    delete=extend_schema(
+        request=BulkDeleteSerializer,
+        responses={status.HTTP_200_OK: BulkDeleteSchemaSerializer},
+        summary="Delete many expenditures at once",
+        description="This endpoint deletes every listed expenditure of the user with a single DELETE statement.",
+        operation_id='bulkDeleteUserExpenditure',
+        tags=["expense"]
+    ),
+)
+class ExpenditureBulkView(BulkLedgerMixin, generics.GenericAPIView):
+    queryset = Expenditure.objects.order_by('-created_at')
+    serializer_class = UserExpenditureSerializer
+    permission_classes = (permissions.IsAuthenticated, )
+    item_name = 'expenditure'
+
+    # return qs containing expenditures of logged in user only
+    def get_queryset(self):
+        return self.queryset.filter(user=self.request.user)
+
 class ExpenditureRetrieveUpdateDeleteView(generics.GenericAPIView):
     queryset = Expenditure.objects.order_by('-created_at')
     serializer_class = UserExpenditureSerializer
     permission_classes = (permissions.IsAuthenticated, )
     lookup_field = 'id'
+    # the fields an update responds with
+    response_fields = ('category', 'nameOfItem', 'estimatedAmount')
 
     # return qs containing expenditures of logged in user only
     def get_queryset(self):
         return self.queryset.filter(user=self.request.user)
 
+    def update_expenditure(self, expenditureID, data):
+        """
+        Write the validated `data` to the user's expenditure with one UPDATE of just the sent columns,
+        and return the response fields of the updated row, or None when the user has no such expenditure.
+        """
+        rows = self.get_queryset().filter(pk=expenditureID).order_by().update_returning(self.response_fields, updated_at=timezone.now(), **data)
+        return rows[0] if rows else None
+
+    def update_response(self, ser, row):
+        return {name: ser.fields[name].to_representation(row[name]) for name in self.response_fields}
+
+    def delete_expenditure(self, expenditureID):
+        """Delete the user's expenditure with one scoped DELETE, and return whether it existed."""
+        deleted, _ = self.get_queryset().filter(pk=expenditureID).order_by().delete()
+        return deleted
+
     # get
     @extend_schema(
         responses={status.HTTP_200_OK: UserExpenditureSerializer},
@@ -60,6 +125,7 @@ class ExpenditureRetrieveUpdateDeleteView(generics.GenericAPIView):
         operation_id='getExpenditureByID',
         tags=["expense"]
     )
+    @own_data_condition
     def get(self, request, expenditureID):
         try:
             qs = self.get_queryset()
@@ -84,30 +150,18 @@ class ExpenditureRetrieveUpdateDeleteView(generics.GenericAPIView):
     )
     def put(self, request, expenditureID):
         try:
-            expenditure = Expenditure.objects.get(pk=expenditureID)
-        except Expenditure.DoesNotExist:
-            expenditure = None
-            return Response({'message': 'Expenditure not found'}, status=status.HTTP_404_NOT_FOUND)
+            ser = self.get_serializer(data=request.data, partial=True)
+            if not ser.is_valid():
+                return Response({'message': 'Invalid expenditure data'}, status=status.HTTP_400_BAD_REQUEST)
+            expenditure = self.update_expenditure(expenditureID, ser.validated_data)
         except ValidationError:
-            expenditure = None
             return Response({'message': 'Invalid expenditure ID'}, status=status.HTTP_400_BAD_REQUEST)
-
-        data = request.data
-        try:
-            ser = UserExpenditureSerializer(expenditure, data=data, partial=True)
-            if ser.is_valid():
-                ser.save()
-                resp = {
-                    'category': ser.data['category'],
-                    'nameOfItem': ser.data['nameOfItem'],
-                    'estimatedAmount': ser.data['estimatedAmount'],
-                }
-                return Response(resp, status=status.HTTP_200_OK)
         except Exception:
-            pass
-
-        return Response({'message': 'Invalid expenditure data'}, status=status.HTTP_400_BAD_REQUEST)
+            return Response({'message': 'Invalid expenditure data'}, status=status.HTTP_400_BAD_REQUEST)
 
+        if expenditure is None:
+            return Response({'message': 'Expenditure not found'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(self.update_response(ser, expenditure), status=status.HTTP_200_OK)
 
     # delete
     @extend_schema(
@@ -122,19 +176,66 @@ class ExpenditureRetrieveUpdateDeleteView(generics.GenericAPIView):
     )
     def delete(self, request, expenditureID):
         try:
-            expenditure = Expenditure.objects.get(pk=expenditureID)
+            deleted = self.delete_expenditure(expenditureID)
+        except ValidationError:
+            return Response({'message': 'Invalid expenditure ID'}, status=status.HTTP_400_BAD_REQUEST)
+        except Exception:
+            return Response({'message': 'Error deleting expenditure!'}, status=status.HTTP_400_BAD_REQUEST)
+
+        if not deleted:
+            return Response({'message': 'Expenditure not found'}, status=status.HTTP_404_NOT_FOUND)
+        return Response({'message': 'Expenditure deleted successfully!'}, status=status.HTTP_200_OK)
+
+
+# ASYNC EXPENDITURE, served instead of the views above under ASGI
+class AsyncExpenditureListCreateView(AsyncAPIViewMixin, AsyncCreateMixin, ExpenditureListCreateView):
+
+    @async_own_data_condition
+    async def get(self, request, *args, **kwargs):
+        return await self.alist(request, *args, **kwargs)
+
+    async def post(self, request, *args, **kwargs):
+        return await self.acreate(request, *args, **kwargs)
+
+
+class AsyncExpenditureRetrieveUpdateDeleteView(AsyncAPIViewMixin, ExpenditureRetrieveUpdateDeleteView):
+
+    @async_own_data_condition
+    async def get(self, request, expenditureID):
+        try:
+            expenditure = await self.get_queryset().aget(pk=expenditureID)
         except Expenditure.DoesNotExist:
-            expenditure = None
             return Response({'message': 'Expenditure not found'}, status=status.HTTP_404_NOT_FOUND)
         except ValidationError:
-            expenditure = None
             return Response({'message': 'Invalid expenditure ID'}, status=status.HTTP_400_BAD_REQUEST)
 
+        serializer = self.serializer_class(expenditure)
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+    async def put(self, request, expenditureID):
+        try:
+            ser = self.get_serializer(data=request.data, partial=True)
+            if not ser.is_valid():
+                return Response({'message': 'Invalid expenditure data'}, status=status.HTTP_400_BAD_REQUEST)
+            # the row and the ledger aggregates are written in one transaction on the sync thread
+            expenditure = await sync_to_async(self.update_expenditure)(expenditureID, ser.validated_data)
+        except ValidationError:
+            return Response({'message': 'Invalid expenditure ID'}, status=status.HTTP_400_BAD_REQUEST)
+        except Exception:
+            return Response({'message': 'Invalid expenditure data'}, status=status.HTTP_400_BAD_REQUEST)
+
+        if expenditure is None:
+            return Response({'message': 'Expenditure not found'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(self.update_response(ser, expenditure), status=status.HTTP_200_OK)
+
+    async def delete(self, request, expenditureID):
         try:
-            expenditure.delete()
+            deleted = await sync_to_async(self.delete_expenditure)(expenditureID)
+        except ValidationError:
+            return Response({'message': 'Invalid expenditure ID'}, status=status.HTTP_400_BAD_REQUEST)
         except Exception:
             return Response({'message': 'Error deleting expenditure!'}, status=status.HTTP_400_BAD_REQUEST)
 
+        if not deleted:
+            return Response({'message': 'Expenditure not found'}, status=status.HTTP_404_NOT_FOUND)
         return Response({'message': 'Expenditure deleted successfully!'}, status=status.HTTP_200_OK)
-        
-
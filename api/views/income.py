@@ -1,13 +1,20 @@
+from asgiref.sync import sync_to_async
 from django.forms import ValidationError
+from django.utils import timezone
 from rest_framework import permissions
 from rest_framework import generics, status
 from apps.account.models import Income
 from api.serializers.income import UserIncomeDeleteSchemaSerializer, UserIncomeSerializer, UserIncomeUpdateSerializer
-from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiExample
+from drf_spectacular.utils import extend_schema, extend_schema_view, OpenApiParameter, OpenApiExample, OpenApiResponse
 from rest_framework.response import Response
+from api.serializers.bulk import BulkDeleteSchemaSerializer, BulkDeleteSerializer, BulkUpdateSchemaSerializer, BulkUpdateSerializer
+from api.utils.asynchronous import AsyncAPIViewMixin, AsyncCreateMixin
+from api.utils.bulk import BulkLedgerMixin
+from api.utils.conditional import async_own_data_condition, own_data_condition
+from api.utils.projection import ValuesListMixin
 
 # INCOME
-class IncomeListCreateView(generics.ListCreateAPIView):
+class IncomeListCreateView(ValuesListMixin, generics.ListCreateAPIView):
     queryset = Income.objects.order_by('-created_at')
     serializer_class = UserIncomeSerializer
     permission_classes = (permissions.IsAuthenticated, )
@@ -20,11 +27,12 @@ class IncomeListCreateView(generics.ListCreateAPIView):
     @extend_schema(
         responses    = {status.HTTP_200_OK: serializer_class},
         summary      = "Get user's income data",
-        description  = "This endpoint returns the user's income",
+        description  = "This endpoint returns the user's income, newest first, one cursor page at a time",
         methods      = ['get'],
         operation_id = 'getUserIncome',
         tags         = ["income"]
     )
+    @own_data_condition
     def get(self, request, *args, **kwargs):
         return super().get(request, *args, **kwargs)
 
@@ -42,16 +50,73 @@ class IncomeListCreateView(generics.ListCreateAPIView):
         return super().post(request, *args, **kwargs)
 
 
+@extend_schema_view(
+    post=extend_schema(
+        request=UserIncomeSerializer(many=True),
+        responses={
+            status.HTTP_201_CREATED: UserIncomeSerializer(many=True),
+            status.HTTP_400_BAD_REQUEST: OpenApiResponse(response=None, description='Invalid income data, with the errors of every item'),
+        },
+        summary="Add many incomes at once",
+        description="This endpoint adds a list of incomes in a single transaction. Either all of them are created or, if any item is invalid, none is.",
+        operation_id='bulkAddUserIncome',
+        tags=["income"]
+    ),
+    patch=extend_schema(
+        request=BulkUpdateSerializer,
+        responses={status.HTTP_200_OK: BulkUpdateSchemaSerializer},
+        summary="Update many incomes at once",
+        description="This endpoint applies the same partial update to every listed income of the user with a single UPDATE statement.",
+        operation_id='bulkUpdateUserIncome',
+        tags=["income"]
+    ),
+    delete=extend_schema(
+        request=BulkDeleteSerializer,
+        responses={status.HTTP_200_OK: BulkDeleteSchemaSerializer},
+        summary="Delete many incomes at once",
+        description="This endpoint deletes every listed income of the user with a single DELETE statement.",
+        operation_id='bulkDeleteUserIncome',
+        tags=["income"]
+    ),
+)
+class IncomeBulkView(BulkLedgerMixin, generics.GenericAPIView):
+    queryset = Income.objects.order_by('-created_at')
+    serializer_class = UserIncomeSerializer
+    permission_classes = (permissions.IsAuthenticated, )
+    item_name = 'income'
+
+    # return qs containing incomes of logged in user only
+    def get_queryset(self):
+        return self.queryset.filter(user=self.request.user)
+
 class IncomeRetrieveUpdateDeleteView(generics.GenericAPIView):
     queryset = Income.objects.order_by('-created_at')
     serializer_class = UserIncomeSerializer
     permission_classes = (permissions.IsAuthenticated, )
     lookup_field = 'id'
+    # the fields an update responds with
+    response_fields = ('nameOfRevenue', 'amount')
 
     # return qs containing incomes of logged in user only
     def get_queryset(self):
         return self.queryset.filter(user=self.request.user)
 
+    def update_income(self, incomeID, data):
+        """
+        Write the validated `data` to the user's income with one UPDATE of just the sent columns,
+        and return the response fields of the updated row, or None when the user has no such income.
+        """
+        rows = self.get_queryset().filter(pk=incomeID).order_by().update_returning(self.response_fields, updated_at=timezone.now(), **data)
+        return rows[0] if rows else None
+
+    def update_response(self, ser, row):
+        return {name: ser.fields[name].to_representation(row[name]) for name in self.response_fields}
+
+    def delete_income(self, incomeID):
+        """Delete the user's income with one scoped DELETE, and return whether it existed."""
+        deleted, _ = self.get_queryset().filter(pk=incomeID).order_by().delete()
+        return deleted
+
     # get
     @extend_schema(
         parameters=[
@@ -63,6 +128,7 @@ class IncomeRetrieveUpdateDeleteView(generics.GenericAPIView):
         operation_id ='getIncomeByID',
         tags         =["income"]
     )
+    @own_data_condition
     def get(self, request, incomeID):
         try:
             qs = self.get_queryset()
@@ -90,28 +156,18 @@ class IncomeRetrieveUpdateDeleteView(generics.GenericAPIView):
     )
     def put(self, request, incomeID):
         try:
-            income = Income.objects.get(pk=incomeID)
-        except Income.DoesNotExist:
-            income = None
-            return Response({'message': 'Income not found'}, status=status.HTTP_404_NOT_FOUND)
+            ser = self.get_serializer(data=request.data, partial=True)
+            if not ser.is_valid():
+                return Response({'message': 'Invalid income data'}, status=status.HTTP_400_BAD_REQUEST)
+            income = self.update_income(incomeID, ser.validated_data)
         except ValidationError:
-            income = None
             return Response({'message': 'Invalid income ID'}, status=status.HTTP_400_BAD_REQUEST)
-
-        data = request.data
-        try:
-            ser = UserIncomeSerializer(income, data=data, partial=True)
-            if ser.is_valid():
-                ser.save()
-                resp = {
-                    'nameOfRevenue': ser.data['nameOfRevenue'],
-                    'amount': ser.data['amount'],
-                }
-                return Response(resp, status=status.HTTP_200_OK)
         except Exception:
-            pass
+            return Response({'message': 'Invalid income data'}, status=status.HTTP_400_BAD_REQUEST)
 
-        return Response({'message': 'Invalid income data'}, status=status.HTTP_400_BAD_REQUEST)
+        if income is None:
+            return Response({'message': 'Income not found'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(self.update_response(ser, income), status=status.HTTP_200_OK)
 
     # delete
     @extend_schema(
@@ -126,19 +182,66 @@ class IncomeRetrieveUpdateDeleteView(generics.GenericAPIView):
     )
     def delete(self, request, incomeID):
         try:
-            income = Income.objects.get(pk=incomeID)
+            deleted = self.delete_income(incomeID)
+        except ValidationError:
+            return Response({'message': 'Invalid income ID'}, status=status.HTTP_400_BAD_REQUEST)
+        except Exception:
+            return Response({'message': 'Error deleting income!'}, status=status.HTTP_400_BAD_REQUEST)
+
+        if not deleted:
+            return Response({'message': 'Income not found'}, status=status.HTTP_404_NOT_FOUND)
+        return Response({'message': 'Income deleted successfully!'}, status=status.HTTP_200_OK)
+
+
+# ASYNC INCOME, served instead of the views above under ASGI
+class AsyncIncomeListCreateView(AsyncAPIViewMixin, AsyncCreateMixin, IncomeListCreateView):
+
+    @async_own_data_condition
+    async def get(self, request, *args, **kwargs):
+        return await self.alist(request, *args, **kwargs)
+
+    async def post(self, request, *args, **kwargs):
+        return await self.acreate(request, *args, **kwargs)
+
+
+class AsyncIncomeRetrieveUpdateDeleteView(AsyncAPIViewMixin, IncomeRetrieveUpdateDeleteView):
+
+    @async_own_data_condition
+    async def get(self, request, incomeID):
+        try:
+            income = await self.get_queryset().aget(pk=incomeID)
         except Income.DoesNotExist:
-            income = None
             return Response({'message': 'Income not found'}, status=status.HTTP_404_NOT_FOUND)
         except ValidationError:
-            income = None
             return Response({'message': 'Invalid income ID'}, status=status.HTTP_400_BAD_REQUEST)
 
+        serializer = self.serializer_class(income)
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+    async def put(self, request, incomeID):
+        try:
+            ser = self.get_serializer(data=request.data, partial=True)
+            if not ser.is_valid():
+                return Response({'message': 'Invalid income data'}, status=status.HTTP_400_BAD_REQUEST)
+            # the row and the ledger aggregates are written in one transaction on the sync thread
+            income = await sync_to_async(self.update_income)(incomeID, ser.validated_data)
+        except ValidationError:
+            return Response({'message': 'Invalid income ID'}, status=status.HTTP_400_BAD_REQUEST)
+        except Exception:
+            return Response({'message': 'Invalid income data'}, status=status.HTTP_400_BAD_REQUEST)
+
+        if income is None:
+            return Response({'message': 'Income not found'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(self.update_response(ser, income), status=status.HTTP_200_OK)
+
+    async def delete(self, request, incomeID):
         try:
-            income.delete()
+            deleted = await sync_to_async(self.delete_income)(incomeID)
+        except ValidationError:
+            return Response({'message': 'Invalid income ID'}, status=status.HTTP_400_BAD_REQUEST)
         except Exception:
             return Response({'message': 'Error deleting income!'}, status=status.HTTP_400_BAD_REQUEST)
 
+        if not deleted:
+            return Response({'message': 'Income not found'}, status=status.HTTP_404_NOT_FOUND)
         return Response({'message': 'Income deleted successfully!'}, status=status.HTTP_200_OK)
-        
-
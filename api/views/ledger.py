@@ -0,0 +1,140 @@
+import codecs
+import tempfile
+from django.conf import settings
+from django.http import FileResponse, StreamingHttpResponse
+from rest_framework import permissions, status
+from rest_framework.views import APIView
+from rest_framework.parsers import MultiPartParser
+from rest_framework.response import Response
+from api.serializers.ledger import (
+    LedgerImportReportSerializer, LedgerImportSerializer, LedgerQuerySerializer,
+    LedgerSummaryQuerySerializer, LedgerSummarySerializer,
+)
+from api.utils.conditional import own_data_condition
+from api.utils.ledger import LEDGER_COLUMNS, LedgerFileError, LedgerImporter, iter_ledger, read_rows, summarize_ledger
+from api.utils.renderers import CSVRenderer, NDJSONRenderer, ORJSONRenderer
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import extend_schema, OpenApiResponse
+
+
+# LEDGER
+class LedgerExportView(APIView):
+    permission_classes = (permissions.IsAuthenticated, )
+    renderer_classes = [CSVRenderer, NDJSONRenderer]
+    chunk_size = 2000
+    # bytes of a spooled export (see `get()`) kept in memory before it moves to a temporary file
+    spool_size = 1024 * 1024
+
+    @extend_schema(
+        parameters   = [LedgerQuerySerializer],
+        responses    = {
+            (200, 'text/csv'): OpenApiResponse(response=OpenApiTypes.STR, description='The ledger as CSV'),
+            (200, 'application/x-ndjson'): OpenApiResponse(response=OpenApiTypes.STR, description='The ledger as newline delimited JSON'),
+        },
+        summary      = "Export the user's ledger",
+        description  = "This endpoint streams the user's incomes and expenditures, oldest first, as CSV or NDJSON "
+                       "(chosen with the Accept header or `?format=csv|ndjson`).",
+        methods      = ['get'],
+        operation_id = 'exportUserLedger',
+        tags         = ["ledger"]
+    )
+    @own_data_condition
+    def get(self, request):
+        query = LedgerQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+
+        renderer = request.accepted_renderer
+        rows = iter_ledger(
+            request.user,
+            kinds=query.get_kinds(),
+            start=query.validated_data.get('start'),
+            end=query.validated_data.get('end'),
+            chunk_size=self.chunk_size,
+        )
+        chunks = renderer.stream(LEDGER_COLUMNS, rows)
+        filename = f'ledger.{renderer.format}'
+        if settings.API_ASYNC_VIEWS:
+            # Django 4.1's ASGI handler iterates streaming responses on the event loop, where the
+            # queries of the rows cannot run, so the export is rendered here, in the view's thread,
+            # into a file that only keeps `spool_size` bytes in memory, and streamed from it
+            spool = tempfile.SpooledTemporaryFile(max_size=self.spool_size)
+            for chunk in chunks:
+                spool.write(chunk.encode())
+            spool.seek(0)
+            return FileResponse(spool, as_attachment=True, filename=filename, content_type=renderer.media_type)
+
+        response = StreamingHttpResponse(chunks, content_type=renderer.media_type)
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        # errors are regular JSON responses, whatever format the export was asked in
+        if isinstance(response, Response):
+            request.accepted_renderer = ORJSONRenderer()
+            request.accepted_media_type = ORJSONRenderer.media_type
+        return super().finalize_response(request, response, *args, **kwargs)
+
+
+class LedgerSummaryView(APIView):
+    permission_classes = (permissions.IsAuthenticated, )
+
+    @extend_schema(
+        parameters   = [LedgerSummaryQuerySerializer],
+        responses    = {200: LedgerSummarySerializer},
+        summary      = "Summarize the user's ledger",
+        description  = "This endpoint returns the total and count of the user's incomes per period, and of the "
+                       "user's expenditures per period and category, for charts. Periods are days, weeks "
+                       "(starting on Monday) or months.",
+        methods      = ['get'],
+        operation_id = 'summarizeUserLedger',
+        tags         = ["ledger"]
+    )
+    @own_data_condition
+    def get(self, request):
+        query = LedgerSummaryQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+
+        granularity = query.validated_data['granularity']
+        summary = summarize_ledger(
+            request.user,
+            kinds=query.get_kinds(),
+            start=query.validated_data.get('start'),
+            end=query.validated_data.get('end'),
+            granularity=granularity,
+        )
+        return Response(LedgerSummarySerializer({'granularity': granularity, **summary}).data, status=status.HTTP_200_OK)
+
+
+class LedgerImportView(APIView):
+    permission_classes = (permissions.IsAuthenticated, )
+    parser_classes = [MultiPartParser]
+
+    @extend_schema(
+        request      = LedgerImportSerializer,
+        responses    = {200: LedgerImportReportSerializer},
+        summary      = "Import rows into the user's ledger",
+        description  = "This endpoint imports a CSV or NDJSON file shaped like the ledger export. The file is read "
+                       "incrementally and valid rows are inserted in batches; invalid rows are skipped and reported "
+                       "by row number. A line that cannot be decoded or parsed stops the import with a 400 giving its "
+                       "number and the report of the rows before it, which are imported.",
+        methods      = ['post'],
+        operation_id = 'importUserLedger',
+        tags         = ["ledger"]
+    )
+    def post(self, request):
+        upload = LedgerImportSerializer(data=request.data)
+        if not upload.is_valid():
+            return Response({'message': 'Invalid import', 'errors': upload.errors}, status=status.HTTP_400_BAD_REQUEST)
+
+        # the uploaded file is decoded line by line rather than read whole
+        lines = codecs.iterdecode(upload.validated_data['file'], 'utf-8-sig')
+        importer = LedgerImporter(request.user, batch_size=settings.IMPORT_BATCH_SIZE, default_kind=upload.validated_data.get('kind'))
+        try:
+            report = importer.run(read_rows(lines, upload.validated_data['format']))
+        except LedgerFileError as exc:
+            # the rows before the unreadable line are imported, the report says which
+            return Response(
+                {'message': 'Invalid import', 'errors': {'file': [str(exc)]}, 'line': exc.line, 'report': exc.report},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        return Response(report, status=status.HTTP_200_OK)
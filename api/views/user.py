@@ -2,14 +2,16 @@ from rest_framework import permissions
 from rest_framework.views import APIView
 from rest_framework import generics, status
 from rest_framework.response import Response
+from api.utils.conditional import profile_condition
 from api.utils.renderers import LoginRenderer
 from rest_framework_simplejwt.views import TokenRefreshView
 from apps.account.models import User
-from rest_framework_simplejwt.tokens import RefreshToken
+from api.utils.tokens import CachedRefreshToken
 from rest_framework_simplejwt.views import TokenObtainPairView
 from api.serializers.user import (
     LoginSerializer,
     LogoutSerializer,
+    RefreshSerializer,
     RefreshTokenSchemaSerializer,
     RegisterUserSerializer,
     UserLoginSchemaSerializer,
@@ -110,40 +112,38 @@ class LoginView(TokenObtainPairView):
         ],
     )
     def post(self, request, *args, **kwargs):
-        # verify login credentials
-        user_obj = User.objects.filter(email=request.data['email']).first()
-
-        # user does not exist
-        if user_obj is None:
-            return Response({'message':'Invalid username/password'}, status=status.HTTP_400_BAD_REQUEST) #we don't want to tell the user that the account doesn't exist
-
-        # check password
-        if not user_obj.check_password(request.data['password']):
-            return Response({'message':'Invalid username/password'}, status=status.HTTP_400_BAD_REQUEST)
-
-        # check if user is active
-        if not user_obj.is_active:
-            return Response({'message':'No active account found with the given credentials'}, status=status.HTTP_404_NOT_FOUND)
+        # verify login credentials, the serializer fetches the user and checks the password once
+        serializer = self.get_serializer(data=request.data)
         try:
-            serializer = self.get_serializer(data=request.data)
-            if serializer.is_valid(raise_exception=True):
-                token = serializer.validated_data['access']
-                refresh_token = serializer.validated_data['refresh']
-                return Response(
-                    {
-                        'id': user_obj.id,
-                        'email': user_obj.email,
-                        'tokens': {
-                            'access': str(token),
-                            'refresh': str(refresh_token)
-                        }
-                    },
-                    status=status.HTTP_200_OK
-                )
+            valid = serializer.is_valid()
         except:
             return Response(status=status.HTTP_400_BAD_REQUEST)
 
+        if not valid:
+            errors = serializer.errors
+            if 'non_field_errors' not in errors:
+                return Response({'message': 'Invalid username/password', 'errors': errors}, status=status.HTTP_400_BAD_REQUEST)
+
+            # unknown email and wrong password share a message, we don't want to tell the user that the account doesn't exist
+            error = errors['non_field_errors'][0]
+            error_status = status.HTTP_404_NOT_FOUND if error.code == 'inactive_account' else status.HTTP_400_BAD_REQUEST
+            return Response({'message': str(error)}, status=error_status)
+
+        user_obj = serializer.user
+        return Response(
+            {
+                'id': user_obj.id,
+                'email': user_obj.email,
+                'tokens': {
+                    'access': serializer.validated_data['access'],
+                    'refresh': serializer.validated_data['refresh'],
+                }
+            },
+            status=status.HTTP_200_OK
+        )
+
 class UserTokenRefreshView(TokenRefreshView):
+    serializer_class = RefreshSerializer
     permission_classes = (permissions.AllowAny, )
 
     @extend_schema(
@@ -184,7 +184,7 @@ class LogoutAPIView(APIView):
 
         if refresh_token:
             try:
-                token = RefreshToken(refresh_token)
+                token = CachedRefreshToken(refresh_token)
                 token.blacklist()
                 return Response(status=status.HTTP_200_OK)
             except:
@@ -207,9 +207,10 @@ class UserProfileView(APIView):
         operation_id = 'getUser',
         tags         = ["user"]
     )
+    @profile_condition
     def get(self, request, userID):
         try:
-            user = User.objects.get(pk=userID)
+            user = User.objects.select_related('balance').get(pk=userID)
         except:
             user = None
             return Response({'message': 'User not found'}, status=status.HTTP_404_NOT_FOUND)
@@ -0,0 +1,168 @@
+"""
+Materialized per-user aggregates of the income and expenditure ledger.
+
+Every write to `Income`/`Expenditure` goes through `LedgerEntry.save()/delete()` or the
+`LedgerQuerySet` bulk methods, which hand the entries they added and removed to `record()`
+inside the same transaction, so the aggregates can be read in O(1) instead of summing the
+whole history. There are two of them: the running `UserBalance` of each user, which also
+holds the version of the user's data used for conditional requests, and the `DailyRollup`
+totals per user, day, kind and category that summaries are read from.
+`rebuild_balances()` and `rebuild_rollups()` recompute them from the raw rows for repairs.
+"""
+from collections import defaultdict, namedtuple
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+
+# The part of a ledger row the aggregates depend on
+Entry = namedtuple('Entry', ['user_id', 'amount', 'day', 'category'])
+
+
+def record(model, added=(), removed=()):
+    """Fold ledger entries written to (`added`) and deleted from (`removed`) `model` into the aggregates."""
+    from apps.account.models import DailyRollup, UserBalance
+
+    deltas = defaultdict(lambda: [Decimal(0), 0])
+    rollup_deltas = defaultdict(lambda: [Decimal(0), 0])
+    for entries, sign in ((added, 1), (removed, -1)):
+        for entry in entries:
+            for delta in (deltas[entry.user_id], rollup_deltas[entry.user_id, entry.day, entry.category]):
+                delta[0] += sign * entry.amount
+                delta[1] += sign
+
+    # every affected user is passed on, even unchanged totals bump the user's version
+    for user_id, (amount, count) in deltas.items():
+        UserBalance.objects.add(user_id, model.ledger_kind, amount, count)
+
+    DailyRollup.objects.add(model.ledger_kind, {key: delta for key, delta in rollup_deltas.items() if any(delta)})
+
+
+def touch(user_ids):
+    """Bump the version of users whose data changed without changing their aggregates."""
+    from apps.account.models import UserBalance
+
+    if user_ids:
+        UserBalance.objects.touch(user_ids)
+
+
+def rebuild_balances(user_ids=None, batch_size=1000):
+    """Recompute the balances of the given users (all users by default) from their ledger rows."""
+    from apps.account.models import Expenditure, Income, User, UserBalance
+
+    users = User.objects.order_by('pk').values_list('pk', flat=True)
+    if user_ids is not None:
+        users = users.filter(pk__in=user_ids)
+
+    rebuilt = 0
+    batch = []
+    for user_id in users.iterator(chunk_size=batch_size):
+        batch.append(user_id)
+        if len(batch) == batch_size:
+            rebuilt += _rebuild_balances(batch, Income, Expenditure, UserBalance)
+            batch = []
+    if batch:
+        rebuilt += _rebuild_balances(batch, Income, Expenditure, UserBalance)
+    return rebuilt
+
+
+def _rebuild_balances(user_ids, Income, Expenditure, UserBalance):
+    totals = {user_id: {} for user_id in user_ids}
+    for model in (Income, Expenditure):
+        rows = (
+            model.objects.filter(user_id__in=user_ids)
+            .values('user_id')
+            .annotate(total=Sum(model.amount_field), count=Count('pk'))
+            .order_by()
+        )
+        for row in rows:
+            totals[row['user_id']][f'total_{model.ledger_kind}'] = row['total']
+            totals[row['user_id']][f'{model.ledger_kind}_count'] = row['count']
+
+    with transaction.atomic():
+        UserBalance.objects.bulk_create(
+            [UserBalance(user_id=user_id, **values) for user_id, values in totals.items()],
+            update_conflicts=True,
+            unique_fields=['user'],
+            update_fields=['total_income', 'income_count', 'total_expense', 'expense_count'],
+        )
+        UserBalance.objects.touch(user_ids)
+    return len(user_ids)
+
+
+def rebuild_rollups(user_ids=None, batch_size=100):
+    """Recompute the daily rollups of the given users (all users by default) from their ledger rows."""
+    from apps.account.models import User
+
+    users = User.objects.order_by('pk').values_list('pk', flat=True)
+    if user_ids is not None:
+        users = users.filter(pk__in=user_ids)
+
+    rebuilt = 0
+    batch = []
+    for user_id in users.iterator(chunk_size=batch_size):
+        batch.append(user_id)
+        if len(batch) == batch_size:
+            rebuilt += _rebuild_rollups(batch)
+            batch = []
+    if batch:
+        rebuilt += _rebuild_rollups(batch)
+    return rebuilt
+
+
+def verify_rollups(user_ids=None):
+    """
+    Compare the stored daily rollups with the ledger rows and return the mismatches as
+    `(user_id, day, kind, category, stored (total, count), expected (total, count))` tuples.
+    """
+    from apps.account.models import DailyRollup
+
+    stored = DailyRollup.objects.order_by()
+    if user_ids is not None:
+        stored = stored.filter(user_id__in=user_ids)
+    stored = {
+        (row.user_id, row.day, row.kind, row.category): (row.total, row.count)
+        for row in stored.iterator()
+    }
+    expected = {key: value for key, value in compute_rollups(user_ids)}
+
+    mismatches = []
+    for key in sorted(stored.keys() | expected.keys(), key=str):
+        if stored.get(key) != expected.get(key):
+            mismatches.append((*key, stored.get(key), expected.get(key)))
+    return mismatches
+
+
+def compute_rollups(user_ids=None):
+    """Yield `((user_id, day, kind, category), (total, count))` for the daily rollups computed from the ledger rows."""
+    from apps.account.models import Expenditure, Income
+
+    for model in (Income, Expenditure):
+        queryset = model.objects.order_by()
+        if user_ids is not None:
+            queryset = queryset.filter(user_id__in=user_ids)
+        group_by = ['user_id', 'day', model.category_field] if model.category_field else ['user_id', 'day']
+        rows = (
+            queryset.annotate(day=TruncDate('created_at'))
+            .values(*group_by)
+            .annotate(total=Sum(model.amount_field), count=Count('pk'))
+            .values_list(*group_by, 'total', 'count')
+        )
+        for user_id, day, *category, total, count in rows.iterator():
+            yield (user_id, day, model.ledger_kind, category[0] if category else ''), (total, count)
+
+
+def _rebuild_rollups(user_ids):
+    from apps.account.models import DailyRollup
+
+    with transaction.atomic():
+        DailyRollup.objects.filter(user_id__in=user_ids).delete()
+        DailyRollup.objects.bulk_create(
+            [
+                DailyRollup(user_id=user_id, day=day, kind=kind, category=category, total=total, count=count)
+                for (user_id, day, kind, category), (total, count) in compute_rollups(user_ids)
+            ],
+            batch_size=1000,
+        )
+    return len(user_ids)
@@ -0,0 +1,84 @@
+import os
+import time
+import uuid
+from decimal import Decimal
+from django.conf import settings
+from django.db import models
+
+
+def uuid7(timestamp=None, randbits=None):
+    """
+    A time-ordered UUID: the Unix time in milliseconds in the first 48 bits, then the
+    version, variant and 74 random bits (RFC 9562 version 7). Keys made later sort after
+    earlier ones, so inserts append to the end of the indexes instead of landing at random.
+    `timestamp` (seconds, defaults to now) and `randbits(k)` make the value reproducible.
+    """
+    ms = int((time.time() if timestamp is None else timestamp) * 1000) & (1 << 48) - 1
+    rand = randbits(74) if randbits else int.from_bytes(os.urandom(10), 'big') >> 6
+    rand_a, rand_b = rand >> 62, rand & (1 << 62) - 1
+    return uuid.UUID(int=ms << 80 | 0x7 << 76 | rand_a << 64 | 0b10 << 62 | rand_b)
+
+
+def new_uuid():
+    """Primary key default: a time-ordered UUID with `UUID7_PRIMARY_KEYS` set, a random one otherwise."""
+    return uuid7() if settings.UUID7_PRIMARY_KEYS else uuid.uuid4()
+
+
+class CompactUUIDField(models.UUIDField):
+    """
+    UUIDField stored as 16 bytes on databases without a native uuid type (SQLite here),
+    instead of the 32 characters of its hex form, which every index and foreign key
+    column referencing it repeats. Raw bytes sort like the hex form, so orderings on the
+    column are unchanged. Databases with a uuid type keep using it.
+    """
+
+    def get_internal_type(self):
+        # keeps the backends' UUIDField converters, which expect the hex form, away from the bytes
+        return 'CompactUUIDField'
+
+    def db_type(self, connection):
+        if connection.features.has_native_uuid_field:
+            return connection.data_types['UUIDField']
+        return 'blob'
+
+    def get_db_prep_value(self, value, connection, prepared=False):
+        if value is None:
+            return None
+        if not isinstance(value, uuid.UUID):
+            value = self.to_python(value)
+        return value if connection.features.has_native_uuid_field else value.bytes
+
+    def from_db_value(self, value, expression, connection):
+        if value is None or isinstance(value, uuid.UUID):
+            return value
+        if isinstance(value, (bytes, memoryview)):
+            return uuid.UUID(bytes=bytes(value))
+        # a row written before the column was converted
+        return uuid.UUID(value)
+
+
+class MoneyField(models.DecimalField):
+    """
+    DecimalField stored as an integer count of its smallest unit (cents with 2 decimal
+    places). Models, forms and serializers still see `Decimal` values, while the database
+    sums and compares plain integers and rows decode without going through floats.
+    """
+
+    def get_internal_type(self):
+        # the column type, and no backend decimal converters on the integers
+        return 'BigIntegerField'
+
+    def get_db_prep_value(self, value, connection, prepared=False):
+        if not prepared:
+            value = self.get_prep_value(value)
+        if value is None:
+            return None
+        return int(value.scaleb(self.decimal_places).to_integral_value())
+
+    def get_db_prep_save(self, value, connection):
+        return self.get_db_prep_value(value, connection)
+
+    def from_db_value(self, value, expression, connection):
+        if value is None:
+            return value
+        return Decimal(value).scaleb(-self.decimal_places)
@@ -0,0 +1,47 @@
+import codecs
+import json
+from django.core.management.base import BaseCommand, CommandError
+from api.utils.ledger import LEDGER_KINDS, LedgerFileError, LedgerImporter, read_rows
+from apps.account.models import User
+
+
+class Command(BaseCommand):
+    help = "Import a CSV or NDJSON file shaped like the ledger export into a user's ledger."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='File to import.')
+        parser.add_argument('--user', required=True, metavar='EMAIL', help='Email of the user owning the imported rows.')
+        parser.add_argument('--format', choices=['csv', 'ndjson'], help='Format of the file, guessed from its extension by default.')
+        parser.add_argument('--kind', choices=list(LEDGER_KINDS), help='Kind of the rows without a `kind` column.')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Number of valid rows inserted per batch.')
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(email=options['user'])
+        except User.DoesNotExist:
+            raise CommandError(f"User {options['user']} does not exist")
+
+        format = options['format'] or options['path'].rpartition('.')[2].lower()
+        if format not in ('csv', 'ndjson'):
+            raise CommandError('Could not guess the format from the file name, use --format')
+
+        importer = LedgerImporter(user, batch_size=options['batch_size'], default_kind=options['kind'])
+        stopped = None
+        # decoded line by line, so an undecodable line is reported with its number
+        with open(options['path'], 'rb') as file:
+            try:
+                report = importer.run(read_rows(codecs.iterdecode(file, 'utf-8-sig'), format))
+            except LedgerFileError as exc:
+                report, stopped = exc.report, exc
+
+        for error in report['errors']:
+            self.stderr.write(f"row {error['row']}: {json.dumps(error['errors'])}")
+        if report['failed'] > len(report['errors']):
+            self.stderr.write(f"... and {report['failed'] - len(report['errors'])} more rejected row(s)")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {report['created']} of {report['rows']} row(s) in {report['seconds']}s "
+            f"({report['rows_per_second']} rows/sec), {report['failed']} rejected."
+        ))
+        if stopped:
+            raise CommandError(f'Import stopped: {stopped}')
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from api.utils.tokens import prune_tokens
+
+
+class Command(BaseCommand):
+    help = "Delete the expired outstanding and blacklisted refresh tokens in batches. Meant to be run periodically, e.g. from cron."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Number of tokens deleted per statement.')
+
+    def handle(self, *args, **options):
+        deleted = prune_tokens(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} expired token(s).'))
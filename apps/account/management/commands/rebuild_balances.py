@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from apps.account.aggregates import rebuild_balances
+
+
+class Command(BaseCommand):
+    help = "Recompute the materialized user balances from the income and expenditure rows."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', dest='users', action='append', metavar='USER_ID', help='Only rebuild the balance of this user (repeatable).')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Number of users rebuilt per transaction.')
+
+    def handle(self, *args, **options):
+        rebuilt = rebuild_balances(user_ids=options['users'], batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {rebuilt} user balance(s).'))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand, CommandError
+from apps.account.aggregates import rebuild_rollups, verify_rollups
+
+
+class Command(BaseCommand):
+    help = "Backfill the daily rollups from the income and expenditure rows, or verify them with --verify."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', dest='users', action='append', metavar='USER_ID', help='Only process the rollups of this user (repeatable).')
+        parser.add_argument('--batch-size', type=int, default=100, help='Number of users rebuilt per transaction.')
+        parser.add_argument('--verify', action='store_true', help='Only compare the rollups with the ledger rows and report the differences.')
+
+    def handle(self, *args, **options):
+        if not options['verify']:
+            rebuilt = rebuild_rollups(user_ids=options['users'], batch_size=options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(f'Rebuilt the daily rollups of {rebuilt} user(s).'))
+            return
+
+        mismatches = verify_rollups(user_ids=options['users'])
+        for user_id, day, kind, category, stored, expected in mismatches:
+            self.stderr.write(f'{user_id} {day} {kind} {category!r}: stored {stored}, expected {expected}')
+        if mismatches:
+            raise CommandError(f'{len(mismatches)} daily rollup(s) differ from the ledger, run rebuild_rollups to repair them.')
+        self.stdout.write(self.style.SUCCESS('The daily rollups match the ledger.'))
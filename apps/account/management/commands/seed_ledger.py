@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand, CommandError
+from apps.account.models import User
+from apps.account.seeding import seed_ledger, seed_phone_numbers
+
+
+class Command(BaseCommand):
+    help = "Create synthetic users with income and expenditure rows, for scale testing. The same --seed always gives the same data."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, required=True, help='Number of users to create.')
+        parser.add_argument('--rows-per-user', type=int, required=True, help='Number of ledger rows per user, a fifth of them incomes.')
+        parser.add_argument('--seed', type=int, default=0, help='Seed of the generated data. Each seed can be used once per database.')
+        parser.add_argument('--password', default='password', help='Password of every created user.')
+        parser.add_argument('--days', type=int, default=365 * 3, help='Number of past days the rows are spread over.')
+        parser.add_argument('--batch-size', type=int, default=10000, help='Number of rows inserted per statement.')
+
+    def handle(self, *args, **options):
+        if options['users'] < 1 or options['rows_per_user'] < 0:
+            raise CommandError('--users must be positive and --rows-per-user not negative')
+        if User.objects.filter(email__startswith=f"seed{options['seed']}-user").exists():
+            raise CommandError(f"Seed {options['seed']} was already used in this database, pick another --seed")
+        phone_numbers = seed_phone_numbers(options['seed'], options['users'])
+        for start in range(0, len(phone_numbers), 500):
+            if User.objects.filter(phone_number__in=phone_numbers[start:start + 500]).exists():
+                raise CommandError(f"The phone numbers of seed {options['seed']} are already used in this database, pick another --seed")
+
+        report = seed_ledger(
+            options['users'], options['rows_per_user'], seed=options['seed'], password=options['password'],
+            batch_size=options['batch_size'], days=options['days'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {report['users']} user(s) and {report['rows']} ledger row(s) in {report['seconds']}s."
+        ))
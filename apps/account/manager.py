@@ -1,4 +1,8 @@
 from django.contrib.auth.base_user import BaseUserManager
+from django.db import IntegrityError, models, transaction
+from django.db.models import F, Value
+from django.utils import timezone
+from apps.account import aggregates
 
 class UserManager(BaseUserManager):
     """
@@ -38,3 +42,196 @@ class UserManager(BaseUserManager):
             raise ValueError({'detail': 'Superuser must have is_superuser=True.'})
         return self.create_user(email, password, **extra_fields)
 
+
+
+class LedgerQuerySet(models.QuerySet):
+    """
+    QuerySet for ledger rows (incomes and expenditures) whose bulk writes keep the
+    materialized aggregates in `apps.account.aggregates` up to date.
+    """
+
+    def bulk_create(self, objs, *args, **kwargs):
+        with transaction.atomic(using=self.db, savepoint=False):
+            objs = super().bulk_create(objs, *args, **kwargs)
+            aggregates.record(self.model, added=[obj.get_ledger_entry() for obj in objs])
+        return objs
+
+    def update(self, **kwargs):
+        return self._update(kwargs)[0]
+
+    update.alters_data = True
+
+    def update_returning(self, fields, **kwargs):
+        """
+        `update(**kwargs)`, returning the updated rows as dicts of their pk, ledger fields
+        and `fields`, read by the same query that reads what the aggregates held for them.
+        """
+        return self._update(kwargs, fields)[1]
+
+    update_returning.alters_data = True
+
+    def _update(self, kwargs, fields=None):
+        ledger_fields = self.model.ledger_fields()
+        changed = {self.model._meta.get_field(name).attname: value for name, value in kwargs.items()}
+        if fields is None and not set(changed) & set(ledger_fields):
+            # the aggregates are unchanged, only the versions of the users move
+            with transaction.atomic(using=self.db, savepoint=False):
+                user_ids = set(self.values_list('user_id', flat=True))
+                rows = super().update(**kwargs)
+                aggregates.touch(user_ids)
+            return rows, None
+
+        columns = list(dict.fromkeys(['pk', *ledger_fields, *(fields or ())]))
+        with transaction.atomic(using=self.db, savepoint=False):
+            # locked where supported, so the aggregates are moved from the values the UPDATE replaces
+            previous = list(self.select_for_update().values(*columns))
+            if not previous:
+                return 0, []
+            rows = super().update(**kwargs)
+
+            if any(hasattr(value, 'resolve_expression') for value in changed.values()):
+                # the new values are only known to the database
+                current = list(self.model._base_manager.using(self.db).filter(pk__in=[row['pk'] for row in previous]).values(*columns))
+            else:
+                current = [{**row, **changed} for row in previous]
+
+            if set(changed) & set(ledger_fields):
+                aggregates.record(
+                    self.model,
+                    added=[self.model.ledger_entry(row) for row in current],
+                    removed=[self.model.ledger_entry(row) for row in previous],
+                )
+            else:
+                aggregates.touch({row['user_id'] for row in previous})
+        return rows, current
+
+    def delete(self):
+        return self._delete()[0]
+
+    def delete_returning(self, fields=()):
+        """
+        `delete()`, returning the deleted rows as dicts of their pk, ledger fields and
+        `fields`, read by the same query that reads what the aggregates held for them.
+        """
+        return self._delete(fields)[1]
+
+    def _delete(self, fields=()):
+        columns = list(dict.fromkeys(['pk', *self.model.ledger_fields(), *fields]))
+        with transaction.atomic(using=self.db, savepoint=False):
+            # locked where supported, like the rows `_update()` reads
+            previous = list(self.select_for_update().values(*columns))
+            if not previous:
+                return (0, {}), []
+            result = super().delete()
+            aggregates.record(self.model, removed=[self.model.ledger_entry(row) for row in previous])
+        return result, previous
+
+    delete.alters_data = True
+    delete.queryset_only = True
+    delete_returning.alters_data = True
+    delete_returning.queryset_only = True
+
+
+class LedgerManager(models.Manager.from_queryset(LedgerQuerySet)):
+    pass
+
+
+class UserBalanceManager(models.Manager):
+
+    def add(self, user_id, kind, amount, count):
+        """
+        Add `amount` and `count` to the `kind` ('income' or 'expense') totals of a user
+        and bump the user's version, creating the user's balance row on first use.
+        """
+        now = timezone.now()
+        # typed by the column, so the amount is written in its stored form
+        amount_value = Value(amount, output_field=self.model._meta.get_field(f'total_{kind}'))
+        changes = {
+            f'total_{kind}': F(f'total_{kind}') + amount_value,
+            f'{kind}_count': F(f'{kind}_count') + count,
+            'version': F('version') + 1,
+            'modified_at': now,
+        }
+        if self.filter(user_id=user_id).update(**changes):
+            return
+
+        try:
+            with transaction.atomic(using=self.db):
+                self.create(user_id=user_id, version=1, modified_at=now, **{f'total_{kind}': amount, f'{kind}_count': count})
+        except IntegrityError:
+            # created concurrently in the meantime
+            self.filter(user_id=user_id).update(**changes)
+
+    def touch(self, user_ids):
+        """Bump the version of the given users, creating their balance rows on first use."""
+        now = timezone.now()
+        user_ids = set(user_ids)
+        if self.filter(user_id__in=user_ids).update(version=F('version') + 1, modified_at=now) == len(user_ids):
+            return
+
+        missing = user_ids - set(self.filter(user_id__in=user_ids).values_list('user_id', flat=True))
+        self.bulk_create([self.model(user_id=user_id, version=1, modified_at=now) for user_id in missing], ignore_conflicts=True)
+
+
+
+class DailyRollupManager(models.Manager):
+
+    def add(self, kind, deltas):
+        """
+        Add `(amount, count)` deltas keyed by `(user_id, day, category)` to the `kind`
+        ('income' or 'expense') rollups, creating missing rows and dropping emptied ones.
+        """
+        if len(deltas) == 1:
+            (user_id, day, category), (amount, count) = next(iter(deltas.items()))
+            self._add_one(user_id, day, kind, category, amount, count)
+        elif deltas:
+            self._add_many(kind, deltas)
+
+    def _add_one(self, user_id, day, kind, category, amount, count):
+        key = {'user_id': user_id, 'day': day, 'kind': kind, 'category': category}
+        changes = {'total': F('total') + Value(amount, output_field=self.model._meta.get_field('total')), 'count': F('count') + count}
+        if self.filter(**key).update(**changes):
+            if count < 0:
+                self.filter(**key, count=0).delete()
+            return
+
+        try:
+            with transaction.atomic(using=self.db):
+                self.create(**key, total=amount, count=count)
+        except IntegrityError:
+            # created concurrently in the meantime
+            self.filter(**key).update(**changes)
+
+    def _add_many(self, kind, deltas):
+        # one read of the affected rows, then batched writes, rather than a statement per key
+        user_ids = {user_id for user_id, _, _ in deltas}
+        days = [day for _, day, _ in deltas]
+        rows = {
+            (row.user_id, row.day, row.category): row
+            for row in self.select_for_update().filter(user_id__in=user_ids, kind=kind, day__range=(min(days), max(days)))
+            if (row.user_id, row.day, row.category) in deltas
+        }
+
+        created, updated, emptied = [], [], []
+        for key, (amount, count) in deltas.items():
+            row = rows.get(key)
+            if row is None:
+                user_id, day, category = key
+                created.append(self.model(user_id=user_id, day=day, kind=kind, category=category, total=amount, count=count))
+                continue
+            row.total += amount
+            row.count += count
+            (updated if row.count else emptied).append(row)
+
+        if updated:
+            self.bulk_update(updated, ['total', 'count'], batch_size=500)
+        if emptied:
+            self.filter(pk__in=[row.pk for row in emptied]).delete()
+        if created:
+            try:
+                with transaction.atomic(using=self.db):
+                    self.bulk_create(created, batch_size=500)
+            except IntegrityError:
+                # some were created concurrently in the meantime
+                for row in created:
+                    self._add_one(row.user_id, row.day, kind, row.category, row.total, row.count)
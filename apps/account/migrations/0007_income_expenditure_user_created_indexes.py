@@ -0,0 +1,21 @@
+# Generated by Django 4.1.7 on 2026-10-18 18:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('account', '0006_alter_expenditure_user_alter_income_user'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='expenditure',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='expenditure_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='income',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='income_user_created_idx'),
+        ),
+    ]
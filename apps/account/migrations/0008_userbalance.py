@@ -0,0 +1,45 @@
+# Generated by Django 4.1.7 on 2026-10-18 18:13
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def populate_balances(apps, schema_editor):
+    User = apps.get_model('account', 'User')
+    Income = apps.get_model('account', 'Income')
+    Expenditure = apps.get_model('account', 'Expenditure')
+    UserBalance = apps.get_model('account', 'UserBalance')
+
+    balances = {user_id: UserBalance(user_id=user_id) for user_id in User.objects.values_list('pk', flat=True)}
+    for model, amount_field, kind in ((Income, 'amount', 'income'), (Expenditure, 'estimatedAmount', 'expense')):
+        rows = model.objects.values('user_id').annotate(total=models.Sum(amount_field), count=models.Count('pk')).order_by()
+        for row in rows:
+            setattr(balances[row['user_id']], f'total_{kind}', row['total'])
+            setattr(balances[row['user_id']], f'{kind}_count', row['count'])
+    UserBalance.objects.bulk_create(balances.values(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('account', '0007_income_expenditure_user_created_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserBalance',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='balance', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('total_income', models.DecimalField(decimal_places=2, default=0, max_digits=15, verbose_name='Total Income')),
+                ('income_count', models.BigIntegerField(default=0, verbose_name='Income Count')),
+                ('total_expense', models.DecimalField(decimal_places=2, default=0, max_digits=15, verbose_name='Total Expense')),
+                ('expense_count', models.BigIntegerField(default=0, verbose_name='Expense Count')),
+            ],
+            options={
+                'verbose_name': 'User Balance',
+                'verbose_name_plural': 'User Balances',
+            },
+        ),
+        migrations.RunPython(populate_balances, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 4.1.7 on 2026-10-18 18:28
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models.functions import TruncDate
+
+
+def populate_rollups(apps, schema_editor):
+    Income = apps.get_model('account', 'Income')
+    Expenditure = apps.get_model('account', 'Expenditure')
+    DailyRollup = apps.get_model('account', 'DailyRollup')
+
+    for model, amount_field, category_field, kind in ((Income, 'amount', None, 'income'), (Expenditure, 'estimatedAmount', 'category', 'expense')):
+        group_by = ['user_id', 'day', category_field] if category_field else ['user_id', 'day']
+        rows = (
+            model.objects.order_by()
+            .annotate(day=TruncDate('created_at'))
+            .values(*group_by)
+            .annotate(total=models.Sum(amount_field), count=models.Count('pk'))
+        )
+        DailyRollup.objects.bulk_create(
+            (
+                DailyRollup(
+                    user_id=row['user_id'], day=row['day'], kind=kind,
+                    category=row[category_field] if category_field else '',
+                    total=row['total'], count=row['count'],
+                )
+                for row in rows.iterator()
+            ),
+            batch_size=1000,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('account', '0008_userbalance'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='Day')),
+                ('kind', models.CharField(choices=[('income', 'Income'), ('expense', 'Expense')], max_length=10, verbose_name='Kind')),
+                ('category', models.CharField(blank=True, default='', max_length=100, verbose_name='Category')),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=15, verbose_name='Total')),
+                ('count', models.BigIntegerField(default=0, verbose_name='Count')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_rollups', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Daily Rollup',
+                'verbose_name_plural': 'Daily Rollups',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='dailyrollup',
+            constraint=models.UniqueConstraint(fields=('user', 'kind', 'day', 'category'), name='daily_rollup_unique_key'),
+        ),
+        migrations.RunPython(populate_rollups, migrations.RunPython.noop),
+    ]
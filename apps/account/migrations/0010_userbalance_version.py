@@ -0,0 +1,23 @@
+# Generated by Django 4.1.7 on 2026-10-18 18:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('account', '0009_dailyrollup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userbalance',
+            name='modified_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Modified At'),
+        ),
+        migrations.AddField(
+            model_name='userbalance',
+            name='version',
+            field=models.BigIntegerField(default=0, verbose_name='Version'),
+        ),
+    ]
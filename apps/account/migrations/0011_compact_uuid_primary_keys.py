@@ -0,0 +1,66 @@
+# Generated by Django 4.1.7 on 2026-10-18 19:31
+
+import uuid
+import apps.account.fields
+from django.db import migrations
+
+# the models whose primary keys become CompactUUIDFields
+MODELS = ('User', 'Income', 'Expenditure')
+
+
+def uuid_columns(apps, connection):
+    """The (table, column) of the converted primary keys and of every foreign key column to them, other apps' included."""
+    tables = {apps.get_model('account', name)._meta.db_table for name in MODELS}
+    with connection.cursor() as cursor:
+        for table in connection.introspection.table_names(cursor):
+            if table in tables:
+                yield table, 'id'
+            for column, (_, referenced_table) in connection.introspection.get_relations(cursor, table).items():
+                if referenced_table in tables:
+                    yield table, column
+
+
+def convert(apps, schema_editor, function, from_type):
+    # changing the column types on SQLite copies the values as they are, the 32 character hex
+    # strings, convert them to the stored form of the new column type (and back on reverse)
+    connection = schema_editor.connection
+    if connection.vendor != 'sqlite':
+        return
+    connection.connection.create_function('convert_uuid', 1, function, deterministic=True)
+    quote = schema_editor.quote_name
+    for table, column in uuid_columns(apps, connection):
+        schema_editor.execute(f'UPDATE {quote(table)} SET {quote(column)} = convert_uuid({quote(column)}) WHERE typeof({quote(column)}) = %s', [from_type])
+
+
+def hex_to_bytes(apps, schema_editor):
+    convert(apps, schema_editor, lambda value: uuid.UUID(value).bytes, 'text')
+
+
+def bytes_to_hex(apps, schema_editor):
+    convert(apps, schema_editor, lambda value: uuid.UUID(bytes=value).hex, 'blob')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('account', '0010_userbalance_version'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='expenditure',
+            name='id',
+            field=apps.account.fields.CompactUUIDField(default=apps.account.fields.new_uuid, editable=False, primary_key=True, serialize=False, verbose_name='id'),
+        ),
+        migrations.AlterField(
+            model_name='income',
+            name='id',
+            field=apps.account.fields.CompactUUIDField(default=apps.account.fields.new_uuid, editable=False, primary_key=True, serialize=False, verbose_name='id'),
+        ),
+        migrations.AlterField(
+            model_name='user',
+            name='id',
+            field=apps.account.fields.CompactUUIDField(default=apps.account.fields.new_uuid, editable=False, primary_key=True, serialize=False, verbose_name='id'),
+        ),
+        migrations.RunPython(hex_to_bytes, bytes_to_hex),
+    ]
@@ -0,0 +1,70 @@
+# Generated by Django 4.1.7 on 2026-10-18 19:40
+
+import apps.account.fields
+from django.db import NotSupportedError, migrations
+
+# model: the decimal amount columns that become MoneyFields, stored in cents
+COLUMNS = {
+    'Income': ['amount'],
+    'Expenditure': ['estimatedAmount'],
+    'UserBalance': ['total_income', 'total_expense'],
+    'DailyRollup': ['total'],
+}
+
+
+def convert(apps, schema_editor, expression):
+    # changing the column types on SQLite copies the values as they are, scale them to
+    # the stored form of the new column type (and back on reverse)
+    connection = schema_editor.connection
+    if connection.vendor != 'sqlite':
+        raise NotSupportedError('Converting the amounts to cents is only implemented for SQLite')
+    quote = schema_editor.quote_name
+    for name, columns in COLUMNS.items():
+        table = apps.get_model('account', name)._meta.db_table
+        assignments = ', '.join(f'{quote(column)} = {expression.format(column=quote(column))}' for column in columns)
+        schema_editor.execute(f'UPDATE {quote(table)} SET {assignments}')
+
+
+def decimals_to_cents(apps, schema_editor):
+    # SQLite holds the decimals as integers or floats, round away their binary error
+    convert(apps, schema_editor, 'CAST(ROUND({column} * 100) AS INTEGER)')
+
+
+def cents_to_decimals(apps, schema_editor):
+    convert(apps, schema_editor, '{column} / 100.0')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('account', '0011_compact_uuid_primary_keys'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='dailyrollup',
+            name='total',
+            field=apps.account.fields.MoneyField(decimal_places=2, default=0, max_digits=15, verbose_name='Total'),
+        ),
+        migrations.AlterField(
+            model_name='expenditure',
+            name='estimatedAmount',
+            field=apps.account.fields.MoneyField(decimal_places=2, max_digits=10, verbose_name='Estimated Amount'),
+        ),
+        migrations.AlterField(
+            model_name='income',
+            name='amount',
+            field=apps.account.fields.MoneyField(decimal_places=2, max_digits=10, verbose_name='Amount'),
+        ),
+        migrations.AlterField(
+            model_name='userbalance',
+            name='total_expense',
+            field=apps.account.fields.MoneyField(decimal_places=2, default=0, max_digits=15, verbose_name='Total Expense'),
+        ),
+        migrations.AlterField(
+            model_name='userbalance',
+            name='total_income',
+            field=apps.account.fields.MoneyField(decimal_places=2, default=0, max_digits=15, verbose_name='Total Income'),
+        ),
+        migrations.RunPython(decimals_to_cents, cents_to_decimals),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.1.7 on 2026-10-18 20:42
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('account', '0012_money_fields'),
+    ]
+
+    # the default is applied by Django, the columns are unchanged, so only the state is altered
+    # (SQLite would otherwise rebuild both tables)
+    operations = [
+        migrations.SeparateDatabaseAndState(state_operations=[
+            migrations.AlterField(
+                model_name='expenditure',
+                name='created_at',
+                field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+            ),
+            migrations.AlterField(
+                model_name='income',
+                name='created_at',
+                field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+            ),
+        ]),
+    ]
@@ -1,8 +1,10 @@
-import uuid
-from django.db import models
+from django.db import models, transaction
+from apps.account import aggregates
+from apps.account.fields import CompactUUIDField, MoneyField, new_uuid
 from apps.account.validators import validate_username
-from apps.account.manager import UserManager
+from apps.account.manager import DailyRollupManager, LedgerManager, UserBalanceManager, UserManager
 from django.contrib.auth.models import AbstractUser
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from phonenumber_field.modelfields import PhoneNumberField
 from django.contrib.auth.password_validation import validate_password
@@ -18,7 +20,7 @@ class User(AbstractUser):
     username_validator = validate_username
     password_validator = validate_password
 
-    id              = models.UUIDField(_("id"), primary_key=True, default=uuid.uuid4, editable=False)
+    id              = CompactUUIDField(_("id"), primary_key=True, default=new_uuid, editable=False)
     first_name      = models.CharField(_('First Name'), max_length=150)
     last_name       = models.CharField(_('Last Name'), max_length=150)
     phone_number    = PhoneNumberField(_("Phone number"), help_text=_("User's phone number "), unique=True)
@@ -50,19 +52,100 @@ class User(AbstractUser):
 
     def get_full_name(self):
         return f"{self.first_name} {self.last_name}".strip().title()
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            # the profile is part of what the user's version covers, the last login is not
+            if set(kwargs.get('update_fields') or ()) != {'last_login'}:
+                aggregates.touch([self.pk])
     
     class Meta:
         verbose_name = _('User')
         verbose_name_plural = _('Users')
 
 
-class Income(models.Model):
-    id              = models.UUIDField(_("id"), primary_key=True, default=uuid.uuid4, editable=False)
+class LedgerEntry(models.Model):
+    """
+    A row of a user's ledger. Saving or deleting one keeps the materialized
+    aggregates (see `apps.account.aggregates`) in sync within the same transaction.
+    """
+    ledger_kind = None
+    amount_field = None
+    category_field = None
+
+    objects = LedgerManager()
+
+    class Meta:
+        abstract = True
+
+    @classmethod
+    def ledger_fields(cls):
+        fields = ('user_id', cls.amount_field, 'created_at')
+        return fields + (cls.category_field, ) if cls.category_field else fields
+
+    @classmethod
+    def ledger_entry(cls, values):
+        """Build the aggregates entry from a mapping of the `ledger_fields()` values."""
+        amount = cls._meta.get_field(cls.amount_field).to_python(values[cls.amount_field])
+        created_at = cls._meta.get_field('created_at').to_python(values['created_at'])
+        category = values[cls.category_field] if cls.category_field else ''
+        return aggregates.Entry(values['user_id'], amount, timezone.localdate(created_at), category)
+
+    def get_ledger_entry(self):
+        return self.ledger_entry({field: getattr(self, field) for field in self.ledger_fields()})
+
+    def get_stored_ledger_values(self, using=None):
+        """The `ledger_fields()` values of the stored row, locked until the end of the transaction where supported."""
+        manager = type(self)._base_manager.db_manager(using or self._state.db)
+        return manager.select_for_update().filter(pk=self.pk).values(*self.ledger_fields()).first()
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        ledger_fields = self.ledger_fields()
+        if update_fields is not None:
+            update_fields = {self._meta.get_field(name).attname for name in update_fields}
+
+        with transaction.atomic(using=kwargs.get('using')):
+            if update_fields is not None and not update_fields & set(ledger_fields):
+                # the aggregates are unchanged, only the version of the user moves
+                super().save(*args, **kwargs)
+                if update_fields:
+                    aggregates.touch([self.user_id])
+                return
+
+            previous = None if self._state.adding else self.get_stored_ledger_values(kwargs.get('using'))
+            super().save(*args, **kwargs)
+            current = {field: getattr(self, field) for field in ledger_fields}
+            if previous and update_fields is not None:
+                # the fields that were not saved keep their stored values
+                current = {field: current[field] if field in update_fields else previous[field] for field in ledger_fields}
+            aggregates.record(
+                type(self),
+                added=[self.ledger_entry(current)],
+                removed=[self.ledger_entry(previous)] if previous else [],
+            )
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic(using=kwargs.get('using')):
+            previous = self.get_stored_ledger_values(kwargs.get('using'))
+            result = super().delete(*args, **kwargs)
+            # another copy of the row may have deleted it already
+            if previous and result[1].get(self._meta.label):
+                aggregates.record(type(self), removed=[self.ledger_entry(previous)])
+        return result
+
+
+class Income(LedgerEntry):
+    id              = CompactUUIDField(_("id"), primary_key=True, default=new_uuid, editable=False)
     nameOfRevenue   = models.CharField(_("Name of Revenue"), max_length=100)
-    amount          = models.DecimalField(_("Amount"), max_digits=10, decimal_places=2)
+    amount          = MoneyField(_("Amount"), max_digits=10, decimal_places=2)
     user            = models.ForeignKey(User, on_delete=models.CASCADE, related_name="incomes")
     updated_at      = models.DateTimeField(auto_now=True)
-    created_at      = models.DateTimeField(auto_now_add=True)
+    created_at      = models.DateTimeField(default=timezone.now, editable=False)
+
+    ledger_kind = 'income'
+    amount_field = 'amount'
 
     def __str__(self):
         return f"{self.user}: {self.amount}"
@@ -70,15 +153,23 @@ class Income(models.Model):
     class Meta:
         verbose_name = _('Income')
         verbose_name_plural = _('Incomes')
+        indexes = [
+            # serves the per-user, newest first listing without a sort step
+            models.Index(fields=['user', '-created_at', '-id'], name='income_user_created_idx'),
+        ]
 
-class Expenditure(models.Model):
-    id              = models.UUIDField(_("id"), primary_key=True, default=uuid.uuid4, editable=False)
+class Expenditure(LedgerEntry):
+    id              = CompactUUIDField(_("id"), primary_key=True, default=new_uuid, editable=False)
     category        = models.CharField(_("Category"), max_length=100)
     nameOfItem      = models.CharField(_("Name of Item"), max_length=100)
-    estimatedAmount = models.DecimalField(_("Estimated Amount"), max_digits=10, decimal_places=2)
+    estimatedAmount = MoneyField(_("Estimated Amount"), max_digits=10, decimal_places=2)
     user            = models.ForeignKey(User, on_delete=models.CASCADE, related_name="expenditures")
     updated_at      = models.DateTimeField(auto_now=True)
-    created_at      = models.DateTimeField(auto_now_add=True)
+    created_at      = models.DateTimeField(default=timezone.now, editable=False)
+
+    ledger_kind = 'expense'
+    amount_field = 'estimatedAmount'
+    category_field = 'category'
 
     def __str__(self):
         return f"{self.user}: {self.estimatedAmount}"
@@ -86,3 +177,62 @@ class Expenditure(models.Model):
     class Meta:
         verbose_name = _('Expenditure')
         verbose_name_plural = _('Expenditures')
+        indexes = [
+            # serves the per-user, newest first listing without a sort step
+            models.Index(fields=['user', '-created_at', '-id'], name='expenditure_user_created_idx'),
+        ]
+
+
+class UserBalance(models.Model):
+    """
+    Running totals of a user's ledger, maintained on every income and expenditure write,
+    and a version bumped on every write to the user's data, for conditional requests.
+    """
+    user            = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name="balance")
+    total_income    = MoneyField(_("Total Income"), max_digits=15, decimal_places=2, default=0)
+    income_count    = models.BigIntegerField(_("Income Count"), default=0)
+    total_expense   = MoneyField(_("Total Expense"), max_digits=15, decimal_places=2, default=0)
+    expense_count   = models.BigIntegerField(_("Expense Count"), default=0)
+    version         = models.BigIntegerField(_("Version"), default=0)
+    modified_at     = models.DateTimeField(_("Modified At"), null=True, blank=True)
+
+    objects = UserBalanceManager()
+
+    def __str__(self):
+        return f"{self.user}: {self.total_income - self.total_expense}"
+
+    class Meta:
+        verbose_name = _('User Balance')
+        verbose_name_plural = _('User Balances')
+
+
+class DailyRollup(models.Model):
+    """
+    Total and count of a user's incomes, or expenditures of a category, on one day.
+    Maintained on every income and expenditure write, so summaries read at most one
+    row per day and category instead of every transaction.
+    """
+    KIND_CHOICES = (
+        ('income', _('Income')),
+        ('expense', _('Expense')),
+    )
+
+    user            = models.ForeignKey(User, on_delete=models.CASCADE, related_name="daily_rollups")
+    day             = models.DateField(_("Day"))
+    kind            = models.CharField(_("Kind"), max_length=10, choices=KIND_CHOICES)
+    category        = models.CharField(_("Category"), max_length=100, blank=True, default='')
+    total           = MoneyField(_("Total"), max_digits=15, decimal_places=2, default=0)
+    count           = models.BigIntegerField(_("Count"), default=0)
+
+    objects = DailyRollupManager()
+
+    def __str__(self):
+        return f"{self.user}: {self.day} {self.kind}: {self.total}"
+
+    class Meta:
+        verbose_name = _('Daily Rollup')
+        verbose_name_plural = _('Daily Rollups')
+        constraints = [
+            # also serves the per-user summaries of a kind over a range of days
+            models.UniqueConstraint(fields=['user', 'kind', 'day', 'category'], name='daily_rollup_unique_key'),
+        ]
@@ -0,0 +1,112 @@
+"""
+Synthetic users and ledgers for reproducing production-scale data locally.
+
+Everything is inserted with `bulk_create` in large batches, bypassing the per-batch
+aggregate bookkeeping of the ledger managers; the balances and daily rollups of the
+seeded users are rebuilt once at the end instead. All users share one precomputed
+password hash, and every value (ids included) comes from a seeded random generator,
+so the same arguments produce the same data. Like the timestamps, the time-ordered ids
+given with `UUID7_PRIMARY_KEYS` are relative to the time of the run.
+"""
+import random
+import time
+import uuid
+from datetime import timedelta
+from decimal import Decimal
+from itertools import islice
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.utils import timezone
+
+from apps.account import aggregates
+from apps.account.fields import uuid7
+
+CATEGORIES = ['food', 'transport', 'rent', 'bills', 'health', 'shopping', 'leisure', 'education']
+REVENUES = ['salary', 'freelance', 'dividends', 'rent', 'refund', 'gift']
+
+# Share of a user's rows that are incomes, the rest are expenditures
+INCOME_SHARE = 0.2
+
+# Phone numbers are +2332 and 8 digits, seeds take consecutive blocks of them
+PHONE_NUMBERS_PER_SEED = 100000
+
+
+def seed_phone_numbers(seed, users):
+    """
+    The phone numbers of the users of a seed. Seeds below 1000 with at most
+    `PHONE_NUMBERS_PER_SEED` users never share one, others are checked by the seed_ledger command.
+    """
+    return [f'+2332{(seed * PHONE_NUMBERS_PER_SEED + n) % 10 ** 8:08d}' for n in range(users)]
+
+
+def seed_ledger(users, rows_per_user, seed=0, password='password', batch_size=10000, days=365 * 3):
+    """
+    Create `users` users with `rows_per_user` ledger rows each, spread over the last `days`,
+    and return the number of users and rows created with the time it took.
+
+    Users are named `seed<seed>-user<n>` (`seed<seed>-user<n>@example.com`), so a given seed
+    can only be used once per database.
+    """
+    from apps.account.models import Expenditure, Income, User
+
+    rng = random.Random(seed)
+    now = timezone.now()
+    start = time.perf_counter()
+
+    def new_id(created_at):
+        if settings.UUID7_PRIMARY_KEYS:
+            return uuid7(created_at.timestamp(), rng.getrandbits)
+        return uuid.UUID(int=rng.getrandbits(128), version=4)
+
+    def timestamp():
+        return now - timedelta(seconds=rng.randrange(days * 24 * 3600))
+
+    # hashing is deliberately slow, every user gets the same hash
+    password_hash = make_password(password, salt=f'seed{seed}')
+    user_objs = []
+    for n, phone_number in enumerate(seed_phone_numbers(seed, users)):
+        date_joined = timestamp()
+        user_objs.append(User(
+            id=new_id(date_joined), email=f'seed{seed}-user{n}@example.com', username=f'seed{seed}_user{n}',
+            first_name='Seed', last_name=f'User {n}', phone_number=phone_number,
+            password=password_hash, date_joined=date_joined,
+        ))
+    user_ids = [user.pk for user in user_objs]
+
+    incomes = round(rows_per_user * INCOME_SHARE)
+
+    def income_rows():
+        for user_id in user_ids:
+            for _ in range(incomes):
+                created_at = timestamp()
+                yield Income(
+                    id=new_id(created_at), user_id=user_id, nameOfRevenue=rng.choice(REVENUES),
+                    amount=Decimal(rng.randrange(1000, 1000000)) / 100, created_at=created_at,
+                )
+
+    def expenditure_rows():
+        for user_id in user_ids:
+            for n in range(rows_per_user - incomes):
+                created_at = timestamp()
+                yield Expenditure(
+                    id=new_id(created_at), user_id=user_id, category=rng.choice(CATEGORIES), nameOfItem=f'item {n}',
+                    estimatedAmount=Decimal(rng.randrange(100, 500000)) / 100, created_at=created_at,
+                )
+
+    with transaction.atomic():
+        User.objects.bulk_create(user_objs, batch_size=batch_size)
+
+    rows = 0
+    for model, objs in ((Income, income_rows()), (Expenditure, expenditure_rows())):
+        while batch := list(islice(objs, batch_size)):
+            with transaction.atomic():
+                # the plain manager, the aggregates are rebuilt once below
+                model._base_manager.bulk_create(batch)
+            rows += len(batch)
+
+    aggregates.rebuild_balances(user_ids)
+    aggregates.rebuild_rollups(user_ids)
+
+    return {'users': len(user_ids), 'rows': rows, 'seconds': round(time.perf_counter() - start, 2)}
@@ -1,3 +1,314 @@
-from django.test import TestCase
+import uuid
+import pytest
+from decimal import Decimal
+from datetime import date, timedelta
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.db.models import Sum
+from django.utils import timezone
+from mixer.backend.django import mixer
+from api.utils.pagination import KeysetPagination
+from apps.account import aggregates
+from apps.account.fields import new_uuid, uuid7
+from apps.account.manager import LedgerQuerySet
+from apps.account.models import DailyRollup, Expenditure, Income, User, UserBalance
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import RefreshToken
 
-# Create your tests here.
+pytestmark = pytest.mark.django_db
+
+
+class TestLedgerIndexes:
+
+    @pytest.mark.parametrize('model, index_name', [
+        (Income, 'income_user_created_idx'),
+        (Expenditure, 'expenditure_user_created_idx'),
+    ])
+    def test_user_listing_is_served_by_index_without_sorting(self, user, model, index_name):
+        paginator = KeysetPagination()
+        ordering = paginator.ordering
+        position = ('2023-03-25T20:41:00+00:00', '76581097-8da1-45e5-bbba-fe7ee51f61b7')
+        seek = paginator.get_seek_filter(model, ordering, position)
+
+        # first page and a page further down, as built by the list views
+        for queryset in (
+            model.objects.filter(user=user).order_by(*ordering)[:paginator.page_size + 1],
+            model.objects.filter(user=user).order_by(*ordering).filter(seek)[:paginator.page_size + 1],
+        ):
+            plan = queryset.explain()
+            assert index_name in plan
+            assert 'TEMP B-TREE' not in plan
+
+
+class TestPrimaryKeys:
+
+    def test_uuid7_is_time_ordered(self):
+        ids = [uuid7(1700000000 + i / 1000) for i in range(100)]
+        assert all(pk.version == 7 and pk.variant == uuid.RFC_4122 for pk in ids)
+        assert ids == sorted(ids) == sorted(ids, key=lambda pk: pk.bytes)
+        assert ids[0].int >> 80 == 1700000000000
+        assert uuid7(1700000000, lambda bits: 0) != uuid7(1700000000, lambda bits: 1)
+
+    def test_primary_keys_are_time_ordered_when_enabled(self, settings):
+        settings.UUID7_PRIMARY_KEYS = False
+        assert new_uuid().version == 4
+        settings.UUID7_PRIMARY_KEYS = True
+        assert new_uuid().version == 7
+        assert Income.objects.bulk_create([Income(user=mixer.blend(User), nameOfRevenue='salary', amount=1)])[0].pk.version == 7
+
+    def test_ids_are_stored_as_16_bytes(self, user, user_income):
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT typeof(id), length(id), typeof(user_id), length(user_id) FROM account_income')
+            assert cursor.fetchall() == [('blob', 16, 'blob', 16)]
+
+        income = Income.objects.get(pk=str(user_income.pk))
+        assert (income.pk, income.user_id) == (user_income.pk, user.pk)
+        assert Income.objects.filter(user__in=[user.pk.hex]).values_list('pk', flat=True).get() == user_income.pk
+        assert list(User.objects.filter(incomes=user_income)) == [user]
+
+
+class TestMoneyField:
+
+    def test_amounts_are_stored_as_cents(self, user):
+        Income.objects.bulk_create([Income(user=user, nameOfRevenue='salary', amount=amount) for amount in ('10.99', '0.07', '-5')])
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT amount, typeof(amount) FROM account_income ORDER BY amount')
+            assert cursor.fetchall() == [(-500, 'integer'), (7, 'integer'), (1099, 'integer')]
+            cursor.execute('SELECT total_income, total, typeof(total) FROM account_userbalance, account_dailyrollup')
+            assert cursor.fetchall() == [(606, 606, 'integer')]
+
+        amounts = list(Income.objects.order_by('amount').values_list('amount', flat=True))
+        assert amounts == [Decimal('-5.00'), Decimal('0.07'), Decimal('10.99')]
+        assert all(amount.as_tuple().exponent == -2 for amount in amounts)
+        assert Income.objects.aggregate(total=Sum('amount'))['total'] == Decimal('6.06')
+        assert Income.objects.filter(amount__gt=Decimal('0.06'), amount__lte=11).count() == 2
+        assert user.balance.total_income == Decimal('6.06')
+
+
+class TestUserBalance:
+
+    def balance(self, user):
+        return UserBalance.objects.get(user=user)
+
+    def test_balance_follows_saves_and_deletes(self, user):
+        income = Income.objects.create(user=user, nameOfRevenue='Salary', amount=5000)
+        Income.objects.create(user=user, nameOfRevenue='Bonus', amount='250.50')
+        expenditure = Expenditure.objects.create(user=user, category='bills', nameOfItem='light', estimatedAmount=120)
+
+        balance = self.balance(user)
+        assert (balance.total_income, balance.income_count) == (Decimal('5250.50'), 2)
+        assert (balance.total_expense, balance.expense_count) == (Decimal('120'), 1)
+
+        # update through a freshly loaded instance
+        income = Income.objects.get(pk=income.pk)
+        income.amount = Decimal('4000')
+        income.save()
+        expenditure.estimatedAmount = 100
+        expenditure.save()
+
+        balance = self.balance(user)
+        assert (balance.total_income, balance.income_count) == (Decimal('4250.50'), 2)
+        assert (balance.total_expense, balance.expense_count) == (Decimal('100'), 1)
+
+        income.delete()
+        expenditure.delete()
+
+        balance = self.balance(user)
+        assert (balance.total_income, balance.income_count) == (Decimal('250.50'), 1)
+        assert (balance.total_expense, balance.expense_count) == (Decimal('0'), 0)
+
+    def test_balance_follows_bulk_writes(self, user):
+        other_user = mixer.blend('account.User')
+        Expenditure.objects.bulk_create([
+            Expenditure(user=user, category='food', nameOfItem='rice', estimatedAmount=10),
+            Expenditure(user=user, category='food', nameOfItem='beans', estimatedAmount=20),
+            Expenditure(user=other_user, category='food', nameOfItem='bread', estimatedAmount=5),
+        ])
+        assert (self.balance(user).total_expense, self.balance(user).expense_count) == (Decimal('30'), 2)
+        assert (self.balance(other_user).total_expense, self.balance(other_user).expense_count) == (Decimal('5'), 1)
+
+        Expenditure.objects.filter(user=user).update(estimatedAmount=15)
+        assert self.balance(user).total_expense == Decimal('30')
+
+        Expenditure.objects.filter(nameOfItem='rice').delete()
+        assert (self.balance(user).total_expense, self.balance(user).expense_count) == (Decimal('15'), 1)
+        assert self.balance(other_user).expense_count == 1
+
+    def test_bulk_writes_lock_the_rows_they_read(self, mocker, user):
+        Expenditure.objects.create(user=user, category='food', nameOfItem='rice', estimatedAmount=10)
+        # SQLite serializes writers and ignores the lock, other backends take it
+        select_for_update = mocker.spy(LedgerQuerySet, 'select_for_update')
+
+        Expenditure.objects.filter(user=user).update(estimatedAmount=15)
+        assert select_for_update.call_count == 1
+        assert self.balance(user).total_expense == Decimal('15')
+
+        Expenditure.objects.filter(user=user).delete()
+        assert select_for_update.call_count == 2
+        assert self.balance(user).expense_count == 0
+
+    def test_balance_follows_stale_instances(self, user):
+        income = Income.objects.create(user=user, nameOfRevenue='Salary', amount=10)
+        Income.objects.create(user=user, nameOfRevenue='Bonus', amount=5)
+
+        # deleting a row through two loaded copies removes it once
+        first, second = Income.objects.get(pk=income.pk), Income.objects.get(pk=income.pk)
+        first.delete()
+        second.delete()
+        assert (self.balance(user).total_income, self.balance(user).income_count) == (Decimal('5'), 1)
+
+        # saving a copy loaded before another write replaces the stored amount, not the loaded one
+        income = Income.objects.create(user=user, nameOfRevenue='Salary', amount=10)
+        stale = Income.objects.get(pk=income.pk)
+        Income.objects.filter(pk=income.pk).update(amount=40)
+        stale.amount = 30
+        stale.save()
+        assert (self.balance(user).total_income, self.balance(user).income_count) == (Decimal('35'), 2)
+
+        # fields left out of update_fields are not saved, nor counted
+        stale.amount = 99
+        stale.nameOfRevenue = 'Wages'
+        stale.save(update_fields=['nameOfRevenue'])
+        assert Income.objects.filter(user=user).aggregate(total=Sum('amount'))['total'] == Decimal('35')
+        assert (self.balance(user).total_income, self.balance(user).income_count) == (Decimal('35'), 2)
+
+    def test_rebuild_balances_command(self, user, user_income, user_expenditure):
+        UserBalance.objects.filter(user=user).update(total_income=0, income_count=0, total_expense=1, expense_count=7)
+
+        call_command('rebuild_balances')
+
+        balance = self.balance(user)
+        assert (balance.total_income, balance.income_count) == (user_income.amount, 1)
+        assert (balance.total_expense, balance.expense_count) == (user_expenditure.estimatedAmount, 1)
+
+    def test_import_ledger_command(self, user, tmp_path):
+        path = tmp_path / 'statement.csv'
+        path.write_text('category,name,amount\nfood,rice,10\nfood,beans,abc\nbills,light,5.50\n')
+
+        call_command('import_ledger', str(path), user=user.email, kind='expenditure', batch_size=1)
+
+        assert sorted(Expenditure.objects.filter(user=user).values_list('nameOfItem', flat=True)) == ['light', 'rice']
+        assert (self.balance(user).total_expense, self.balance(user).expense_count) == (Decimal('15.50'), 2)
+
+        # the rows before a line that cannot be decoded are imported
+        path.write_bytes(b'category,name,amount\nfood,bread,2\nfood,caf\xe9,3\n')
+        with pytest.raises(CommandError, match='Line 3'):
+            call_command('import_ledger', str(path), user=user.email, kind='expenditure')
+        assert self.balance(user).expense_count == 3
+
+
+class TestDailyRollup:
+
+    def rollups(self, user):
+        return sorted(DailyRollup.objects.filter(user=user).values_list('day', 'kind', 'category', 'total', 'count'))
+
+    def test_rollups_follow_saves_and_deletes(self, user):
+        rice = Expenditure.objects.create(user=user, category='food', nameOfItem='rice', estimatedAmount=10)
+        Expenditure.objects.create(user=user, category='food', nameOfItem='beans', estimatedAmount='2.50')
+        salary = Income.objects.create(user=user, nameOfRevenue='Salary', amount=5000)
+        today = rice.created_at.date()
+
+        assert self.rollups(user) == [
+            (today, 'expense', 'food', Decimal('12.50'), 2),
+            (today, 'income', '', Decimal('5000'), 1),
+        ]
+
+        # moving an expenditure to another category and day
+        rice.category = 'groceries'
+        rice.save()
+        Expenditure.objects.filter(pk=rice.pk).update(created_at='2023-01-01T12:00:00Z')
+        salary.delete()
+
+        assert self.rollups(user) == [
+            (date(2023, 1, 1), 'expense', 'groceries', Decimal('10'), 1),
+            (today, 'expense', 'food', Decimal('2.50'), 1),
+        ]
+
+    def test_rollups_follow_bulk_writes(self, user):
+        Expenditure.objects.bulk_create([
+            Expenditure(user=user, category=category, nameOfItem='item', estimatedAmount=amount)
+            for category, amount in (('food', 10), ('food', 5), ('bills', 100), ('rent', 1000))
+        ])
+        today = Expenditure.objects.filter(user=user).first().created_at.date()
+        assert self.rollups(user) == [
+            (today, 'expense', 'bills', Decimal('100'), 1),
+            (today, 'expense', 'food', Decimal('15'), 2),
+            (today, 'expense', 'rent', Decimal('1000'), 1),
+        ]
+
+        Expenditure.objects.filter(category='food').update(estimatedAmount=1)
+        Expenditure.objects.filter(category__in=['bills', 'rent']).delete()
+        assert self.rollups(user) == [(today, 'expense', 'food', Decimal('2'), 2)]
+
+    def test_rebuild_rollups_command(self, user, user_income, user_expenditure):
+        DailyRollup.objects.filter(user=user, kind='income').update(total=1, count=7)
+        DailyRollup.objects.filter(user=user, kind='expense').delete()
+
+        with pytest.raises(CommandError, match='2 daily rollup'):
+            call_command('rebuild_rollups', verify=True)
+
+        call_command('rebuild_rollups')
+        call_command('rebuild_rollups', verify=True)
+
+        assert self.rollups(user) == [
+            (user_expenditure.created_at.date(), 'expense', user_expenditure.category, user_expenditure.estimatedAmount, 1),
+            (user_income.created_at.date(), 'income', '', user_income.amount, 1),
+        ]
+
+
+class TestSeedLedger:
+
+    def test_seed_ledger_command(self):
+        call_command('seed_ledger', users=3, rows_per_user=10, seed=7, batch_size=4)
+
+        users = User.objects.filter(email__startswith='seed7-user')
+        assert users.count() == 3
+        user = users.get(email='seed7-user0@example.com')
+        assert user.check_password('password')
+        assert (Income.objects.filter(user=user).count(), Expenditure.objects.filter(user=user).count()) == (2, 8)
+
+        # the aggregates are rebuilt for the seeded rows
+        balance = UserBalance.objects.get(user=user)
+        assert balance.total_income == sum(Income.objects.filter(user=user).values_list('amount', flat=True))
+        assert balance.expense_count == 8
+        assert aggregates.verify_rollups(users.values_list('pk', flat=True)) == []
+
+    def test_seed_ledger_is_deterministic(self, settings):
+        # time-ordered ids are relative to the time of the run, like the timestamps
+        settings.UUID7_PRIMARY_KEYS = False
+        call_command('seed_ledger', users=2, rows_per_user=5, seed=1)
+        first = sorted(Expenditure.objects.values_list('id', 'category', 'estimatedAmount', 'created_at'))
+        User.objects.all().delete()
+
+        call_command('seed_ledger', users=2, rows_per_user=5, seed=1)
+        second = sorted(Expenditure.objects.values_list('id', 'category', 'estimatedAmount', 'created_at'))
+        # the timestamps are relative to the time of the run
+        assert [row[:3] for row in first] == [row[:3] for row in second]
+
+        with pytest.raises(CommandError, match='already used'):
+            call_command('seed_ledger', users=2, rows_per_user=5, seed=1)
+
+    def test_seed_ledger_phone_numbers(self):
+        # seeds ending with the same digit get numbers of their own
+        call_command('seed_ledger', users=2, rows_per_user=1, seed=1)
+        call_command('seed_ledger', users=2, rows_per_user=1, seed=11)
+        assert User.objects.values('phone_number').distinct().count() == 4
+
+        # numbers taken by other users are refused before anything is created
+        mixer.blend('account.User', phone_number='+233200000000')
+        with pytest.raises(CommandError, match='phone numbers'):
+            call_command('seed_ledger', users=1, rows_per_user=1, seed=0)
+
+
+class TestPruneTokens:
+
+    def test_prune_tokens_command(self, user):
+        tokens = [RefreshToken.for_user(user) for _ in range(5)]
+        tokens[0].blacklist()
+        tokens[4].blacklist()
+        OutstandingToken.objects.filter(jti__in=[token['jti'] for token in tokens[:3]]).update(expires_at=timezone.now() - timedelta(minutes=1))
+
+        call_command('prune_tokens', batch_size=2)
+
+        assert set(OutstandingToken.objects.values_list('jti', flat=True)) == {tokens[3]['jti'], tokens[4]['jti']}
+        assert list(BlacklistedToken.objects.values_list('token__jti', flat=True)) == [tokens[4]['jti']]
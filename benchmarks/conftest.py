@@ -0,0 +1,16 @@
+import pytest
+from benchmarks.utils import BenchmarkRecorder
+
+
+def pytest_generate_tests(metafunc):
+    # run every benchmark taking `rows` once per configured ledger size
+    if 'rows' in metafunc.fixturenames:
+        sizes = [int(size) for size in metafunc.config.getoption('--benchmark-rows').split(',') if size]
+        metafunc.parametrize('rows', sizes, ids=[f'{size}rows' for size in sizes])
+
+
+@pytest.fixture
+def benchmark_recorder(request):
+    recorder = BenchmarkRecorder(request.node.name, request.config.getoption('--benchmark-output'))
+    yield recorder
+    recorder.save()
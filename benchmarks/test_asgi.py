@@ -0,0 +1,133 @@
+import asyncio
+import io
+import sys
+import threading
+import time
+
+import pytest
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.db import connections
+from mixer.backend.django import mixer
+from rest_framework_simplejwt.tokens import AccessToken
+from apps.account.models import Expenditure, Income, User
+from benchmarks.utils import seed_ledger
+
+pytestmark = [pytest.mark.benchmark, pytest.mark.django_db(transaction=True)]
+
+# Requests per run, and number of clients sending them concurrently
+REQUESTS = 2000
+CONCURRENCY = (1, 16, 64)
+
+
+def workload(user, count):
+    """A read mix over the income and expenditure endpoints: list pages and single entries."""
+    paths = ['/user/income/', '/user/expenditure/', '/user/expenditure/?page_size=100']
+    paths += [f'/user/income/{pk}/' for pk in Income.objects.filter(user=user).values_list('pk', flat=True)[:20]]
+    paths += [f'/user/expenditure/{pk}/' for pk in Expenditure.objects.filter(user=user).values_list('pk', flat=True)[:20]]
+    return [paths[i % len(paths)] for i in range(count)]
+
+
+def summarize(latencies, seconds):
+    latencies = sorted(latencies)
+    return {
+        'requests': len(latencies),
+        'requests_per_second': round(len(latencies) / seconds, 1),
+        'p50_ms': round(latencies[len(latencies) // 2] * 1000, 3),
+        'p99_ms': round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000, 3),
+    }
+
+
+def run_wsgi(paths, token, concurrency):
+    """Drive a WSGIHandler from `concurrency` threads, like a threaded WSGI server would."""
+    handler = WSGIHandler()
+    pending, latencies, statuses = iter(paths), [], set()
+    lock = threading.Lock()
+
+    def client():
+        try:
+            while True:
+                with lock:
+                    path = next(pending, None)
+                if path is None:
+                    return
+                path, _, query = path.partition('?')
+                environ = {
+                    'REQUEST_METHOD': 'GET', 'PATH_INFO': path, 'QUERY_STRING': query, 'SCRIPT_NAME': '',
+                    'SERVER_NAME': 'testserver', 'SERVER_PORT': '80', 'SERVER_PROTOCOL': 'HTTP/1.1',
+                    'HTTP_HOST': 'testserver', 'HTTP_AUTHORIZATION': f'Bearer {token}',
+                    'wsgi.version': (1, 0), 'wsgi.url_scheme': 'http', 'wsgi.input': io.BytesIO(), 'wsgi.errors': sys.stderr,
+                    'wsgi.multithread': True, 'wsgi.multiprocess': False, 'wsgi.run_once': False,
+                }
+                start = time.perf_counter()
+                response = handler(environ, lambda status, headers: statuses.add(status))
+                b''.join(response)
+                response.close()
+                latencies.append(time.perf_counter() - start)
+        finally:
+            connections.close_all()
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert statuses == {'200 OK'}
+    return summarize(latencies, time.perf_counter() - start)
+
+
+def run_asgi(paths, token, concurrency):
+    """Drive an ASGIHandler from `concurrency` tasks on one event loop, like an ASGI server worker would."""
+    handler = ASGIHandler()
+    pending, latencies, statuses = iter(paths), [], set()
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def client():
+        for path in pending:
+            path, _, query = path.partition('?')
+            scope = {
+                'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET', 'scheme': 'http',
+                'path': path, 'raw_path': path.encode(), 'query_string': query.encode(), 'root_path': '',
+                'headers': [(b'host', b'testserver'), (b'authorization', f'Bearer {token}'.encode())],
+                'client': ('127.0.0.1', 50000), 'server': ('testserver', 80),
+            }
+            messages = []
+
+            async def send(message):
+                messages.append(message)
+
+            start = time.perf_counter()
+            await handler(scope, receive, send)
+            latencies.append(time.perf_counter() - start)
+            statuses.add(messages[0]['status'])
+
+    async def main():
+        await asyncio.gather(*(client() for _ in range(concurrency)))
+
+    start = time.perf_counter()
+    asyncio.run(main())
+    assert statuses == {200}
+    return summarize(latencies, time.perf_counter() - start)
+
+
+def test_wsgi_and_asgi_throughput(request, benchmark_recorder, rows):
+    user = mixer.blend(User)
+    seed_ledger(user, rows)
+    token = str(AccessToken.for_user(user))
+    paths = workload(user, REQUESTS)
+
+    results = {}
+    # WSGI first with the sync views, then ASGI with the async views it is configured with
+    for mode, run in (('wsgi', run_wsgi), ('asgi', run_asgi)):
+        if mode == 'asgi':
+            request.getfixturevalue('async_views')
+        run(paths[:100], token, 4) # warm up the caches
+        results[mode] = {f'{concurrency}_clients': run(paths, token, concurrency) for concurrency in CONCURRENCY}
+
+    for concurrency in CONCURRENCY:
+        key = f'{concurrency}_clients'
+        results[f'asgi_vs_wsgi_{key}'] = round(results['asgi'][key]['requests_per_second'] / results['wsgi'][key]['requests_per_second'], 2)
+    benchmark_recorder.record('throughput', results)
@@ -0,0 +1,28 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from mixer.backend.django import mixer
+from rest_framework.test import APIRequestFactory
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.tokens import AccessToken
+from api.utils.authentication import CachedJWTAuthentication
+from apps.account.models import User
+from benchmarks.utils import measure
+
+pytestmark = [pytest.mark.benchmark, pytest.mark.django_db]
+
+
+@pytest.mark.parametrize('authentication_class', [JWTAuthentication, CachedJWTAuthentication], ids=['uncached', 'cached'])
+def test_jwt_authentication(benchmark_recorder, authentication_class):
+    user = mixer.blend(User)
+    request = APIRequestFactory().get('/', HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}')
+    authentication = authentication_class()
+
+    def authenticate():
+        assert authentication.authenticate(request)[0].pk == user.pk
+
+    latency = benchmark_recorder.record('latency', measure(authenticate, repeat=1000, warmup=10))
+    with CaptureQueriesContext(connection) as queries:
+        authenticate()
+    benchmark_recorder.record('queries', len(queries))
+    benchmark_recorder.record('authentications_per_second', round(1000 / latency['mean_ms']))
@@ -0,0 +1,38 @@
+import time
+import tracemalloc
+import pytest
+from django.urls import reverse
+from mixer.backend.django import mixer
+from apps.account.models import User
+from benchmarks.utils import seed_ledger
+
+pytestmark = [pytest.mark.benchmark, pytest.mark.django_db]
+
+
+@pytest.mark.parametrize('export_format', ['csv', 'ndjson'])
+def test_ledger_export_memory(benchmark_recorder, api_client, rows, export_format):
+    user = mixer.blend(User)
+    seed_ledger(user, rows)
+    api_client.force_authenticate(user=user)
+
+    url = reverse('export_ledger')
+
+    def export():
+        response = api_client.get(url, {'format': export_format})
+        return sum(len(chunk) for chunk in response.streaming_content)
+
+    start = time.perf_counter()
+    size = export()
+    elapsed = time.perf_counter() - start
+
+    # once more under tracemalloc, which slows everything down, for the memory peak
+    tracemalloc.start()
+    export()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    benchmark_recorder.record('rows', rows + rows // 4)
+    benchmark_recorder.record('bytes', size)
+    benchmark_recorder.record('seconds', round(elapsed, 3))
+    benchmark_recorder.record('rows_per_second', round((rows + rows // 4) / elapsed))
+    benchmark_recorder.record('peak_memory_kib', peak // 1024)
@@ -0,0 +1,46 @@
+import random
+import tracemalloc
+import pytest
+from mixer.backend.django import mixer
+from api.utils.ledger import LedgerImporter, read_rows
+from apps.account.models import Expenditure, User
+from benchmarks.utils import CATEGORIES
+
+pytestmark = [pytest.mark.benchmark, pytest.mark.django_db]
+
+
+def write_statement(path, rows, seed=0):
+    """A CSV statement of `rows` expenditures, one in a hundred of them invalid."""
+    rng = random.Random(seed)
+    with open(path, 'w', newline='') as stream:
+        stream.write('kind,category,name,amount\n')
+        for i in range(rows):
+            amount = 'n/a' if i % 100 == 99 else f'{rng.randint(100, 50000) / 100:.2f}'
+            stream.write(f'expenditure,{rng.choice(CATEGORIES)},item {i},{amount}\n')
+
+
+@pytest.mark.parametrize('batch_size', [500, 5000])
+def test_ledger_import(benchmark_recorder, tmp_path, rows, batch_size):
+    path = tmp_path / 'statement.csv'
+    write_statement(path, rows)
+
+    def run():
+        user = mixer.blend(User)
+        with open(path, newline='') as stream:
+            report = LedgerImporter(user, batch_size=batch_size).run(read_rows(stream, 'csv'))
+        assert report['created'] == Expenditure.objects.filter(user=user).count() == rows - rows // 100
+        return report
+
+    report = run()
+
+    # once more under tracemalloc, which slows everything down, for the memory peak
+    tracemalloc.start()
+    run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    benchmark_recorder.record('rows', report['rows'])
+    benchmark_recorder.record('file_bytes', path.stat().st_size)
+    benchmark_recorder.record('seconds', report['seconds'])
+    benchmark_recorder.record('rows_per_second', report['rows_per_second'])
+    benchmark_recorder.record('peak_memory_kib', peak // 1024)
@@ -0,0 +1,241 @@
+import http.client
+import itertools
+import json
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management import call_command
+from django.core.servers.basehttp import ThreadedWSGIServer, WSGIRequestHandler
+from django.db import connection
+from django.test import Client
+from django.test.client import BOUNDARY, MULTIPART_CONTENT, encode_multipart
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from mixer.backend.django import mixer
+from rest_framework_simplejwt.tokens import RefreshToken
+from apps.account.models import Expenditure, Income, User
+from benchmarks.utils import CATEGORIES, seed_ledger
+
+pytestmark = [pytest.mark.benchmark, pytest.mark.django_db(transaction=True)]
+
+# Users sharing the ledger tables with the measured one, each seeded with a tenth of its rows
+OTHER_USERS = 9
+
+# Items per bulk request, and rows per imported file
+BATCH = 10
+
+
+@pytest.fixture(autouse=True)
+def file_database(transactional_db, tmp_path):
+    """
+    Point the default database at an SQLite file for the test, instead of the shared in-memory one.
+
+    Every server thread then gets its own connection to the file, as in production, rather than
+    contending on the in-memory database's table locks.
+    """
+    memory = connection.connection, connection.settings_dict['NAME']
+    connection.connection = None
+    connection.settings_dict['NAME'] = str(tmp_path / 'db.sqlite3')
+    try:
+        call_command('migrate', run_syncdb=True, interactive=False, verbosity=0)
+        yield
+    finally:
+        connection.close()
+        connection.connection, connection.settings_dict['NAME'] = memory
+
+
+class QuietWSGIRequestHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+@contextmanager
+def local_server():
+    """A threaded WSGI server on a free local port, the one `runserver` and the live server tests use."""
+    server = ThreadedWSGIServer(('127.0.0.1', 0), QuietWSGIRequestHandler, allow_reuse_address=False)
+    server.set_app(WSGIHandler())
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield server.server_address
+    finally:
+        server.shutdown()
+        server.server_close()
+        thread.join()
+
+
+class Seed:
+    """The seeded user, its tokens, and unique values for the requests that need them."""
+
+    def __init__(self, user, access_token, refresh_token):
+        self.user = user
+        self.access_token = access_token
+        self.refresh_token = refresh_token
+        self.sequence = itertools.count()
+
+    def entries(self, model, count):
+        """`count` new entries of the user, for the requests that update or delete one each."""
+        if model is Income:
+            entries = [Income(user=self.user, nameOfRevenue=f'load {i}', amount=Decimal('100.00')) for i in range(count)]
+        else:
+            entries = [Expenditure(user=self.user, category='food', nameOfItem=f'load {i}', estimatedAmount=Decimal('9.99')) for i in range(count)]
+        return [str(entry.pk) for entry in model.objects.bulk_create(entries)]
+
+
+def json_call(method, path, data=None):
+    return method, path, None if data is None else json.dumps(data).encode(), 'application/json'
+
+
+def income_data(i):
+    return {'nameOfRevenue': f'revenue {i}', 'amount': 100 + i % 1000}
+
+
+def expenditure_data(i):
+    return {'category': CATEGORIES[i % len(CATEGORIES)], 'nameOfItem': f'item {i}', 'estimatedAmount': 1 + i % 500}
+
+
+def ledger_routes(name, prefix, model, data):
+    """The calls of the income or expenditure routes, as `name: (expected status, make calls)`."""
+    return {
+        f'{name}_list': (200, lambda seed, count: [json_call('GET', f'{prefix}/')] * count),
+        f'{name}_create': (201, lambda seed, count: [json_call('POST', f'{prefix}/', data(next(seed.sequence))) for _ in range(count)]),
+        f'{name}_bulk_create': (201, lambda seed, count: [
+            json_call('POST', f'{prefix}/bulk/', [data(next(seed.sequence)) for _ in range(BATCH)]) for _ in range(count)
+        ]),
+        f'{name}_bulk_update': (200, lambda seed, count: [
+            json_call('PATCH', f'{prefix}/bulk/', {'ids': ids, 'data': data(next(seed.sequence))})
+            for ids in [seed.entries(model, BATCH)] * count
+        ]),
+        f'{name}_bulk_delete': (200, lambda seed, count: [
+            json_call('DELETE', f'{prefix}/bulk/', {'ids': seed.entries(model, BATCH)}) for _ in range(count)
+        ]),
+        f'{name}_retrieve': (200, lambda seed, count: [json_call('GET', f'{prefix}/{pk}/') for pk in seed.entries(model, 20)] * (count // 20 + 1)),
+        f'{name}_update': (200, lambda seed, count: [
+            json_call('PUT', f'{prefix}/{pk}/', data(next(seed.sequence))) for pk in seed.entries(model, 20)
+        ] * (count // 20 + 1)),
+        f'{name}_delete': (200, lambda seed, count: [json_call('DELETE', f'{prefix}/{pk}/') for pk in seed.entries(model, count)]),
+    }
+
+
+def signups(seed, count):
+    calls = []
+    for _ in range(count):
+        i = next(seed.sequence)
+        calls.append(json_call('POST', '/auth/signup/', {
+            'email': f'load{i}@nomail.com', 'password': 'load_password', 'first_name': 'load', 'last_name': 'user',
+            'username': f'load{i}', 'phone_number': f'+23324{i:07d}',
+        }))
+    return calls
+
+
+def imports(seed, count):
+    content = 'kind,id,created_at,category,name,amount\n' + ''.join(
+        f'expenditure,,,{CATEGORIES[i % len(CATEGORIES)]},imported {i},{i + 1}.50\n' for i in range(BATCH)
+    )
+    body = encode_multipart(BOUNDARY, {'file': SimpleUploadedFile('ledger.csv', content.encode())})
+    return [('POST', '/user/ledger/import/', body, MULTIPART_CONTENT)] * count
+
+
+# every route of api/urls.py, and every method it serves
+ROUTES = {
+    'signup': (201, signups),
+    'login': (200, lambda seed, count: [json_call('POST', '/auth/login/', {'email': seed.user.email, 'password': 'test_user'})] * count),
+    'refresh': (200, lambda seed, count: [json_call('POST', '/auth/refresh/', {'refresh': seed.refresh_token})] * count),
+    'logout': (200, lambda seed, count: [
+        json_call('POST', '/auth/logout/', {'refresh_token': str(RefreshToken.for_user(seed.user))}) for _ in range(count)
+    ]),
+    'profile_retrieve': (200, lambda seed, count: [json_call('GET', f'/auth/user/{seed.user.pk}/profile/')] * count),
+    'profile_update': (200, lambda seed, count: [
+        json_call('PUT', f'/auth/user/{seed.user.pk}/profile/', {'first_name': f'name {next(seed.sequence)}'}) for _ in range(count)
+    ]),
+    **ledger_routes('income', '/user/income', Income, income_data),
+    **ledger_routes('expenditure', '/user/expenditure', Expenditure, expenditure_data),
+    'ledger_export': (200, lambda seed, count: [
+        json_call('GET', f'/user/ledger/export/?format=csv&start={(timezone.now() - timedelta(days=30)).date()}')
+    ] * count),
+    'ledger_import': (200, imports),
+    'ledger_summary': (200, lambda seed, count: [json_call('GET', '/user/ledger/summary/?granularity=month')] * count),
+}
+
+
+def summarize(latencies, statuses, seconds):
+    latencies = sorted(latencies)
+
+    def percentile(p):
+        return round(latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000, 3)
+
+    return {
+        'requests': len(latencies),
+        'requests_per_second': round(len(latencies) / seconds, 1),
+        'p50_ms': percentile(0.50),
+        'p95_ms': percentile(0.95),
+        'p99_ms': percentile(0.99),
+        'statuses': dict(statuses),
+    }
+
+
+def run_load(address, calls, token, concurrency):
+    """Send `calls` to the server at `address` from `concurrency` client threads, one connection per request."""
+    pending, latencies, statuses = iter(calls), [], Counter()
+    lock = threading.Lock()
+
+    def client():
+        while True:
+            with lock:
+                call = next(pending, None)
+            if call is None:
+                return
+            method, path, body, content_type = call
+            start = time.perf_counter()
+            conn = http.client.HTTPConnection(*address, timeout=60)
+            conn.request(method, path, body, {'Authorization': f'Bearer {token}', 'Content-Type': content_type})
+            response = conn.getresponse()
+            response.read()
+            conn.close()
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+                statuses[response.status] += 1
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return summarize(latencies, statuses, time.perf_counter() - start)
+
+
+def count_queries(call, token):
+    """Queries run by one call, sent in-process so they are captured on this thread's connection."""
+    method, path, body, content_type = call
+    with CaptureQueriesContext(connection) as queries:
+        response = Client().generic(method, path, body or b'', content_type, HTTP_AUTHORIZATION=f'Bearer {token}')
+    return response.status_code, len(queries)
+
+
+def test_http_load(request, benchmark_recorder, rows, user, access_token, refresh_token):
+    seed_ledger(user, rows)
+    for i, other in enumerate(mixer.cycle(OTHER_USERS).blend(User)):
+        seed_ledger(other, rows // 10, seed=i + 1)
+
+    seed = Seed(user, access_token, refresh_token)
+    count = request.config.getoption('--benchmark-requests')
+    concurrencies = [int(c) for c in request.config.getoption('--benchmark-concurrency').split(',') if c]
+
+    with local_server() as address:
+        for name, (expected, make_calls) in ROUTES.items():
+            status, queries = count_queries(make_calls(seed, 1)[0], access_token)
+            assert status == expected, name
+
+            result = benchmark_recorder.record(name, {'queries_per_request': queries})
+            for concurrency in concurrencies:
+                result[f'{concurrency}_clients'] = run_load(address, make_calls(seed, count)[:count], access_token, concurrency)
+                assert result[f'{concurrency}_clients']['statuses'] == {expected: count}, name
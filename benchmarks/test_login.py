@@ -0,0 +1,34 @@
+import pytest
+from django.contrib.auth import authenticate
+from django.urls import reverse
+from mixer.backend.django import mixer
+from apps.account.models import User
+from benchmarks.utils import measure
+
+pytestmark = [pytest.mark.benchmark, pytest.mark.django_db]
+
+
+def test_login_latency(benchmark_recorder, client):
+    user = mixer.blend(User, email='benchmark@gmail.com', is_active=True)
+    user.set_password('benchmark@334')
+    user.save()
+
+    url = reverse('login')
+    credentials = {'email': 'benchmark@gmail.com', 'password': 'benchmark@334'}
+
+    def login():
+        assert client.post(url, credentials, content_type='application/json').status_code == 200
+
+    def double_check():
+        # what the view used to do before issuing tokens: check the password, then authenticate() again
+        User.objects.filter(email=credentials['email']).first().check_password(credentials['password'])
+        authenticate(email=credentials['email'], password=credentials['password'])
+
+    login_latency = benchmark_recorder.record('login', measure(login, repeat=10, warmup=1))
+    benchmark_recorder.record('wrong_password', measure(
+        lambda: client.post(url, {**credentials, 'password': 'wrong'}, content_type='application/json'), repeat=10, warmup=1,
+    ))
+    double_check_latency = benchmark_recorder.record('previous_credential_check', measure(double_check, repeat=10, warmup=1))
+
+    # the previous path hashed twice before even issuing the tokens
+    assert login_latency['p50_ms'] < double_check_latency['p50_ms']
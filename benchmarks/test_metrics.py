@@ -0,0 +1,40 @@
+import pytest
+from django.conf import settings
+from django.test import Client, override_settings
+from mixer.backend.django import mixer
+from rest_framework_simplejwt.tokens import AccessToken
+from apps.account.models import Income, User
+from benchmarks.utils import measure
+from ExpenseTracker.metrics import collect, registry, render
+
+pytestmark = [pytest.mark.benchmark, pytest.mark.django_db]
+
+
+def test_metrics_overhead(benchmark_recorder, tmp_path):
+    user = mixer.blend(User)
+    path = f'/user/income/{mixer.blend(Income, user=user).pk}/'
+    headers = {'HTTP_AUTHORIZATION': f'Bearer {AccessToken.for_user(user)}'}
+    without_metrics = [name for name in settings.MIDDLEWARE if name != 'ExpenseTracker.middleware.MetricsMiddleware']
+
+    def timed(**overrides):
+        with override_settings(**overrides):
+            client = Client()
+            return measure(lambda: client.get(path, **headers), repeat=2000, warmup=50)
+
+    result = benchmark_recorder.record('request', {
+        'without_metrics': timed(MIDDLEWARE=without_metrics),
+        'with_metrics': timed(),
+        # every request also writes the totals to a file, the worst case of METRICS_FLUSH_INTERVAL
+        'with_metrics_dir': timed(METRICS_DIR=str(tmp_path), METRICS_FLUSH_INTERVAL=0),
+    })
+    result['overhead_ms'] = round(result['with_metrics']['mean_ms'] - result['without_metrics']['mean_ms'], 4)
+
+    # a scrape, with the series of every route of a busy server
+    for i in range(40):
+        for method in ('GET', 'POST'):
+            labels = (f'view_{i}', method)
+            for name in ('http_request_duration_seconds', 'http_request_db_queries', 'http_request_db_duration_seconds', 'http_response_size_bytes'):
+                registry.observe(name, labels, 0.01)
+            registry.inc('http_responses_total', (*labels, '200'))
+    benchmark_recorder.record('scrape', measure(lambda: render(collect()), repeat=200))
+    registry.clear()
@@ -0,0 +1,93 @@
+from contextlib import contextmanager
+from unittest import mock
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.test import AsyncClient, Client, override_settings
+from mixer.backend.django import mixer
+from rest_framework.authentication import SessionAuthentication
+from rest_framework.views import APIView
+from rest_framework_simplejwt.tokens import AccessToken
+from api.utils.authentication import CachedJWTAuthentication
+from apps.account.models import Income, User
+from benchmarks.utils import measure
+
+pytestmark = [pytest.mark.benchmark, pytest.mark.django_db]
+
+# Requests timed per sample of the ASGI runs, a new event loop per request would drown the middleware cost
+ASGI_BATCH = 20
+
+# The middleware stack every request went through before it was scoped to the admin and the docs
+FULL_MIDDLEWARE = [
+    'django.middleware.security.SecurityMiddleware',
+    'corsheaders.middleware.CorsMiddleware',
+    'django.contrib.sessions.middleware.SessionMiddleware',
+    'django.middleware.common.CommonMiddleware',
+    'django.middleware.csrf.CsrfViewMiddleware',
+    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'django.contrib.messages.middleware.MessageMiddleware',
+    'django.middleware.clickjacking.XFrameOptionsMiddleware',
+]
+
+
+@contextmanager
+def full_stack():
+    # sessions, CSRF and messages for every request, and session authentication for the API views
+    with mock.patch.object(APIView, 'authentication_classes', [CachedJWTAuthentication, SessionAuthentication]), \
+            override_settings(MIDDLEWARE=FULL_MIDDLEWARE):
+        yield
+
+
+def requests(user):
+    """A JWT authenticated read, the same read from a browser also logged into the admin, and an anonymous one."""
+    token = str(AccessToken.for_user(user))
+    path = f'/user/income/{mixer.blend(Income, user=user).pk}/'
+
+    admin = User.objects.create_superuser(email='admin@nomail.com', password='admin_password', phone_number='+233277528583')
+    session_client = Client()
+    session_client.force_login(admin)
+    cookies = session_client.cookies
+    return {
+        'jwt': (path, {'HTTP_AUTHORIZATION': f'Bearer {token}'}, None),
+        'jwt_with_session_cookie': (path, {'HTTP_AUTHORIZATION': f'Bearer {token}'}, cookies),
+        'anonymous': (path, {}, None),
+    }
+
+
+def time_wsgi(path, headers, cookies):
+    client = Client()
+    if cookies:
+        client.cookies = cookies
+    return measure(lambda: client.get(path, **headers), repeat=2000, warmup=50)
+
+
+def time_asgi(path, headers, cookies):
+    client = AsyncClient()
+    if cookies:
+        client.cookies = cookies
+    headers = {key.removeprefix('HTTP_'): value for key, value in headers.items()}
+
+    async def batch():
+        for _ in range(ASGI_BATCH):
+            await client.get(path, **headers)
+
+    result = measure(async_to_sync(batch), repeat=50, warmup=2)
+    return {key: round(value / ASGI_BATCH, 3) if key.endswith('_ms') else value for key, value in result.items()}
+
+
+def test_api_request_overhead(request, benchmark_recorder):
+    assert 'ExpenseTracker.middleware.ScopedMiddleware' in settings.MIDDLEWARE
+    user = mixer.blend(User)
+    cases = requests(user)
+
+    for mode, time_requests in (('wsgi', time_wsgi), ('asgi', time_asgi)):
+        if mode == 'asgi':
+            request.getfixturevalue('async_views')
+        for name, case in cases.items():
+            scoped = time_requests(*case)
+            with full_stack():
+                full = time_requests(*case)
+            result = benchmark_recorder.record(f'{mode}_{name}', {'full_stack': full, 'scoped_stack': scoped})
+            result['saved_ms_per_request'] = round(full['mean_ms'] - scoped['mean_ms'], 3)
+            result['speedup'] = round(full['mean_ms'] / scoped['mean_ms'], 2)
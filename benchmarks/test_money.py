@@ -0,0 +1,59 @@
+import random
+from decimal import Decimal
+import pytest
+from django.db import connection, models
+from django.db.models.expressions import Col
+from apps.account.fields import MoneyField
+from benchmarks.utils import measure
+
+pytestmark = [pytest.mark.benchmark, pytest.mark.django_db]
+
+# the decimal columns the amounts used to be stored in, and the integer cents of MoneyField, wide
+# enough for the sums over all the rows (summing a DecimalField is decoded with its max_digits)
+FIELDS = {
+    'decimal': models.DecimalField(max_digits=15, decimal_places=2),
+    'cents': MoneyField(max_digits=15, decimal_places=2),
+}
+
+
+def create_table(name, field, amounts):
+    with connection.cursor() as cursor:
+        cursor.execute(f'CREATE TABLE "{name}" ("id" integer NOT NULL PRIMARY KEY, "amount" {field.db_type(connection)} NOT NULL)')
+        cursor.executemany(f'INSERT INTO "{name}" ("amount") VALUES (%s)', [(field.get_db_prep_save(amount, connection), ) for amount in amounts])
+
+
+def decode(name, field, sql):
+    """Run `sql` on the table and turn the values into Decimals, with the converters a queryset applies."""
+    col = Col(name, field)
+    converters = connection.ops.get_db_converters(col) + col.get_db_converters(connection)
+    with connection.cursor() as cursor:
+        cursor.execute(sql.format(table=name))
+        values = []
+        for value, in cursor.fetchall():
+            for converter in converters:
+                value = converter(value, col, connection)
+            values.append(value)
+    return values
+
+
+def test_money_storage(benchmark_recorder, rows):
+    rng = random.Random(0)
+    amounts = [Decimal(rng.randrange(100, 500000)) / 100 for _ in range(rows)]
+    repeat = max(3, min(50, 1000000 // rows))
+
+    results = {}
+    for storage, field in FIELDS.items():
+        table = f'money_{storage}'
+        create_table(table, field, amounts)
+        assert decode(table, field, 'SELECT "amount" FROM "{table}" ORDER BY "id"') == amounts
+        assert decode(table, field, 'SELECT SUM("amount") FROM "{table}"') == [sum(amounts)]
+
+        results[storage] = {
+            # reading the amounts of the rows, as list endpoints do a page at a time
+            'decode': measure(lambda: decode(table, field, 'SELECT "amount" FROM "{table}"'), repeat=repeat, warmup=1),
+            'sum': measure(lambda: decode(table, field, 'SELECT SUM("amount") FROM "{table}"'), repeat=repeat, warmup=1),
+        }
+
+    benchmark_recorder.record('results', results)
+    benchmark_recorder.record('decode_speedup', round(results['decimal']['decode']['mean_ms'] / results['cents']['decode']['mean_ms'], 2))
+    benchmark_recorder.record('sum_speedup', round(results['decimal']['sum']['mean_ms'] / results['cents']['sum']['mean_ms'], 2))
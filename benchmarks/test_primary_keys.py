@@ -0,0 +1,95 @@
+import os
+import random
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+import pytest
+from django.conf import settings
+from django.db import connections, models, transaction
+from apps.account.fields import CompactUUIDField, uuid7
+
+pytestmark = [pytest.mark.benchmark, pytest.mark.django_db]
+
+# (primary key storage, id generator): the random hex keys the project used to have, and the compact and time-ordered ones
+SCHEMES = {
+    'uuid4_text': (models.UUIDField(), uuid.uuid4),
+    'uuid7_text': (models.UUIDField(), uuid7),
+    'uuid4_blob': (CompactUUIDField(), uuid.uuid4),
+    'uuid7_blob': (CompactUUIDField(), uuid7),
+}
+
+USERS = 100
+BATCH = 10000
+
+
+@contextmanager
+def database(alias, path):
+    """A temporary database alias on the file at `path`, configured like the default one."""
+    config = {key: settings.DATABASES['default'][key] for key in ('ENGINE', 'OPTIONS')}
+    configured = connections.configure_settings({'default': {'NAME': ':memory:'}, alias: {'NAME': str(path), **config}})
+    connections.settings[alias] = configured[alias]
+    try:
+        yield connections[alias]
+    finally:
+        connections[alias].close()
+        del connections.settings[alias]
+
+
+def create_table(connection, field):
+    """The expenditure table and its indexes, with `field` as the type of the id and user_id columns."""
+    key = field.db_type(connection)
+    with connection.cursor() as cursor:
+        cursor.execute(f'''
+            CREATE TABLE "expenditure" (
+                "id" {key} NOT NULL PRIMARY KEY, "category" varchar(100) NOT NULL, "nameOfItem" varchar(100) NOT NULL,
+                "estimatedAmount" decimal NOT NULL, "user_id" {key} NOT NULL, "updated_at" datetime NOT NULL, "created_at" datetime NOT NULL
+            )
+        ''')
+        cursor.execute('CREATE INDEX "expenditure_user_id" ON "expenditure" ("user_id")')
+        cursor.execute('CREATE INDEX "expenditure_user_created_idx" ON "expenditure" ("user_id", "created_at" DESC, "id" DESC)')
+
+
+def insert_rows(connection, field, new_id, rows):
+    """Insert `rows` rows in batches, and return the (rows, seconds) of every batch."""
+    rng = random.Random(0)
+    users = [field.get_db_prep_value(new_id(), connection) for _ in range(USERS)]
+    now = datetime.now(timezone.utc)
+    timings = []
+    for start in range(0, rows, BATCH):
+        params = []
+        for i in range(start, min(rows, start + BATCH)):
+            created_at = (now + timedelta(microseconds=i)).isoformat()
+            params.append((
+                field.get_db_prep_value(new_id(), connection), 'food', f'item {i}', f'{rng.randrange(100, 500000) / 100:.2f}',
+                rng.choice(users), created_at, created_at,
+            ))
+        began = time.perf_counter()
+        with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+            cursor.executemany('INSERT INTO "expenditure" VALUES (%s, %s, %s, %s, %s, %s, %s)', params)
+        timings.append((len(params), time.perf_counter() - began))
+    return timings
+
+
+def sizes(connection):
+    """Bytes used by the table and by each of its indexes."""
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+        # the table, its indexes and the index of its text or blob primary key
+        cursor.execute('SELECT name, SUM(pgsize) FROM dbstat WHERE name NOT LIKE %s OR name LIKE %s GROUP BY name', ['sqlite_%', 'sqlite_autoindex_%'])
+        return dict(cursor.fetchall())
+
+
+@pytest.mark.parametrize('scheme', list(SCHEMES))
+def test_primary_key_scheme(benchmark_recorder, tmp_path, rows, scheme):
+    field, new_id = SCHEMES[scheme]
+    with database(f'benchmark_{scheme}', tmp_path / 'db.sqlite3') as connection:
+        create_table(connection, field)
+        timings = insert_rows(connection, field, new_id, rows)
+        # the last tenth of the inserts, when the indexes are largest
+        tail = timings[-max(1, len(timings) // 10):]
+
+        benchmark_recorder.record('rows_per_second', round(rows / sum(seconds for _, seconds in timings)))
+        benchmark_recorder.record('final_rows_per_second', round(sum(count for count, _ in tail) / sum(seconds for _, seconds in tail)))
+        benchmark_recorder.record('bytes', sizes(connection))
+        benchmark_recorder.record('file_bytes', os.path.getsize(tmp_path / 'db.sqlite3'))
@@ -0,0 +1,41 @@
+import pytest
+from mixer.backend.django import mixer
+from api.serializers.expenditure import UserExpenditureSerializer
+from api.serializers.income import UserIncomeSerializer
+from api.utils.projection import get_projection
+from api.utils.renderers import ORJSONRenderer
+from apps.account.models import Expenditure, Income, User
+from benchmarks.utils import measure, seed_ledger
+
+pytestmark = [pytest.mark.benchmark, pytest.mark.django_db]
+
+# Page sizes the list endpoints are asked for: the default, the maximum, and a large export-like read
+PAGE_SIZES = (50, 500, 5000)
+
+
+@pytest.mark.parametrize('model, serializer_class', [
+    (Expenditure, UserExpenditureSerializer),
+    (Income, UserIncomeSerializer),
+], ids=['expenditure', 'income'])
+def test_list_representation(benchmark_recorder, rows, model, serializer_class):
+    user = mixer.blend(User)
+    seed_ledger(user, rows)
+    queryset = model.objects.filter(user=user).order_by('-created_at', '-id')
+    projection = get_projection(serializer_class)
+
+    def serialized(size):
+        return serializer_class(list(queryset[:size]), many=True).data
+
+    def projected(size):
+        return projection.represent(list(projection.values(queryset)[:size]))
+
+    for size in PAGE_SIZES:
+        assert ORJSONRenderer().render(projected(size)) == ORJSONRenderer().render(serialized(size))
+
+        result = benchmark_recorder.record(f'{size}_rows', {
+            'serializer': measure(lambda: serialized(size), repeat=10),
+            'values_projection': measure(lambda: projected(size), repeat=10),
+            # the SQL alone, for reference
+            'values_query': measure(lambda: list(projection.values(queryset)[:size]), repeat=10),
+        })
+        result['speedup'] = round(result['serializer']['mean_ms'] / result['values_projection']['mean_ms'], 2)
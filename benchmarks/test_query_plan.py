@@ -0,0 +1,62 @@
+import pytest
+from django.db import connection
+from mixer.backend.django import mixer
+from api.utils.pagination import KeysetPagination
+from apps.account.models import Expenditure, Income, User
+from benchmarks.utils import measure, seed_ledger
+
+pytestmark = [pytest.mark.benchmark, pytest.mark.django_db(transaction=True)]
+
+
+def page_querysets(model, user):
+    """The first, a deep and a previous page query exactly as the list views build them."""
+    paginator = KeysetPagination()
+    qs = model.objects.filter(user=user)
+    ordering, reversed_ordering = paginator.ordering, paginator.get_reversed_ordering()
+
+    # take the cursor from the middle of the ledger
+    middle = qs.order_by(*ordering).values_list('created_at', 'id')[qs.count() // 2]
+    position = (middle[0].isoformat(), str(middle[1]))
+
+    return {
+        'first_page': qs.order_by(*ordering)[:paginator.page_size + 1],
+        'deep_page': qs.order_by(*ordering).filter(paginator.get_seek_filter(model, ordering, position))[:paginator.page_size + 1],
+        'previous_page': qs.order_by(*reversed_ordering).filter(paginator.get_seek_filter(model, reversed_ordering, position))[:paginator.page_size + 1],
+    }
+
+
+def profile(model, user):
+    results = {}
+    for name, queryset in page_querysets(model, user).items():
+        results[name] = {
+            'plan': queryset.explain(),
+            'latency': measure(lambda: list(queryset.all())),
+        }
+    return results
+
+
+@pytest.mark.parametrize('model', [Expenditure, Income], ids=['expenditure', 'income'])
+def test_user_listing_query_plan(benchmark_recorder, rows, model):
+    user = mixer.blend(User)
+    seed_ledger(user, rows)
+    # a second, smaller ledger so the user filter actually has to discriminate
+    seed_ledger(mixer.blend(User), rows // 10, seed=1)
+
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+
+    indexed = benchmark_recorder.record('indexed', profile(model, user))
+
+    # the same queries once more without the composite index, for comparison
+    index = next(index for index in model._meta.indexes if index.fields == ['user', '-created_at', '-id'])
+    with connection.schema_editor() as editor:
+        editor.remove_index(model, index)
+    try:
+        benchmark_recorder.record('unindexed', profile(model, user))
+    finally:
+        with connection.schema_editor() as editor:
+            editor.add_index(model, index)
+
+    for name, result in indexed.items():
+        assert index.name in result['plan'], name
+        assert 'TEMP B-TREE' not in result['plan'], name
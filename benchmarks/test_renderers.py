@@ -0,0 +1,68 @@
+import io
+import random
+import uuid
+from datetime import timedelta
+from decimal import Decimal
+
+import pytest
+from django.utils import timezone
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from api.serializers.expenditure import UserExpenditureSerializer
+from api.serializers.income import UserIncomeSerializer
+from api.utils.renderers import ORJSONParser, ORJSONRenderer
+from apps.account.models import Expenditure, Income
+from benchmarks.utils import CATEGORIES, measure
+
+pytestmark = pytest.mark.benchmark
+
+# Rows in each list payload
+ROWS = 10000
+
+
+def list_payload(kind):
+    """A page of `ROWS` serialized rows shaped like the list endpoints' responses."""
+    rng = random.Random(0)
+    now = timezone.now()
+    user_id = uuid.uuid4()
+    if kind == 'expenditure':
+        serializer = UserExpenditureSerializer([
+            Expenditure(
+                id=uuid.uuid4(), user_id=user_id, category=rng.choice(CATEGORIES), nameOfItem=f'item {i}',
+                estimatedAmount=Decimal(rng.randrange(100, 500000)) / 100,
+                created_at=now - timedelta(seconds=i), updated_at=now,
+            )
+            for i in range(ROWS)
+        ], many=True)
+    else:
+        serializer = UserIncomeSerializer([
+            Income(
+                id=uuid.uuid4(), user_id=user_id, nameOfRevenue=f'revenue {i}',
+                amount=Decimal(rng.randrange(1000, 1000000)) / 100,
+                created_at=now - timedelta(seconds=i), updated_at=now,
+            )
+            for i in range(ROWS)
+        ], many=True)
+    return {'next': 'http://testserver/user/income/?cursor=cD0yMDIz', 'previous': None, 'results': serializer.data}
+
+
+@pytest.mark.parametrize('kind', ['expenditure', 'income'])
+def test_render_and_parse_list_payload(benchmark_recorder, kind):
+    data = list_payload(kind)
+    body = JSONRenderer().render(data)
+    assert ORJSONRenderer().render(data) == body
+
+    results = benchmark_recorder.record('render', {
+        'bytes': len(body),
+        'json_renderer': measure(lambda: JSONRenderer().render(data), repeat=20),
+        'orjson_renderer': measure(lambda: ORJSONRenderer().render(data), repeat=20),
+    })
+    results['speedup'] = round(results['json_renderer']['mean_ms'] / results['orjson_renderer']['mean_ms'], 2)
+
+    # request bodies of the same size, eg. a bulk create
+    assert ORJSONParser().parse(io.BytesIO(body)) == JSONParser().parse(io.BytesIO(body))
+    results = benchmark_recorder.record('parse', {
+        'json_parser': measure(lambda: JSONParser().parse(io.BytesIO(body)), repeat=20),
+        'orjson_parser': measure(lambda: ORJSONParser().parse(io.BytesIO(body)), repeat=20),
+    })
+    results['speedup'] = round(results['json_parser']['mean_ms'] / results['orjson_parser']['mean_ms'], 2)
@@ -0,0 +1,96 @@
+import threading
+import time
+from contextlib import contextmanager
+from decimal import Decimal
+import pytest
+from django.conf import settings
+from django.db import OperationalError, connections, models, transaction
+from django.db.models import F
+from apps.account.models import Expenditure, User, UserBalance
+
+pytestmark = [pytest.mark.benchmark, pytest.mark.django_db]
+
+# the stock backend as the project used to run it, and the tuned one from settings
+CONFIGS = {
+    'stock': {'ENGINE': 'django.db.backends.sqlite3', 'CONN_MAX_AGE': 0, 'OPTIONS': {}},
+    'tuned': {key: settings.DATABASES['default'][key] for key in ('ENGINE', 'CONN_MAX_AGE', 'OPTIONS')},
+}
+
+
+@contextmanager
+def database(alias, path, config):
+    """A temporary database alias on the file at `path`, with the ledger tables created."""
+    configured = connections.configure_settings({'default': {'NAME': ':memory:'}, alias: {'NAME': str(path), **config}})
+    connections.settings[alias] = configured[alias]
+    try:
+        with connections[alias].schema_editor() as editor:
+            for model in (User, Expenditure, UserBalance):
+                editor.create_model(model)
+        yield alias
+    finally:
+        connections[alias].close()
+        del connections.settings[alias]
+
+
+def run_workload(alias, user_id, readers, writers, duration):
+    """Run `readers` list page readers and `writers` ledger writers for `duration` seconds."""
+    counts = {'reads': 0, 'writes': 0, 'errors': 0}
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def read():
+        list(models.QuerySet(Expenditure).using(alias).filter(user_id=user_id).order_by('-created_at', '-id')[:50])
+
+    def write():
+        with transaction.atomic(using=alias):
+            models.QuerySet(Expenditure).using(alias).bulk_create([
+                Expenditure(user_id=user_id, category='food', nameOfItem='item', estimatedAmount=Decimal('9.99')),
+            ])
+            models.QuerySet(UserBalance).using(alias).filter(user_id=user_id).update(
+                total_expense=F('total_expense') + Decimal('9.99'), expense_count=F('expense_count') + 1,
+            )
+
+    def worker(operation, counter):
+        done = errors = 0
+        while time.monotonic() < deadline:
+            try:
+                operation()
+                done += 1
+            except OperationalError:
+                # "database is locked"
+                errors += 1
+            # what the end of a request does with the connection
+            connections[alias].close_if_unusable_or_obsolete()
+        connections[alias].close()
+        with lock:
+            counts[counter] += done
+            counts['errors'] += errors
+
+    threads = [threading.Thread(target=worker, args=(read, 'reads')) for _ in range(readers)]
+    threads += [threading.Thread(target=worker, args=(write, 'writes')) for _ in range(writers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    return {
+        'reads_per_second': round(counts['reads'] / duration),
+        'writes_per_second': round(counts['writes'] / duration),
+        'errors': counts['errors'],
+    }
+
+
+@pytest.mark.parametrize('config', list(CONFIGS))
+def test_sqlite_concurrent_read_write(benchmark_recorder, tmp_path, config, readers=6, writers=2, duration=5):
+    with database(f'benchmark_{config}', tmp_path / 'db.sqlite3', CONFIGS[config]) as alias:
+        user = User(email='benchmark@gmail.com', username='benchmark', phone_number='+233277528582')
+        models.QuerySet(User).using(alias).bulk_create([user])
+        models.QuerySet(UserBalance).using(alias).bulk_create([UserBalance(user=user)])
+        models.QuerySet(Expenditure).using(alias).bulk_create(
+            [Expenditure(user=user, category='food', nameOfItem=f'item {i}', estimatedAmount=Decimal('1.00')) for i in range(10000)],
+            batch_size=1000,
+        )
+
+        benchmark_recorder.record('readers', readers)
+        benchmark_recorder.record('writers', writers)
+        benchmark_recorder.record('results', run_workload(alias, user.pk, readers, writers, duration))
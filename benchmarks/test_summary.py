@@ -0,0 +1,39 @@
+import pytest
+from django.db import connection
+from django.db.models import Count, DateField, Sum
+from django.db.models.functions import TruncMonth
+from mixer.backend.django import mixer
+from api.utils.ledger import summarize_ledger
+from apps.account.models import DailyRollup, Expenditure, User
+from benchmarks.utils import measure, seed_ledger
+
+pytestmark = [pytest.mark.benchmark, pytest.mark.django_db]
+
+
+def summarize_raw(user):
+    """The monthly expenditure summary aggregated from the raw rows, for comparison."""
+    return list(
+        Expenditure.objects.filter(user=user)
+        .annotate(period=TruncMonth('created_at', output_field=DateField()))
+        .values('period', 'category')
+        .annotate(total=Sum('estimatedAmount'), count=Count('pk'))
+        .order_by('period', 'category')
+    )
+
+
+def test_ledger_summary(benchmark_recorder, rows):
+    user = mixer.blend(User)
+    seed_ledger(user, rows)
+
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+
+    # SQLite sums decimals as floats, so compare to the cent
+    def rounded(rows):
+        return [{**row, 'total': round(row['total'], 2)} for row in rows]
+
+    assert rounded(summarize_ledger(user, kinds=['expenditure'])['expenditure']) == rounded(summarize_raw(user))
+
+    benchmark_recorder.record('rollup_rows', DailyRollup.objects.filter(user=user).count())
+    benchmark_recorder.record('rollups', measure(lambda: summarize_ledger(user), repeat=20))
+    benchmark_recorder.record('raw_rows', measure(lambda: summarize_raw(user), repeat=5))
@@ -0,0 +1,50 @@
+import time
+import uuid
+from datetime import timedelta
+import pytest
+from django.utils import timezone
+from mixer.backend.django import mixer
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import RefreshToken
+from api.serializers.user import RefreshSerializer
+from api.utils.tokens import prune_tokens
+from apps.account.models import User
+from benchmarks.utils import measure
+
+pytestmark = [pytest.mark.benchmark, pytest.mark.django_db]
+
+
+def seed_tokens(user, rows, batch_size=10000):
+    """`rows` outstanding tokens, half of them expired and one in ten blacklisted."""
+    now = timezone.now()
+    for start in range(0, rows, batch_size):
+        tokens = OutstandingToken.objects.bulk_create([
+            OutstandingToken(
+                user=user, jti=uuid.uuid4().hex, token='-', created_at=now,
+                expires_at=now + timedelta(days=-1 if i % 2 else 1),
+            )
+            for i in range(start, min(start + batch_size, rows))
+        ])
+        BlacklistedToken.objects.bulk_create([BlacklistedToken(token=token) for token in tokens[::10]])
+
+
+def test_token_refresh_and_prune(benchmark_recorder, rows):
+    user = mixer.blend(User)
+    seed_tokens(user, rows)
+    refresh = str(RefreshToken.for_user(user))
+
+    for name, serializer_class in (('uncached', TokenRefreshSerializer), ('cached', RefreshSerializer)):
+        def refresh_token():
+            serializer = serializer_class(data={'refresh': refresh})
+            assert serializer.is_valid()
+        benchmark_recorder.record(f'refresh_{name}', measure(refresh_token, repeat=200, warmup=5))
+
+    start = time.perf_counter()
+    deleted = prune_tokens(batch_size=1000)
+    elapsed = time.perf_counter() - start
+
+    assert OutstandingToken.objects.filter(expires_at__lte=timezone.now()).count() == 0
+    benchmark_recorder.record('pruned', deleted)
+    benchmark_recorder.record('prune_seconds', round(elapsed, 3))
+    benchmark_recorder.record('pruned_per_second', round(deleted / elapsed))
@@ -0,0 +1,85 @@
+import json
+import os
+import random
+import statistics
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import connection
+from django.utils import timezone
+from apps.account.models import Expenditure, Income
+from apps.account.seeding import CATEGORIES
+
+
+class BenchmarkRecorder:
+    """Collects the measurements of one benchmark and writes them out as JSON."""
+
+    def __init__(self, name, output_dir):
+        self.name = name
+        self.output_dir = output_dir
+        self.results = {}
+
+    def record(self, key, value):
+        self.results[key] = value
+        return value
+
+    def save(self):
+        os.makedirs(self.output_dir, exist_ok=True)
+        path = os.path.join(self.output_dir, f'{self.name}.json')
+        with open(path, 'w') as fp:
+            json.dump({'benchmark': self.name, 'vendor': connection.vendor, 'results': self.results}, fp, indent=2, sort_keys=True, default=str)
+
+
+def measure(func, repeat=50, warmup=3):
+    """Call `func` `repeat` times and return its latency distribution in milliseconds."""
+    for _ in range(warmup):
+        func()
+
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+
+    timings.sort()
+    return {
+        'runs': repeat,
+        'min_ms': round(timings[0], 4),
+        'mean_ms': round(statistics.fmean(timings), 4),
+        'p50_ms': round(timings[len(timings) // 2], 4),
+        'p95_ms': round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 4),
+    }
+
+
+def seed_ledger(user, rows, seed=0, batch_size=10000, days=365 * 3):
+    """Bulk insert `rows` expenditures and `rows // 4` incomes for `user`, spread over `days`."""
+    rng = random.Random(seed)
+    now = timezone.now()
+
+    def timestamp():
+        return now - timedelta(seconds=rng.randrange(days * 24 * 3600))
+
+    for start in range(0, rows, batch_size):
+        Expenditure.objects.bulk_create([
+            Expenditure(
+                user=user,
+                category=rng.choice(CATEGORIES),
+                nameOfItem=f'item {start + i}',
+                estimatedAmount=Decimal(rng.randrange(100, 500000)) / 100,
+                created_at=timestamp(),
+            )
+            for i in range(min(batch_size, rows - start))
+        ])
+
+    incomes = rows // 4
+    for start in range(0, incomes, batch_size):
+        Income.objects.bulk_create([
+            Income(
+                user=user,
+                nameOfRevenue=f'revenue {start + i}',
+                amount=Decimal(rng.randrange(1000, 1000000)) / 100,
+                created_at=timestamp(),
+            )
+            for i in range(min(batch_size, incomes - start))
+        ])
@@ -5,8 +5,97 @@ from mixer.backend.django import mixer
 from rest_framework.test import APIClient
 from rest_framework_simplejwt.tokens import RefreshToken, AccessToken
 
+def pytest_addoption(parser):
+    group = parser.getgroup('benchmark')
+    group.addoption('--benchmark', action='store_true', default=False, help='Run the benchmarks in benchmarks/, which are skipped by default.')
+    group.addoption('--benchmark-rows', default='10000,100000,1000000', help='Comma separated ledger sizes the benchmarks are run at.')
+    group.addoption('--benchmark-concurrency', default='1,8,32', help='Comma separated numbers of concurrent clients the load tests are run with.')
+    group.addoption('--benchmark-requests', default=200, type=int, help='Requests the load tests send to every route, per number of clients.')
+    group.addoption('--benchmark-output', default='benchmarks/results', help='Directory the benchmark JSON results are written to.')
+
+
+def pytest_collection_modifyitems(config, items):
+    # benchmarks are slow, only run them when asked to
+    if config.getoption('--benchmark'):
+        return
+    skip_benchmark = pytest.mark.skip(reason='benchmarks only run with --benchmark')
+    for item in items:
+        if 'benchmark' in item.keywords:
+            item.add_marker(skip_benchmark)
+
 # Creating global reusable fixtures
 
+@pytest.fixture(autouse=True)
+def clear_auth_caches():
+    # the authentication caches live as long as the process, not the test database
+    from api.utils.authentication import token_cache, user_cache
+    from api.utils.tokens import blacklist_cache
+    yield
+    token_cache.clear()
+    user_cache.clear()
+    blacklist_cache.clear()
+
+
+@pytest.fixture
+def async_views():
+    # serve the income and expenditure endpoints with their async views, as under ASGI
+    import importlib
+    from django.test import override_settings
+    from django.urls import clear_url_caches
+    import api.urls
+    import ExpenseTracker.urls
+
+    def reload_urls():
+        importlib.reload(api.urls)
+        importlib.reload(ExpenseTracker.urls)
+        clear_url_caches()
+
+    with override_settings(API_ASYNC_VIEWS=True):
+        reload_urls()
+        yield
+    reload_urls()
+
+
+@pytest.fixture
+def query_budget():
+    """
+    A context manager failing the test, with the captured SQL, when its block runs more than
+    `queries` queries or spends more than `db_share` of its time in them.
+    """
+    import gc
+    import time
+    from contextlib import contextmanager
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    @contextmanager
+    def check(queries, db_share=1.0):
+        # CPU time of this thread, without collector pauses, so other processes and GC runs don't skew the share
+        db_time = [0]
+
+        def timer(execute, sql, params, many, context):
+            start = time.thread_time()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                db_time[0] += time.thread_time() - start
+
+        gc.disable()
+        start = time.thread_time()
+        try:
+            with CaptureQueriesContext(connection) as captured, connection.execute_wrapper(timer):
+                yield captured
+            share = db_time[0] / max(time.thread_time() - start, 1e-9)
+        finally:
+            gc.enable()
+
+        sql = '\n'.join(f'{i}. {query["sql"]}' for i, query in enumerate(captured.captured_queries, start=1))
+        assert len(captured) <= queries, f'{len(captured)} queries run, the budget is {queries}:\n{sql}'
+        assert share <= db_share, f'{share:.0%} of the time spent in queries, the budget is {db_share:.0%}:\n{sql}'
+
+    return check
+
+
 @pytest.fixture
 def api_client():
     return APIClient()